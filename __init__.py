@@ -1,14 +1,30 @@
 """This script sets up the API for The Blue Alliance"""
 
+import http.client
 import json
-import urllib.request
 import os
+import time
+from TBApython import metrics
+from TBApython.cache import CacheEntry
+from TBApython.coalesce import SingleFlight
+from TBApython.cache import DiskCache
+from TBApython.cache import ValidationCache
+from TBApython.throttle import RetryPolicy
+from TBApython.transport import ContentDecodingError
+from TBApython.transport import Transport
 from TBApython.exceptions import APIUnavailableError
 from TBApython.exceptions import ResourceUnavailableError
 from TBApython.exceptions import UnexpectedDataError
 from TBApython.exceptions import APPIDNotSetError
 
-API_URL = 'http://www.thebluealliance.com/api/v2/'
+DEFAULT_API_URL = 'http://www.thebluealliance.com/api/v2/'
+
+try:
+    # Point the client at another server, such as a local MockServer, with
+    # the environment variable 'TBA_API_URL'
+    API_URL = os.environ['TBA_API_URL']
+except KeyError:
+    API_URL = DEFAULT_API_URL
 
 try:
     # Set your own APPID as the environment variable 'TBA_APPID'
@@ -18,38 +34,468 @@ except KeyError:
     # Valid format is <team/person id>:<app description>:<version>
     API_APPID = ''
 
-def get_data(url):
+def get_api_url():
+    """Returns the base URL every model builds its API URLs from."""
+    return API_URL
+
+def set_api_url(url):
+    """Points every model at another TBA API server.
+
+    Only URLs built afterwards are affected; models that were already
+    created keep their url attribute. The identity map shares models per
+    API URL, so models of the two servers are never mixed up.
+
+    Args:
+        url: string containing the base URL of the v2 API, or None for
+            DEFAULT_API_URL. Example: http://127.0.0.1:8000/api/v2/
+
+    Returns:
+        The previous base URL.
+    """
+    global API_URL  # pylint: disable=W0603
+    previous = API_URL
+    if url is None:
+        url = DEFAULT_API_URL
+    API_URL = url if url.endswith('/') else url + '/'
+    return previous
+
+# Shared by Event, Team and Match so their requests reuse open connections.
+_TRANSPORT = Transport()
+
+def get_transport():
+    """Returns the transport used by get_data when none is given."""
+    return _TRANSPORT
+
+def set_transport(transport):
+    """Replaces the transport used by get_data when none is given.
+
+    Args:
+        transport: Transport instance, for example one with a larger
+            pool_size for heavily threaded callers.
+
+    Returns:
+        The previous transport. Its idle connections are left open.
+    """
+    global _TRANSPORT  # pylint: disable=W0603
+    previous = _TRANSPORT
+    _TRANSPORT = transport
+    return previous
+
+# Responses are revalidated with ETag/Last-Modified instead of re-downloaded.
+_VALIDATION_CACHE = ValidationCache()
+
+def get_validation_cache():
+    """Returns the validation cache used by get_data, or None."""
+    return _VALIDATION_CACHE
+
+def set_validation_cache(cache):
+    """Replaces the validation cache used by get_data.
+
+    Args:
+        cache: ValidationCache instance, or None to always re-download.
+
+    Returns:
+        The previous validation cache.
+    """
+    global _VALIDATION_CACHE  # pylint: disable=W0603
+    previous = _VALIDATION_CACHE
+    _VALIDATION_CACHE = cache
+    return previous
+
+# Set the environment variable 'TBA_CACHE_PATH' to share an on-disk response
+# cache between processes.
+if os.environ.get('TBA_CACHE_PATH'):
+    _DISK_CACHE = DiskCache(os.environ['TBA_CACHE_PATH'])
+else:
+    _DISK_CACHE = None
+
+def get_disk_cache():
+    """Returns the on-disk cache used by get_data, or None."""
+    return _DISK_CACHE
+
+def set_disk_cache(cache):
+    """Replaces the on-disk cache used by get_data.
+
+    Args:
+        cache: DiskCache instance, or None to disable the on-disk cache.
+
+    Returns:
+        The previous on-disk cache.
+    """
+    global _DISK_CACHE  # pylint: disable=W0603
+    previous = _DISK_CACHE
+    _DISK_CACHE = cache
+    return previous
+
+# Requests are retried with backoff; set a RateLimiter to pace them too.
+_RATE_LIMITER = None
+_RETRY_POLICY = RetryPolicy()
+
+def get_rate_limiter():
+    """Returns the rate limiter pacing get_data, or None."""
+    return _RATE_LIMITER
+
+def set_rate_limiter(limiter):
+    """Replaces the rate limiter pacing get_data.
+
+    Args:
+        limiter: RateLimiter instance shared by every thread, or None to
+            send requests as fast as they come.
+
+    Returns:
+        The previous rate limiter.
+    """
+    global _RATE_LIMITER  # pylint: disable=W0603
+    previous = _RATE_LIMITER
+    _RATE_LIMITER = limiter
+    return previous
+
+def get_retry_policy():
+    """Returns the retry policy used by get_data, or None."""
+    return _RETRY_POLICY
+
+def set_retry_policy(policy):
+    """Replaces the retry policy used by get_data.
+
+    Args:
+        policy: RetryPolicy instance, or None to never retry.
+
+    Returns:
+        The previous retry policy.
+    """
+    global _RETRY_POLICY  # pylint: disable=W0603
+    previous = _RETRY_POLICY
+    _RETRY_POLICY = policy
+    return previous
+
+# Concurrent get_data calls for one URL share a single request.
+_SINGLE_FLIGHT = SingleFlight()
+
+def get_single_flight():
+    """Returns the request coalescer used by get_data, or None."""
+    return _SINGLE_FLIGHT
+
+def set_single_flight(flight):
+    """Replaces the request coalescer used by get_data.
+
+    Args:
+        flight: SingleFlight instance, or None to send every call's own
+            request.
+
+    Returns:
+        The previous request coalescer.
+    """
+    global _SINGLE_FLIGHT  # pylint: disable=W0603
+    previous = _SINGLE_FLIGHT
+    _SINGLE_FLIGHT = flight
+    return previous
+
+def get_data(url, transport=None):
     """Retrieves JSON data from TBA API
 
+    A fresh entry in the on-disk cache is returned without contacting the
+    API. Otherwise the request carries the validators of the cached copy, if
+    any, so unchanged data comes back as 304 Not Modified. Requests wait for
+    the rate limiter, if one is set, and throttled (429), failed (5xx) or
+    timed out requests are retried according to the retry policy. Calls
+    made while another thread's request for the same URL is in flight wait
+    for it and return its result.
+
+    Args:
+        url: string containing the API URL to retrieve.
+        transport: Transport to send the request over. Defaults to the
+            shared keep-alive transport.
+
+    Returns:
+        The decoded JSON data. When the API answers 304 Not Modified, or the
+        call was coalesced with another, the same decoded object is returned
+        again.
+
+    Raises:
+        Raises a ResourceUnavailableError if the API returns an error status,
+        an APIUnavailableError if the API can't be reached and an
+        UnexpectedDataError if the response isn't valid JSON.
+
+    """
+    if API_URL == '':
+        raise APPIDNotSetError()
+    if transport is None:
+        transport = _TRANSPORT
+    if _SINGLE_FLIGHT is not None:
+        return _SINGLE_FLIGHT.do((url, transport), _get_data, url, transport)
+    return _get_data(url, transport)
 
+def get_raw_data(url, transport=None):
+    """Retrieves the undecoded body of a TBA API response.
+
+    Like get_data, including the on-disk cache, the rate limiter, the retry
+    policy, coalescing and the metrics observers, but returns the JSON text
+    for callers that decode it elsewhere, such as worker processes. The
+    in-memory validation cache holds decoded data and isn't used.
 
     Args:
-        raw_data: string of json data
+        url: string containing the API URL to retrieve.
+        transport: Transport to send the request over. Defaults to the
+            shared keep-alive transport.
 
     Returns:
-        self
+        The response body as bytes, uncompressed.
 
     Raises:
-        Raises a KeyError if raw_data doesn't have proper formatting.
+        Raises a ResourceUnavailableError if the API returns an error status
+        and an APIUnavailableError if the API can't be reached.
+    """
+    if API_URL == '':
+        raise APPIDNotSetError()
+    if transport is None:
+        transport = _TRANSPORT
+    if _SINGLE_FLIGHT is not None:
+        return _SINGLE_FLIGHT.do((url, transport, bytes), _get_data, url,
+                                 transport, True)
+    return _get_data(url, transport, True)
+
+def _get_data(url, transport, raw=False):
+    """get_data, or get_raw_data if raw, without coalescing."""
+    fetch = _Fetch(url, raw)
+    if metrics.is_enabled():
+        return _get_data_observed(fetch, transport)
+    if fetch.is_fresh():
+        return fetch.cached_data()
+    return fetch.finish(_send(fetch, transport))
 
+def get_data_if_modified(url, etag=None, last_modified=None,
+                         transport=None):
+    """Retrieves JSON data from TBA API unless the given validators match.
+
+    Unlike get_data this neither reads nor fills the response caches, so
+    callers that keep their own copy, such as a SeasonStore, can revalidate
+    it across runs. Requests are paced and retried like get_data's.
+
+    Args:
+        url: string containing the API URL to retrieve.
+        etag: String containing the ETag of the copy held, or None.
+        last_modified: String containing the Last-Modified of the copy
+            held, or None.
+        transport: Transport to send the request over.
+
+    Returns:
+        A CacheEntry holding the decoded data and its new validators, or None
+        if the API answered 304 Not Modified.
+
+    Raises:
+        Raises the same exceptions as get_data.
     """
-    if API_URL is  '':
+    if API_URL == '':
         raise APPIDNotSetError()
-    req = urllib.request.Request(
-        url,
-        data=None,
-        headers={
+    if transport is None:
+        transport = _TRANSPORT
+    fetch = _Fetch.revalidating(url, etag, last_modified)
+    response = _send(fetch, transport)
+    if response.status == 304 and fetch.validated is not None:
+        return None
+    if response.status >= 300:
+        raise ResourceUnavailableError(url=url)
+    return CacheEntry(response.headers.get('ETag'),
+                      response.headers.get('Last-Modified'),
+                      _decode(url, response.body))
+
+def _get_data_observed(fetch, transport):
+    """get_data with every step timed and reported to the observers."""
+    observation = metrics.Observation(fetch.url)
+    try:
+        if fetch.is_fresh():
+            data = fetch.cached_data_observed(observation)
+        else:
+            sent = time.perf_counter()
+            response = _send(fetch, transport, observation)
+            data = fetch.finish_observed(observation, response, sent)
+    except Exception as error:
+        observation.done(error)
+        raise
+    observation.done()
+    return data
+
+def _send(fetch, transport, observation=None, request=None):
+    """Sends the request of fetch, paced and retried.
+
+    Args:
+        fetch: _Fetch of the request.
+        transport: Transport to send it over.
+        observation: metrics.Observation to record the attempts in, or None.
+        request: Function sending one attempt, taking the url, headers and
+            timings like Transport.request, which is the default. Streaming
+            callers pass one that leaves the body unread.
+
+    Returns:
+        The response of the last attempt, which may still have an error
+        status once the retry policy gives up.
+
+    Raises:
+        Raises an APIUnavailableError if the last attempt got no response,
+        and an UnexpectedDataError if its body can't be decompressed.
+    """
+    limiter, policy = _RATE_LIMITER, _RETRY_POLICY
+    if request is None:
+        request = transport.request
+    timings = observation.event.timings if observation is not None else None
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            _wait(limiter.reserve(), observation)
+        try:
+            response = request(fetch.url, headers=fetch.headers(),
+                               timings=timings)
+        except ContentDecodingError as error:
+            # The API answered with a body that can't be decompressed.
+            raise UnexpectedDataError(url=fetch.url) from error
+        except (http.client.HTTPException, OSError) as error:
+            delay = policy.delay(attempt) if policy is not None else None
+            if delay is None:
+                raise APIUnavailableError() from error
+        else:
+            delay = (policy.delay(attempt, response) if policy is not None
+                     else None)
+            if delay is None:
+                return response
+            if response.status == 429 and limiter is not None:
+                # Hold back every thread, not just this one; the limiter
+                # makes this request wait on the next attempt.
+                limiter.pause(delay)
+                delay = 0.0
+        if observation is not None:
+            observation.event.retries = attempt
+        _wait(delay, observation)
+
+def _wait(seconds, observation):
+    if seconds > 0:
+        started = time.perf_counter()
+        time.sleep(seconds)
+        if observation is not None:
+            observation.phase('wait', started)
+
+class _Fetch(object):
+    """Cache lookups and bookkeeping for a single get_data call.
+
+    Shared by the blocking and asyncio clients so both treat the caches the
+    same way; only sending the request differs between them. A raw fetch
+    returns undecoded bodies and skips the in-memory cache, whose entries
+    only hold decoded data.
+    """
+
+    def __init__(self, url, raw=False):
+        self.url = url
+        self.raw = raw
+        self.memory = None if raw else _VALIDATION_CACHE
+        self.disk = _DISK_CACHE
+        self.entry = self.memory.get(url) if self.memory is not None else None
+        self.stored = self.disk.get(url) if self.disk is not None else None
+        self.validated = self.stored if self.stored is not None else self.entry
+
+    @classmethod
+    def revalidating(cls, url, etag, last_modified):
+        """Returns a fetch sending the given validators, bypassing caches."""
+        fetch = cls.__new__(cls)
+        fetch.url = url
+        fetch.raw = False
+        fetch.memory = fetch.disk = fetch.entry = fetch.stored = None
+        fetch.validated = None
+        if etag or last_modified:
+            fetch.validated = CacheEntry(etag, last_modified, None)
+        return fetch
+
+    def is_fresh(self):
+        """Returns whether the on-disk copy can be used without a request."""
+        return self.stored is not None and self.stored.is_fresh()
+
+    def headers(self):
+        """Returns the request headers, including any validators."""
+        headers = {
             'X-TBA-App-Id': API_APPID
         }
-    )
+        if self.validated is not None:
+            headers.update(self.validated.validators())
+        return headers
+
+    def cached_data(self):
+        """Returns the decoded on-disk copy."""
+        if self.raw:
+            return self.stored.data
+        # Reuse the decoded copy in memory when it is the same version as the
+        # body on disk.
+        entry, stored = self.entry, self.stored
+        if entry is not None and entry.validators() and (
+                entry.validators() == stored.validators()):
+            return entry.data
+        data = _decode(self.url, stored.data)
+        if self.memory is not None:
+            self.memory.store(self.url, stored.etag, stored.last_modified,
+                              data)
+        return data
+
+    def cached_data_observed(self, observation):
+        """cached_data, timing the decoding in observation."""
+        observation.event.cache = 'fresh'
+        started = time.perf_counter()
+        data = self.cached_data()
+        observation.phase('parse', started)
+        return data
+
+    def finish_observed(self, observation, response, sent):
+        """finish, recording the response and its decoding in observation.
 
+        Args:
+            observation: metrics.Observation of this fetch.
+            response: transport Response for this URL.
+            sent: perf_counter() value from just before the request.
+        """
+        observation.sent(response, sent)
+        if response.status < 300:
+            observation.event.cache = 'miss'
+        elif response.status == 304 and self.validated is not None:
+            observation.event.cache = 'revalidated'
+        started = time.perf_counter()
+        data = self.finish(response)
+        observation.phase('parse', started)
+        return data
+
+    def finish(self, response):
+        """Decodes response, or returns the cached copy it validated.
+
+        Args:
+            response: transport Response for this URL.
+
+        Returns:
+            The decoded JSON data.
+
+        Raises:
+            Raises a ResourceUnavailableError if the API returned an error
+            status and an UnexpectedDataError if the body isn't valid JSON.
+        """
+        if response.status == 304 and self.validated is not None:
+            if self.stored is not None:
+                self.disk.touch(self.url)
+                return self.cached_data()
+            return self.entry.data
+        if response.status >= 300:
+            raise ResourceUnavailableError(url=self.url)
+        data = response.body if self.raw else _decode(self.url,
+                                                      response.body)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if self.memory is not None:
+            self.memory.store(self.url, etag, last_modified, data)
+        if self.disk is not None:
+            gzipped = None
+            if response.raw_body is not response.body and (
+                    response.headers.get('Content-Encoding') == 'gzip'):
+                gzipped = response.raw_body
+            self.disk.store(self.url, etag, last_modified, response.body,
+                            gzipped)
+        return data
+
+def _decode(url, body):
     try:
-        response = urllib.request.urlopen(req)
-        str_response = response.readall().decode('utf-8')
-        return json.loads(str_response)
-    except urllib.error.HTTPError:
-        raise ResourceUnavailableError(url=url)
-    except urllib.error.URLError:
-        raise APIUnavailableError()
+        return json.loads(body.decode('utf-8'))
     except ValueError:
         raise UnexpectedDataError(url=url)
@@ -0,0 +1,450 @@
+"""This script provides an asyncio client for The Blue Alliance API
+
+The fetch functions mirror the blocking get_* methods of Event, Team and
+Match and fill the same models through their *_from_raw_data parsers, so
+many requests can run concurrently on one event loop:
+
+    event = await fetch_event('2015scmb')
+    await asyncio.gather(fetch_event_teams(event), fetch_event_matches(event))
+"""
+
+import asyncio
+import http.client
+import io
+import time
+import urllib.parse
+
+import TBApython
+from TBApython import _Fetch
+from TBApython import metrics
+from TBApython.coalesce import AsyncSingleFlight
+from TBApython.exceptions import APIUnavailableError
+from TBApython.exceptions import APPIDNotSetError
+from TBApython.exceptions import UnexpectedDataError
+from TBApython.identity import resolve
+from TBApython.transport import ACCEPT_ENCODING
+from TBApython.transport import ContentDecodingError
+from TBApython.transport import DEFAULT_POOL_SIZE
+from TBApython.transport import DEFAULT_TIMEOUT
+from TBApython.transport import MAX_REDIRECTS
+from TBApython.transport import REDIRECT_STATUSES
+from TBApython.transport import Response
+
+DEFAULT_LIMIT = 10
+
+
+class AsyncTransport(object):
+    """Pool of keep-alive HTTP connections for asyncio callers.
+
+    At most limit requests are in flight at once; the rest wait for a slot.
+    Connections belong to the event loop that opened them, so the pool is
+    emptied when it is used from a different loop.
+
+    Attributes:
+        limit: Integer containing the maximum number of concurrent requests.
+        pool_size: Integer containing the number of idle connections kept per
+            host.
+        timeout: Float containing the timeout in seconds of each request, or
+            None to wait indefinitely.
+    """
+
+    def __init__(self, limit=DEFAULT_LIMIT, pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT):
+        self.limit = limit
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pools = {}
+        self._loop = None
+        self._semaphore = None
+
+    def __repr__(self):
+        return "AsyncTransport(limit=%s)" % self.limit
+
+    async def request(self, url, headers=None, timings=None):
+        """Performs a GET request over a pooled connection.
+
+        Args:
+            url: String containing the absolute URL to retrieve.
+            headers: Dictionary of request headers.
+            timings: Dictionary to add the seconds spent opening a new
+                connection to, as 'connect', or None. The host lookup is
+                included in it.
+
+        Returns:
+            A Response containing the status, headers and body.
+
+        Raises:
+            Raises an OSError, asyncio.TimeoutError or
+            http.client.HTTPException if the host can't be reached.
+        """
+        self._bind_loop()
+        async with self._semaphore:
+            for _ in range(MAX_REDIRECTS):
+                response = await asyncio.wait_for(
+                    self._request_once(url, headers, timings), self.timeout)
+                location = response.headers.get('Location')
+                if response.status not in REDIRECT_STATUSES or not location:
+                    return response
+                url = urllib.parse.urljoin(url, location)
+            return await asyncio.wait_for(
+                self._request_once(url, headers, timings), self.timeout)
+
+    def close(self):
+        """Closes every idle connection held by the pool."""
+        for pool in self._pools.values():
+            for _, writer in pool:
+                writer.close()
+        self._pools.clear()
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            if self._loop is not None and self._loop.is_closed():
+                # Connections of a closed loop can't be closed any more.
+                self._pools.clear()
+            self.close()
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+    async def _request_once(self, url, headers, timings=None):
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError("Unsupported URL scheme: %s" % url)
+        port = parts.port or (443 if scheme == 'https' else 80)
+        host_key = (scheme, parts.hostname, port)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        lines = ['GET %s HTTP/1.1' % path, 'Host: %s' % parts.netloc]
+        headers = headers or {}
+        if not any(name.lower() == 'accept-encoding' for name in headers):
+            lines.append('Accept-Encoding: %s' % ACCEPT_ENCODING)
+        for name, value in headers.items():
+            lines.append('%s: %s' % (name, value))
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        pool = self._pools.setdefault(host_key, [])
+        if pool:
+            reader, writer = pool.pop()
+            try:
+                response, keep_alive = await _exchange(reader, writer,
+                                                       request)
+            except (http.client.HTTPException, OSError,
+                    asyncio.IncompleteReadError):
+                # The server closed the idle connection; retry on a new one.
+                writer.close()
+            except BaseException:
+                writer.close()
+                raise
+            else:
+                self._release(host_key, reader, writer, keep_alive)
+                return response
+        started = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=(scheme == 'https') or None)
+        if timings is not None:
+            timings['connect'] = timings.get('connect', 0.0) + (
+                time.perf_counter() - started)
+        try:
+            response, keep_alive = await _exchange(reader, writer, request)
+        except asyncio.IncompleteReadError:
+            writer.close()
+            raise http.client.IncompleteRead(b'')
+        except BaseException:
+            writer.close()
+            raise
+        self._release(host_key, reader, writer, keep_alive)
+        return response
+
+    def _release(self, host_key, reader, writer, keep_alive):
+        pool = self._pools.setdefault(host_key, [])
+        if keep_alive and len(pool) < self.pool_size:
+            pool.append((reader, writer))
+        else:
+            writer.close()
+
+
+async def _exchange(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise http.client.RemoteDisconnected('Connection closed by server')
+    parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+    try:
+        version, status = parts[0], int(parts[1])
+    except (IndexError, ValueError):
+        raise http.client.BadStatusLine(status_line)
+    reason = parts[2] if len(parts) > 2 else ''
+    header_lines = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        header_lines.append(line)
+    headers = http.client.parse_headers(io.BytesIO(b''.join(header_lines)
+                                                   + b'\r\n'))
+
+    keep_alive = (version == 'HTTP/1.1' and
+                  headers.get('Connection', '').lower() != 'close')
+    if status in (204, 304) or 100 <= status < 200:
+        body = b''
+    elif headers.get('Transfer-Encoding', '').lower() == 'chunked':
+        body = await _read_chunked(reader)
+    elif headers.get('Content-Length') is not None:
+        body = await reader.readexactly(int(headers['Content-Length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+    return Response.decoded(status, reason, headers, body), keep_alive
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b';', 1)[0].strip(), 16)
+        if size == 0:
+            # Skip any trailers up to the final empty line.
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readline()
+
+
+_TRANSPORT = AsyncTransport()
+
+
+def get_transport():
+    """Returns the transport used by get_data_async when none is given."""
+    return _TRANSPORT
+
+
+def set_transport(transport):
+    """Replaces the transport used by get_data_async when none is given.
+
+    Args:
+        transport: AsyncTransport instance, for example one with a larger
+            limit.
+
+    Returns:
+        The previous transport.
+    """
+    global _TRANSPORT  # pylint: disable=W0603
+    previous = _TRANSPORT
+    _TRANSPORT = transport
+    return previous
+
+
+_SINGLE_FLIGHT = AsyncSingleFlight()
+
+
+def get_single_flight():
+    """Returns the request coalescer used by get_data_async, or None."""
+    return _SINGLE_FLIGHT
+
+
+def set_single_flight(flight):
+    """Replaces the request coalescer used by get_data_async.
+
+    Args:
+        flight: AsyncSingleFlight instance, or None to send every call's
+            own request.
+
+    Returns:
+        The previous request coalescer.
+    """
+    global _SINGLE_FLIGHT  # pylint: disable=W0603
+    previous = _SINGLE_FLIGHT
+    _SINGLE_FLIGHT = flight
+    return previous
+
+
+async def get_data_async(url, transport=None):
+    """Retrieves JSON data from TBA API without blocking the event loop.
+
+    Behaves like get_data, including the validation and on-disk caches, the
+    rate limiter, the retry policy and coalescing concurrent calls for the
+    same URL. On-disk cache lookups and writes run in the event loop's
+    default executor.
+
+    Args:
+        url: string containing the API URL to retrieve.
+        transport: AsyncTransport to send the request over. Defaults to the
+            shared one.
+
+    Returns:
+        The decoded JSON data.
+
+    Raises:
+        Raises a ResourceUnavailableError if the API returns an error status,
+        an APIUnavailableError if the API can't be reached and an
+        UnexpectedDataError if the response isn't valid JSON.
+    """
+    if TBApython.API_URL == '':
+        raise APPIDNotSetError()
+    if transport is None:
+        transport = _TRANSPORT
+    if _SINGLE_FLIGHT is not None:
+        return await _SINGLE_FLIGHT.do((url, transport), _get_data_async,
+                                       url, transport)
+    return await _get_data_async(url, transport)
+
+
+async def _get_data_async(url, transport):
+    if TBApython.get_disk_cache() is None:
+        fetch = _Fetch(url)
+    else:
+        fetch = await _in_thread(_Fetch, url)
+    if metrics.is_enabled():
+        return await _get_data_async_observed(fetch, transport)
+    if fetch.is_fresh():
+        return await _cache_step(fetch, fetch.cached_data)
+    return await _cache_step(fetch, fetch.finish,
+                             await _send(fetch, transport))
+
+
+async def _get_data_async_observed(fetch, transport):
+    """get_data_async with every step timed and reported to the observers."""
+    observation = metrics.Observation(fetch.url)
+    try:
+        if fetch.is_fresh():
+            data = await _cache_step(fetch, fetch.cached_data_observed,
+                                     observation)
+        else:
+            sent = time.perf_counter()
+            response = await _send(fetch, transport, observation)
+            data = await _cache_step(fetch, fetch.finish_observed,
+                                     observation, response, sent)
+    except Exception as error:
+        observation.done(error)
+        raise
+    observation.done()
+    return data
+
+
+async def _cache_step(fetch, function, *args):
+    # The on-disk cache reads and writes SQLite, which would block the
+    # event loop; with only the memory cache the step runs inline.
+    if fetch.disk is None:
+        return function(*args)
+    return await _in_thread(function, *args)
+
+
+async def _in_thread(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, function,
+                                                            *args)
+
+
+async def _send(fetch, transport, observation=None):
+    """Async version of TBApython._send, sleeping without blocking."""
+    limiter = TBApython.get_rate_limiter()
+    policy = TBApython.get_retry_policy()
+    timings = observation.event.timings if observation is not None else None
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            await _wait(limiter.reserve(), observation)
+        try:
+            response = await transport.request(
+                fetch.url, headers=fetch.headers(), timings=timings)
+        except ContentDecodingError as error:
+            raise UnexpectedDataError(url=fetch.url) from error
+        except (http.client.HTTPException, OSError,
+                asyncio.TimeoutError) as error:
+            delay = policy.delay(attempt) if policy is not None else None
+            if delay is None:
+                raise APIUnavailableError() from error
+        else:
+            delay = (policy.delay(attempt, response) if policy is not None
+                     else None)
+            if delay is None:
+                return response
+            if response.status == 429 and limiter is not None:
+                limiter.pause(delay)
+                delay = 0.0
+        if observation is not None:
+            observation.event.retries = attempt
+        await _wait(delay, observation)
+
+
+async def _wait(seconds, observation):
+    if seconds > 0:
+        started = time.perf_counter()
+        await asyncio.sleep(seconds)
+        if observation is not None:
+            observation.phase('wait', started)
+
+
+async def fetch_event(key):
+    """Returns the Event with the given key."""
+    from TBApython.event import Event
+
+    event = resolve(Event, key.lower())
+    event.url = TBApython.API_URL + 'event/' + event.key
+    return event.event_from_raw_data(await get_data_async(event.url))
+
+
+async def fetch_event_teams(event):
+    """Async version of Event.get_teams. Returns the event."""
+    return event.teams_from_raw_data(await get_data_async(event.teams_url()))
+
+
+async def fetch_event_matches(event):
+    """Async version of Event.get_matches. Returns the event."""
+    return event.matches_from_raw_data(
+        await get_data_async(event.matches_url()))
+
+
+async def fetch_event_awards(event):
+    """Async version of Event.get_awards. Returns the event."""
+    return event.awards_from_raw_data(
+        await get_data_async(event.awards_url()))
+
+
+async def fetch_event_stats(event):
+    """Async version of Event.get_stats. Returns the event."""
+    return event.stats_from_raw_data(await get_data_async(event.stats_url()))
+
+
+async def fetch_team(key):
+    """Returns the Team with the given key."""
+    from TBApython.team import Team
+
+    team = resolve(Team, key.lower())
+    team.url = TBApython.API_URL + 'team/' + team.key
+    return team.team_from_raw_data(await get_data_async(team.url))
+
+
+async def fetch_team_events(team, year=None):
+    """Async version of Team.get_events. Returns the team."""
+    return team.events_from_raw_data(
+        await get_data_async(team.events_url(year)))
+
+
+async def fetch_team_matches(team, event_key):
+    """Async version of Team.get_matches. Returns the team."""
+    return team.matches_from_raw_data(
+        await get_data_async(team.matches_url(event_key)), [event_key])
+
+
+async def fetch_team_awards(team, event_key=None):
+    """Async version of Team.get_awards. Returns the team."""
+    return team.awards_from_raw_data(
+        await get_data_async(team.awards_url(event_key)))
+
+
+async def fetch_team_years_participated(team):
+    """Async version of Team.get_years_participated. Returns the team."""
+    return team.years_participated_from_raw_data(
+        await get_data_async(team.years_participated_url()))
+
+
+async def fetch_match(key):
+    """Returns the Match with the given key."""
+    from TBApython.match import Match
+
+    match = resolve(Match, key.lower())
+    match.url = TBApython.API_URL + 'match/' + match.key
+    return match.match_from_raw_data(await get_data_async(match.url))
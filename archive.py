@@ -0,0 +1,319 @@
+"""This script stores match history from The Blue Alliance API in a compact
+binary file that is memory-mapped instead of parsed
+
+Every column of a MatchTable is written as a fixed-width little-endian
+array, and strings such as event and team keys go to a string table. Opening an
+archive only reads a small header; the columns are views of the mapped
+file, so a decade of matches opens in milliseconds and pages are read from
+disk only when touched. It needs NumPy:
+
+    write_archive('history.tba', table, events=events, teams=teams)
+    with MatchArchive('history.tba') as archive:
+        table = archive.matches
+        print(table.select(table.for_team(281)).team_average_scores())
+
+File layout: the magic bytes, the header length as a little-endian uint64,
+a JSON header describing every column, then the columns, each starting on
+a 64 byte boundary.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy
+
+from TBApython.table import MatchTable
+
+MAGIC = b'TBAARCH1'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+MATCH_COLUMNS = ('event_index', 'comp_level', 'set_number', 'match_number',
+                 'time', 'red_teams', 'blue_teams', 'red_score',
+                 'blue_score')
+EVENT_NUMBERS = ('year', 'event_type')
+EVENT_STRINGS = ('key', 'name', 'short_name', 'location', 'start_date',
+                 'end_date')
+TEAM_NUMBERS = ('team_number', 'rookie_year')
+TEAM_STRINGS = ('nickname', 'name', 'location')
+# Stored for missing numbers, like NO_TIME and NO_SCORE in MatchTable.
+MISSING = -1
+_HEADER_LENGTH = struct.Struct('<Q')
+
+
+class ArchiveFormatError(ValueError):
+    """Raised when a file isn't a match archive this version can read."""
+
+
+class StringColumn(object):
+    """Read-only sequence of strings stored in an archive's string table.
+
+    Strings are decoded one at a time on access. Missing strings are None.
+    """
+
+    def __init__(self, bounds, data):
+        self._bounds = bounds
+        self._data = data
+
+    def __repr__(self):
+        return "StringColumn(%d strings)" % len(self)
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[index] for index in range(*position.indices(
+                len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        start, end = self._bounds[position]
+        if end < start:
+            return None
+        return bytes(self._data[start:end]).decode('utf-8')
+
+    def tolist(self):
+        """Returns every string decoded, as a list."""
+        return self[:]
+
+
+class MatchArchive(object):
+    """Memory-mapped match archive written by write_archive.
+
+    Attributes:
+        path: String containing the path of the archive file.
+        matches: MatchTable whose columns are views of the mapped file.
+        events: Dictionary of event columns: NumPy arrays for year and
+            event_type, StringColumns for key, name, short_name, location,
+            start_date and end_date. Empty if no events were written.
+        teams: Dictionary of team columns: NumPy arrays for team_number and
+            rookie_year, StringColumns for nickname, name and location.
+            Empty if no teams were written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as archive:
+            self._map = mmap.mmap(archive.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        try:
+            self._header = _read_header(self._map)
+            sections = self._header['sections']
+            self.events = self._section(sections.get('events', {}))
+            self.teams = self._section(sections.get('teams', {}))
+            matches = self._section(sections['matches'])
+        except (KeyError, TypeError, ValueError) as error:
+            self._map.close()
+            if isinstance(error, ArchiveFormatError):
+                raise
+            raise ArchiveFormatError("Malformed archive header: %s" % error)
+        self.matches = MatchTable(matches['event_keys'].tolist(),
+                                  matches['team_keys'].tolist(),
+                                  *[matches[name] for name in MATCH_COLUMNS])
+
+    def __repr__(self):
+        return "MatchArchive(%s, %d matches)" % (self.path, len(self.matches))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def to_matches(self):
+        """Returns every archived match as a Match model."""
+        return self.matches.to_matches()
+
+    def to_events(self):
+        """Returns every archived event as an Event model holding the
+        archived fields."""
+        from TBApython.event import Event
+
+        return _to_models(Event, self.events, EVENT_NUMBERS, EVENT_STRINGS)
+
+    def to_teams(self):
+        """Returns every archived team as a Team model holding the archived
+        fields."""
+        from TBApython.team import Team
+
+        teams = _to_models(Team, self.teams, TEAM_NUMBERS, TEAM_STRINGS)
+        for team in teams:
+            team.key = 'frc%d' % team.team_number
+        return teams
+
+    def close(self):
+        """Unmaps the file. Arrays taken from the archive must not be used
+        afterwards."""
+        self.matches = None
+        self.events = self.teams = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # NumPy views still reference the map; it closes with them.
+            pass
+
+    def _section(self, section):
+        columns = {}
+        for name, column in section.items():
+            if column.get('strings'):
+                columns[name] = StringColumn(self._array(column['bounds']),
+                                             self._array(column['data']))
+            else:
+                columns[name] = self._array(column)
+        return columns
+
+    def _array(self, column):
+        dtype = numpy.dtype(column['dtype'])
+        shape = tuple(column['shape'])
+        count = int(numpy.prod(shape)) if shape else 1
+        if count == 0:
+            # An empty column may sit past the end of the file.
+            return numpy.empty(shape, dtype=dtype)
+        return numpy.frombuffer(self._map, dtype=dtype, count=count,
+                                offset=column['offset']).reshape(shape)
+
+
+def write_archive(path, matches, events=(), teams=()):
+    """Writes matches, and optionally events and teams, to an archive.
+
+    The file is written next to path and renamed over it once complete, so
+    readers never see a partial archive.
+
+    Args:
+        path: String containing the path of the archive file.
+        matches: MatchTable, or list of Match models.
+        events: Iterable of Event models.
+        teams: Iterable of Team models.
+
+    Returns:
+        The number of bytes written.
+    """
+    if not isinstance(matches, MatchTable):
+        matches = MatchTable.from_matches(matches)
+    events, teams = list(events), list(teams)
+    sections = {
+        'matches': dict([('event_keys', _strings(matches.event_keys)),
+                         ('team_keys', _strings(matches.team_keys))] + [
+            (name, getattr(matches, name)) for name in MATCH_COLUMNS]),
+    }
+    if events:
+        sections['events'] = _model_columns(events, EVENT_NUMBERS,
+                                            EVENT_STRINGS)
+    if teams:
+        sections['teams'] = _model_columns(teams, TEAM_NUMBERS, TEAM_STRINGS)
+
+    # Lay out every array, then write the header followed by the data.
+    arrays = []
+    header_sections = {}
+    for section, columns in sections.items():
+        described = header_sections[section] = {}
+        for name, column in columns.items():
+            if isinstance(column, tuple):
+                bounds, data = column
+                described[name] = {'strings': True,
+                                   'bounds': _describe(bounds, arrays),
+                                   'data': _describe(data, arrays)}
+            else:
+                described[name] = _describe(column, arrays)
+    header = {'version': FORMAT_VERSION, 'sections': header_sections}
+    # Offsets depend on the header length, which depends on the offsets'
+    # digits; lay out again until the header fits before the first column.
+    encoded = json.dumps(header).encode('utf-8')
+    while True:
+        start = _align(len(MAGIC) + _HEADER_LENGTH.size + len(encoded))
+        position = start
+        for array, description in arrays:
+            description['offset'] = position
+            position = _align(position + array.nbytes)
+        encoded = json.dumps(header).encode('utf-8')
+        if len(MAGIC) + _HEADER_LENGTH.size + len(encoded) <= start:
+            break
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as archive:
+        archive.write(MAGIC)
+        archive.write(_HEADER_LENGTH.pack(len(encoded)))
+        archive.write(encoded)
+        for array, description in arrays:
+            archive.write(b'\0' * (description['offset'] - archive.tell()))
+            archive.write(numpy.ascontiguousarray(array).tobytes())
+        size = archive.tell()
+    os.replace(temporary, path)
+    return size
+
+
+def _read_header(archive):
+    if archive[:len(MAGIC)] != MAGIC:
+        raise ArchiveFormatError("Not a match archive")
+    length, = _HEADER_LENGTH.unpack_from(archive, len(MAGIC))
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    header = json.loads(archive[start:start + length].decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION:
+        raise ArchiveFormatError("Unsupported archive version %s" %
+                                 header.get('version'))
+    return header
+
+
+def _describe(array, arrays):
+    # Columns are stored little-endian whatever the machine's byte order.
+    array = numpy.asarray(array)
+    dtype = array.dtype.newbyteorder('<') if array.dtype.byteorder in (
+        '>', '=') and array.dtype.itemsize > 1 else array.dtype
+    array = array.astype(dtype, copy=False)
+    description = {'dtype': dtype.str, 'shape': list(array.shape)}
+    arrays.append((array, description))
+    return description
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _strings(values):
+    # Each string is a (start, end) pair of byte offsets into data; a
+    # missing string is stored as (0, -1) to tell it apart from an empty
+    # one.
+    bounds = numpy.zeros((len(values), 2), dtype=numpy.int64)
+    chunks = []
+    position = 0
+    for index, value in enumerate(values):
+        if value is None:
+            bounds[index] = (0, -1)
+            continue
+        encoded = str(value).encode('utf-8')
+        chunks.append(encoded)
+        bounds[index] = (position, position + len(encoded))
+        position += len(encoded)
+    return bounds, numpy.frombuffer(b''.join(chunks), dtype=numpy.uint8)
+
+
+def _model_columns(models, numbers, strings):
+    columns = {}
+    for name in numbers:
+        values = [getattr(model, name, None) for model in models]
+        columns[name] = numpy.array([MISSING if value is None else value
+                                     for value in values], dtype=numpy.int32)
+    for name in strings:
+        columns[name] = _strings([getattr(model, name, None)
+                                  for model in models])
+    return columns
+
+
+def _to_models(cls, columns, numbers, strings):
+    if not columns:
+        return []
+    count = len(columns[numbers[0]])
+    decoded = {name: columns[name].tolist() for name in strings}
+    models = []
+    for position in range(count):
+        model = cls()
+        for name in numbers:
+            value = int(columns[name][position])
+            setattr(model, name, None if value == MISSING else value)
+        for name in strings:
+            setattr(model, name, decoded[name][position])
+        models.append(model)
+    return models
@@ -23,6 +23,8 @@ class Award(object):
 
     """
 
+    __slots__ = ('name', 'award_type', 'event_key', 'recipient_list', 'year')
+
     def __init__(self):
         self.name = None
         self.award_type = None
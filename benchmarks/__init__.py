@@ -0,0 +1,9 @@
+"""Benchmarks for the TBA API Module
+
+Run a benchmark as a module, for example:
+    python -m TBApython.benchmarks.bench_transport
+
+The full suite runs against a local MockServer and can save and compare
+JSON reports:
+    python -m TBApython.benchmarks.suite --output results.json
+"""
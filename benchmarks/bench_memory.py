@@ -0,0 +1,81 @@
+"""Compares the per-instance memory of the slotted models against the
+dict-backed layout they used before.
+"""
+
+import gc
+import tracemalloc
+
+from TBApython.award import Award
+from TBApython.event import Event
+from TBApython.match import Match
+from TBApython.team import Team
+
+COUNT = 20000
+
+RAW_MATCH = {
+    'key': '2015scmb_qm1', 'comp_level': 'qm', 'set_number': 1,
+    'match_number': 1, 'event_key': '2015scmb', 'time': 1425571200,
+    'time_string': '9:00 AM', 'videos': [], 'score_breakdown': None,
+    'alliances': {'red': {'teams': ['frc281', 'frc1876', 'frc4451'],
+                          'score': 98},
+                  'blue': {'teams': ['frc342', 'frc2059', 'frc3490'],
+                           'score': 87}},
+}
+
+
+class DictBacked(object):
+    """Stand-in with the models' attributes stored in an instance dict."""
+
+    # pylint: disable=R0903
+
+
+def dict_backed_copy(model):
+    """Returns a DictBacked object with the same attributes as model."""
+    copy = DictBacked()
+    for name in type(model).__slots__:
+        if name != '__weakref__':
+            setattr(copy, name, getattr(model, name, None))
+    return copy
+
+
+def bytes_per_instance(factory, count=COUNT):
+    """Returns the bytes allocated per object built by factory."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    # Exclude the list holding the objects.
+    return (after - before - 8 * count) / count
+
+
+def main():
+    """Prints the per-instance size of each model in both layouts."""
+    templates = {
+        'Match': Match().match_from_raw_data(RAW_MATCH),
+        'Team': Team(),
+        'Event': Event(),
+        'Award': Award(),
+    }
+    print("%-8s %10s %10s %8s" % ('model', 'dict', 'slots', 'saved'))
+    for name, template in templates.items():
+        cls = type(template)
+
+        def slotted(template=template, cls=cls):
+            model = cls.__new__(cls)
+            for attr in cls.__slots__:
+                if attr != '__weakref__':
+                    setattr(model, attr, getattr(template, attr, None))
+            return model
+
+        dict_size = bytes_per_instance(lambda t=template: dict_backed_copy(t))
+        slots_size = bytes_per_instance(slotted)
+        print("%-8s %9.0fB %9.0fB %7.0f%%" % (
+            name, dict_size, slots_size,
+            100.0 * (dict_size - slots_size) / dict_size))
+
+
+if __name__ == '__main__':
+    main()
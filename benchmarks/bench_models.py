@@ -0,0 +1,237 @@
+"""Compares building Match and Event models through their parsers, as
+match_from_raw_data and event_from_raw_data did before the from_raw_data
+classmethods and field projection, against those.
+
+Time is measured for parsing already decoded json data. Retained memory is
+what the models still hold once the decoded response has been dropped, as
+happens when the validation cache is disabled.
+"""
+
+import copy
+import gc
+import json
+import timeit
+import tracemalloc
+
+from TBApython.event import Event
+from TBApython.match import Match
+
+COUNT = 5000
+REPEAT = 100
+
+RAW_MATCH = {
+    'key': '2016scmb_qm1', 'comp_level': 'qm', 'set_number': 1,
+    'match_number': 1, 'event_key': '2016scmb', 'time': 1456934400,
+    'time_string': '9:00 AM',
+    'videos': [{'key': 'xswGjxzNEoY', 'type': 'youtube'}],
+    'alliances': {'red': {'teams': ['frc281', 'frc1876', 'frc4451'],
+                          'score': 98},
+                  'blue': {'teams': ['frc342', 'frc2059', 'frc3490'],
+                           'score': 87}},
+    'score_breakdown': {
+        color: {'autoPoints': 10, 'autoBouldersLow': 0,
+                'autoBouldersHigh': 1, 'autoCrossingPoints': 10,
+                'autoReachPoints': 0, 'teleopPoints': 60,
+                'teleopBouldersLow': 2, 'teleopBouldersHigh': 6,
+                'teleopCrossingPoints': 25, 'teleopChallengePoints': 5,
+                'teleopScalePoints': 15, 'breachPoints': 0,
+                'capturePoints': 0, 'foulCount': 1, 'techFoulCount': 0,
+                'foulPoints': 5, 'position1crossings': 2,
+                'position2': 'A_ChevalDeFrise', 'position2crossings': 2,
+                'position3': 'B_Ramparts', 'position3crossings': 1,
+                'position4': 'C_SallyPort', 'position4crossings': 1,
+                'position5': 'D_RockWall', 'position5crossings': 2,
+                'robot1Auto': 'Crossed', 'robot2Auto': 'Reached',
+                'robot3Auto': 'None', 'towerEndStrength': 2,
+                'towerFaceA': 'None', 'towerFaceB': 'Challenged',
+                'towerFaceC': 'Scaled', 'totalPoints': 98}
+        for color in ('red', 'blue')},
+}
+
+RAW_EVENT = {
+    'key': '2016scmb', 'website': 'http://www.scfirst.org',
+    'official': True, 'end_date': '2016-03-05', 'name': 'Palmetto Regional',
+    'short_name': 'Palmetto', 'facebook_eid': None,
+    'event_district_string': None, 'event_district': 0,
+    'venue_address': 'Myrtle Beach Convention Center\n2101 N. Oak Street'
+                     '\nMyrtle Beach, SC 29577\nUSA',
+    'location': 'Myrtle Beach, SC, USA', 'event_code': 'scmb', 'year': 2016,
+    'webcast': [{'type': 'twitch', 'channel': 'firstinspires%d' % number}
+                for number in range(3)],
+    'alliances': [{'picks': ['frc%d' % (number * 3 + pick)
+                             for pick in range(3)], 'declines': []}
+                  for number in range(8)],
+    'event_type_string': 'Regional', 'start_date': '2016-03-02',
+    'event_type': 0,
+}
+
+MATCH_PROJECTION = ('key', 'comp_level', 'set_number', 'match_number',
+                    'alliances', 'time')
+EVENT_PROJECTION = ('key', 'name', 'year', 'start_date', 'end_date')
+
+
+class EagerMatch(object):
+    """Match as it was before from_raw_data and projection."""
+
+    # pylint: disable=R0902, R0903
+
+    __slots__ = ('key', 'comp_level', 'set_number', 'match_number',
+                 'alliances', 'score_breakdown', 'event_key', 'videos',
+                 'time_string', 'time', 'url', '__weakref__')
+
+    def __init__(self):
+        self.key = None
+        self.comp_level = None
+        self.set_number = None
+        self.match_number = None
+        self.alliances = None
+        self.score_breakdown = None
+        self.event_key = None
+        self.videos = None
+        self.time_string = None
+        self.time = None
+        self.url = None
+
+    def match_from_raw_data(self, raw_data):
+        """Copies every field, as match_from_raw_data used to."""
+        self.comp_level = raw_data['comp_level']
+        self.match_number = raw_data['match_number']
+        self.videos = raw_data['videos']
+        self.time_string = raw_data['time_string']
+        self.set_number = raw_data['set_number']
+        self.key = raw_data['key']
+        self.time = raw_data['time']
+        self.score_breakdown = raw_data['score_breakdown']
+        self.alliances = raw_data['alliances']
+        self.event_key = raw_data['event_key']
+        return self
+
+
+class EagerEvent(object):
+    """Event as it was before from_raw_data and projection."""
+
+    # pylint: disable=R0902, R0903
+
+    __slots__ = ('key', 'name', 'short_name', 'event_code',
+                 'event_type_string', 'event_type', 'event_district_string',
+                 'event_district', 'year', 'location', 'venue_address',
+                 'website', 'official', '_teams', '_matches', '_awards',
+                 'webcast', 'alliances', 'district_points', 'stats',
+                 'start_date', 'end_date', 'facebook_eid', 'url',
+                 '__weakref__')
+
+    def __init__(self):
+        self.key = None
+        self.url = None
+        self._teams = None
+        self._matches = None
+        self._awards = None
+        self.district_points = None
+        self.stats = None
+        self.name = None
+        self.short_name = None
+        self.event_code = None
+        self.event_type_string = None
+        self.event_type = None
+        self.event_district_string = None
+        self.event_district = None
+        self.year = None
+        self.location = None
+        self.venue_address = None
+        self.website = None
+        self.official = None
+        self.webcast = None
+        self.alliances = None
+        self.start_date = None
+        self.end_date = None
+        self.facebook_eid = None
+
+    def event_from_raw_data(self, raw_data):
+        """Copies every field, as event_from_raw_data used to."""
+        self.key = raw_data['key']
+        self.website = raw_data['website']
+        self.official = raw_data['official']
+        self.end_date = raw_data['end_date']
+        self.name = raw_data['name']
+        self.short_name = raw_data['short_name']
+        self.facebook_eid = raw_data['facebook_eid']
+        self.event_district_string = raw_data['event_district_string']
+        self.venue_address = raw_data['venue_address']
+        self.event_district = raw_data['event_district']
+        self.location = raw_data['location']
+        self.event_code = raw_data['event_code']
+        self.year = raw_data['year']
+        self.webcast = raw_data['webcast']
+        self.alliances = raw_data['alliances']
+        self.event_type_string = raw_data['event_type_string']
+        self.start_date = raw_data['start_date']
+        self.event_type = raw_data['event_type']
+        return self
+
+
+def payload(template, count=COUNT):
+    """Returns count distinct decoded copies of template, as from the API."""
+    return json.loads(json.dumps([copy.deepcopy(template)] * count))
+
+
+def seconds(builds, raw):
+    """Returns the best time of REPEAT runs of each build over raw.
+
+    The builds take turns so a slow patch of the machine affects them all.
+    """
+    best = [float('inf')] * len(builds)
+    for _ in range(REPEAT):
+        for position, build in enumerate(builds):
+            elapsed = timeit.timeit(lambda: [build(item) for item in raw],
+                                    number=1)
+            best[position] = min(best[position], elapsed)
+    return best
+
+
+def retained_bytes(build, template):
+    """Returns the bytes per model still allocated once the decoded
+    response is dropped."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    raw = payload(template)
+    models = [build(item) for item in raw]
+    del raw
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del models
+    return (after - before) / COUNT
+
+
+def main():
+    """Prints the time and retained memory of each way to build models."""
+    cases = [
+        ('Match', RAW_MATCH, [
+            ('eager', lambda raw: EagerMatch().match_from_raw_data(raw)),
+            ('parser', lambda raw: Match().match_from_raw_data(raw)),
+            ('classmethod', Match.from_raw_data),
+            ('projected', lambda raw: Match.from_raw_data(
+                raw, MATCH_PROJECTION)),
+        ]),
+        ('Event', RAW_EVENT, [
+            ('eager', lambda raw: EagerEvent().event_from_raw_data(raw)),
+            ('parser', lambda raw: Event().event_from_raw_data(raw)),
+            ('classmethod', Event.from_raw_data),
+            ('projected', lambda raw: Event.from_raw_data(
+                raw, EVENT_PROJECTION)),
+        ]),
+    ]
+    print("%-6s %-12s %10s %12s" % ('model', 'parse', 'us/model',
+                                     'retained B'))
+    for model, template, builds in cases:
+        raw = payload(template)
+        times = seconds([build for _, build in builds], raw)
+        for (name, build), elapsed in zip(builds, times):
+            print("%-6s %-12s %10.2f %12.0f" % (
+                model, name, elapsed / len(raw) * 1e6,
+                retained_bytes(build, template)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Compares per-request latency of the pooled transport against a fresh
+urlopen per request, using a local stub HTTP server.
+"""
+
+import http.server
+import json
+import threading
+import time
+import urllib.request
+
+from TBApython.transport import Transport
+
+PAYLOAD = json.dumps([{'key': 'frc%d' % number, 'team_number': number}
+                      for number in range(60)]).encode('utf-8')
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the same JSON payload for every GET, with keep-alive."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Writes the payload."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+def time_requests(fetch, url, count):
+    """Returns the mean latency in milliseconds of count calls to fetch."""
+    start = time.perf_counter()
+    for _ in range(count):
+        fetch(url)
+    return (time.perf_counter() - start) * 1000.0 / count
+
+
+def main(count=500):
+    """Runs both clients against the stub server and prints the results."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:%d/api/v2/event/2015scmb/teams' % (
+        server.server_address[1])
+
+    def fetch_urlopen(url):
+        with urllib.request.urlopen(url) as response:
+            return response.read()
+
+    transport = Transport()
+
+    def fetch_pooled(url):
+        return transport.request(url).body
+
+    try:
+        fresh = time_requests(fetch_urlopen, url, count)
+        pooled = time_requests(fetch_pooled, url, count)
+    finally:
+        transport.close()
+        server.shutdown()
+        server.server_close()
+    print("urlopen per request: %.3f ms/request" % fresh)
+    print("pooled transport:    %.3f ms/request" % pooled)
+    print("speedup:             %.2fx" % (fresh / pooled))
+
+
+if __name__ == '__main__':
+    main()
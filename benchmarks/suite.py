@@ -0,0 +1,315 @@
+"""Reproducible benchmarks of the client's hot paths against a local
+MockServer: get_data round trips, decoding large payloads, building models
+from raw data and loading a whole season.
+
+Every benchmark reports throughput, latency percentiles and peak traced
+memory. Results can be saved as JSON and compared with an earlier run:
+
+    python -m TBApython.benchmarks.suite --output after.json \\
+        --compare before.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import TBApython
+from TBApython.bulk import load_events
+from TBApython.cache import ValidationCache
+from TBApython.event import Event
+from TBApython.identity import get_identity_map
+from TBApython.match import Match
+from TBApython.mockserver import MockServer
+from TBApython.mockserver import synthetic_fixtures
+from TBApython.team import Team
+
+FORMAT_VERSION = 1
+PERCENTILES = (50, 90, 99)
+# Slowdowns below this ratio are treated as noise by --compare.
+REGRESSION_THRESHOLD = 1.10
+
+
+class Benchmark(object):
+    """One timed operation.
+
+    Attributes:
+        name: String identifying the benchmark in results.
+        func: Callable timed once per iteration.
+        items: Number of items one call processes, for throughput.
+        setup: Callable run untimed before every iteration, or None.
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self, name, func, items=1, setup=None):
+        self.name = name
+        self.func = func
+        self.items = items
+        self.setup = setup
+
+    def __repr__(self):
+        return "Benchmark(%s)" % self.name
+
+    # pylint: enable=R0903
+
+
+def run_benchmark(benchmark, iterations, warmup=2):
+    """Times a benchmark and measures its peak memory.
+
+    Memory is traced in one extra iteration, since tracing slows the timed
+    ones down.
+
+    Args:
+        benchmark: Benchmark to run.
+        iterations: int of the number of timed calls.
+        warmup: int of the number of untimed calls made first.
+
+    Returns:
+        A dictionary of the results, as saved to the JSON report.
+    """
+    for _ in range(warmup):
+        _call(benchmark)
+    timings = []
+    gc.collect()
+    for _ in range(iterations):
+        timings.append(_call(benchmark))
+    tracemalloc.start()
+    try:
+        _call(benchmark)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    total = sum(timings)
+    result = {
+        'iterations': iterations,
+        'items': benchmark.items,
+        'mean_ms': 1000.0 * total / iterations,
+        'stdev_ms': (1000.0 * statistics.stdev(timings)
+                     if iterations > 1 else 0.0),
+        'items_per_second': benchmark.items * iterations / total,
+        'peak_memory_bytes': peak,
+    }
+    for percentile in PERCENTILES:
+        result['p%d_ms' % percentile] = 1000.0 * _percentile(timings,
+                                                             percentile)
+    return result
+
+
+def build_benchmarks(server, fixtures, quick=False):
+    """Returns the list of benchmarks for a running MockServer.
+
+    Args:
+        server: MockServer serving fixtures, already set as the API URL.
+        fixtures: The fixture dictionary it serves.
+        quick: Whether to shrink the model construction workloads.
+    """
+    event_keys = sorted(key[len('event/'):] for key in fixtures
+                        if key.startswith('event/') and key.count('/') == 1)
+    matches_url = server.url + 'event/%s/matches' % event_keys[0]
+    raw_matches = [match for key in event_keys
+                   for match in fixtures['event/%s/matches' % key]]
+    raw_teams = [fixtures[key] for key in sorted(fixtures)
+                 if key.startswith('team/') and key.count('/') == 1]
+    raw_events = [fixtures['event/' + key] for key in event_keys]
+    if quick:
+        raw_matches = raw_matches[:500]
+    season_payload = json.dumps(raw_matches)
+    season_events = event_keys[:4] if quick else event_keys
+
+    def uncached():
+        TBApython.set_validation_cache(None)
+        TBApython.set_disk_cache(None)
+
+    def revalidated():
+        TBApython.set_validation_cache(ValidationCache())
+        TBApython.set_disk_cache(None)
+        TBApython.get_data(matches_url)
+
+    def fresh_models():
+        uncached()
+        get_identity_map().clear()
+
+    def load_season():
+        result = load_events(season_events, include=('teams', 'matches'))
+        if result.failures:
+            raise RuntimeError(result.failures)
+
+    return [
+        Benchmark('get_data_round_trip',
+                  lambda: TBApython.get_data(matches_url), setup=uncached),
+        Benchmark('get_data_not_modified',
+                  lambda: TBApython.get_data(matches_url),
+                  setup=revalidated),
+        Benchmark('json_loads_season', lambda: json.loads(season_payload),
+                  items=len(raw_matches)),
+        Benchmark('match_from_raw_data',
+                  lambda: [Match().match_from_raw_data(raw)
+                           for raw in raw_matches],
+                  items=len(raw_matches)),
+        Benchmark('match_class_from_raw_data',
+                  lambda: [Match.from_raw_data(raw) for raw in raw_matches],
+                  items=len(raw_matches)),
+        Benchmark('team_from_raw_data',
+                  lambda: [Team().team_from_raw_data(raw)
+                           for raw in raw_teams],
+                  items=len(raw_teams)),
+        Benchmark('event_from_raw_data',
+                  lambda: [Event().event_from_raw_data(raw)
+                           for raw in raw_events],
+                  items=len(raw_events)),
+        Benchmark('season_bulk_load', load_season,
+                  items=len(season_events), setup=fresh_models),
+    ]
+
+
+def run_suite(iterations=20, quick=False, names=None, events=40):
+    """Runs the suite against a fresh MockServer.
+
+    Args:
+        iterations: int of the number of timed calls per benchmark.
+        quick: Whether to run a smaller workload, for smoke tests.
+        names: Iterable of benchmark names to run, or None for all.
+        events: int of the number of events in the synthetic season.
+
+    Returns:
+        A report dictionary holding metadata and per-benchmark results.
+    """
+    fixtures = synthetic_fixtures(events=4 if quick else events,
+                                  matches_per_event=80)
+    previous = (TBApython.API_APPID, TBApython.get_validation_cache(),
+                TBApython.get_disk_cache())
+    TBApython.API_APPID = TBApython.API_APPID or 'frc0:benchmarks:v01'
+    results = {}
+    try:
+        with MockServer(fixtures) as server:
+            for benchmark in build_benchmarks(server, fixtures, quick):
+                if names and benchmark.name not in names:
+                    continue
+                results[benchmark.name] = run_benchmark(benchmark,
+                                                        iterations)
+    finally:
+        TBApython.API_APPID = previous[0]
+        TBApython.set_validation_cache(previous[1])
+        TBApython.set_disk_cache(previous[2])
+    return {'format': FORMAT_VERSION, 'meta': _metadata(quick, iterations),
+            'results': results}
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Compares two reports benchmark by benchmark.
+
+    Args:
+        report: Report dictionary of the new run.
+        baseline: Report dictionary of the run to compare against.
+        threshold: Ratio of mean latencies above which a benchmark counts
+            as a regression.
+
+    Returns:
+        A list of (name, ratio, regressed) tuples, where ratio is the new
+        mean latency divided by the baseline one.
+    """
+    rows = []
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or not before['mean_ms']:
+            continue
+        ratio = result['mean_ms'] / before['mean_ms']
+        rows.append((name, ratio, ratio > threshold))
+    return rows
+
+
+def print_report(report, comparison=None):
+    """Prints a report as a table, with ratios when given a comparison."""
+    ratios = {name: (ratio, regressed)
+              for name, ratio, regressed in comparison or []}
+    print("%-24s %10s %10s %10s %10s %12s %10s" % (
+        'benchmark', 'mean ms', 'p50 ms', 'p90 ms', 'p99 ms', 'items/s',
+        'peak KiB'))
+    for name, result in report['results'].items():
+        line = "%-24s %10.3f %10.3f %10.3f %10.3f %12.0f %10.0f" % (
+            name, result['mean_ms'], result['p50_ms'], result['p90_ms'],
+            result['p99_ms'], result['items_per_second'],
+            result['peak_memory_bytes'] / 1024.0)
+        if name in ratios:
+            ratio, regressed = ratios[name]
+            line += " %6.2fx%s" % (ratio, ' REGRESSION' if regressed else '')
+        print(line)
+
+
+def main(argv=None):
+    """Runs the suite from the command line.
+
+    Returns:
+        The exit status: 1 if --compare found a regression, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--events', type=int, default=40,
+                        help='events in the synthetic season')
+    parser.add_argument('--quick', action='store_true',
+                        help='small workload for smoke testing')
+    parser.add_argument('--only', action='append', metavar='NAME',
+                        help='run only this benchmark; may be repeated')
+    parser.add_argument('--output', help='save the report as JSON')
+    parser.add_argument('--compare', metavar='REPORT',
+                        help='JSON report of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float,
+                        default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    report = run_suite(args.iterations, args.quick, args.only, args.events)
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline:
+            comparison = compare(report, json.load(baseline), args.threshold)
+    print_report(report, comparison)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    return int(any(regressed for _, _, regressed in comparison or []))
+
+
+def _call(benchmark):
+    if benchmark.setup is not None:
+        benchmark.setup()
+    start = time.perf_counter()
+    benchmark.func()
+    return time.perf_counter() - start
+
+
+def _percentile(values, percentile):
+    # Linear interpolation between the closest ranks.
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percentile / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position -
+                                                                 lower)
+
+
+def _metadata(quick, iterations):
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True,
+            cwd=TBApython.__path__[0]).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'revision': revision,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'iterations': iterations,
+    }
+
+
+if __name__ == '__main__':
+    sys.exit(main())
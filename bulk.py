@@ -0,0 +1,288 @@
+"""This script loads many events or teams from The Blue Alliance API at once
+
+Requests are fanned out over a bounded thread pool, identical URLs within a
+batch are only fetched once, and a failure only affects the item it belongs
+to:
+
+    result = load_events(['2015scmb', '2015gaal'], include=('teams',))
+    for event in result:
+        print(event, event.teams)
+    for key, error in result.failures.items():
+        print(key, error)
+
+load_seasons builds whole seasons of team history the same way, fetching
+every event's match list once however many of the teams attended it:
+
+    result = load_seasons(['frc281', 'frc1678'], years=2015)
+    for team in result:
+        print(team, team.matches_by_event)
+"""
+
+import concurrent.futures
+
+from TBApython import get_api_url
+from TBApython import get_data
+from TBApython.identity import resolve
+from TBApython.transport import DEFAULT_POOL_SIZE
+
+# One worker per pooled connection so no request pays for a new handshake.
+DEFAULT_MAX_WORKERS = DEFAULT_POOL_SIZE
+EVENT_INCLUDES = ('teams', 'matches', 'awards', 'stats')
+TEAM_INCLUDES = ('events', 'awards', 'years_participated')
+
+
+class BatchResult(object):
+    """Model for the outcome of a batch load.
+
+    Iterating over the result yields the loaded models in input order.
+
+    Attributes:
+        items: Dictionary of the fully loaded models keyed by their key.
+        failures: Dictionary of the exception that stopped each failed key.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.failures = {}
+
+    def __repr__(self):
+        return "%d loaded, %d failed" % (len(self.items), len(self.failures))
+
+    def __iter__(self):
+        return iter(self.items.values())
+
+    def __len__(self):
+        return len(self.items)
+
+
+def load_events(keys, include=EVENT_INCLUDES,
+                max_workers=DEFAULT_MAX_WORKERS):
+    """Loads several events and their related data concurrently.
+
+    Args:
+        keys: Iterable of event keys. Example: ['2015scmb', '2015gaal']
+        include: Iterable of the relationships to load for each event, any of
+            'teams', 'matches', 'awards' and 'stats'.
+        max_workers: Integer containing the number of concurrent requests.
+
+    Returns:
+        A BatchResult of Event models keyed by event key.
+
+    Raises:
+        Raises a ValueError if include names an unknown relationship.
+    """
+    from TBApython.event import Event
+
+    include = _check_include(include, EVENT_INCLUDES)
+    plan = []
+    for key in keys:
+        event = resolve(Event, key.lower())
+        event.url = get_api_url() + 'event/' + event.key
+        steps = [(event.url, event.event_from_raw_data)]
+        for name in include:
+            steps.append((getattr(event, name + '_url')(),
+                          getattr(event, name + '_from_raw_data')))
+        plan.append((key, event, steps))
+    return _run(plan, max_workers)
+
+
+def load_teams(keys, include=TEAM_INCLUDES, year=None,
+               max_workers=DEFAULT_MAX_WORKERS):
+    """Loads several teams and their related data concurrently.
+
+    Args:
+        keys: Iterable of team keys. Example: ['frc281', 'frc1678']
+        include: Iterable of the relationships to load for each team, any of
+            'events', 'awards' and 'years_participated'.
+        year: Integer limiting the loaded events to one year. Example: 2015
+        max_workers: Integer containing the number of concurrent requests.
+
+    Returns:
+        A BatchResult of Team models keyed by team key.
+
+    Raises:
+        Raises a ValueError if include names an unknown relationship.
+    """
+    from TBApython.team import Team
+
+    include = _check_include(include, TEAM_INCLUDES)
+    plan = []
+    for key in keys:
+        team = resolve(Team, key.lower())
+        team.url = get_api_url() + 'team/' + team.key
+        steps = [(team.url, team.team_from_raw_data)]
+        for name in include:
+            if name == 'events':
+                url = team.events_url(year)
+            else:
+                url = getattr(team, name + '_url')()
+            steps.append((url, getattr(team, name + '_from_raw_data')))
+        plan.append((key, team, steps))
+    return _run(plan, max_workers)
+
+
+def load_seasons(teams, years=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Loads the events, matches and awards of teams for whole seasons.
+
+    Each team's events for the years are fetched, then the full match list
+    of every event is fetched once and shared by all the teams that played
+    in it; events whose matches are already loaded aren't fetched again.
+    The results are merged into the teams: matches_by_event and
+    awards_by_event get one entry per event, events gains the season's
+    events, and matches holds every match loaded for the team so far.
+
+    Args:
+        teams: Iterable of Team models or team keys. Example: ['frc281']
+        years: Integer or iterable of integers containing the seasons to
+            load. Defaults to every year the team participated in.
+        max_workers: Integer containing the number of concurrent requests.
+
+    Returns:
+        A BatchResult of Team models keyed by team key.
+    """
+    from TBApython.team import Team
+
+    teams = [resolve(Team, team.lower()) if isinstance(team, str) else team
+             for team in teams]
+    if isinstance(years, int):
+        years = [years]
+    result = BatchResult()
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        # Years participated, then the events and awards of those years,
+        # then the match lists of the events.
+        seasons = {}
+        for team in teams:
+            if years is not None:
+                seasons[team.key] = list(years)
+            elif Team.years_participated.is_loaded(team):
+                seasons[team.key] = list(team.years_participated)
+            else:
+                seasons[team.key] = executor.submit(
+                    _parse, team.years_participated_url(),
+                    team.years_participated_from_raw_data)
+
+        futures = {}
+        for team in teams:
+            try:
+                if not isinstance(seasons[team.key], list):
+                    seasons[team.key].result()
+                    seasons[team.key] = list(team.years_participated)
+            except Exception as error:  # pylint: disable=W0703
+                result.failures[team.key] = error
+                continue
+            futures[team.key] = (
+                [executor.submit(get_data, team.events_url(year))
+                 for year in seasons[team.key]],
+                executor.submit(get_data, team.awards_url()))
+
+        events = {}
+        season_events = {}
+        for team in teams:
+            if team.key not in futures:
+                continue
+            event_lists, awards = futures[team.key]
+            try:
+                raw_events = [event for future in event_lists
+                              for event in future.result()]
+                raw_awards = awards.result()
+            except Exception as error:  # pylint: disable=W0703
+                result.failures[team.key] = error
+                continue
+            season_events[team.key] = (raw_events, raw_awards)
+            for event in raw_events:
+                events.setdefault(event['key'], event)
+        matches = _event_matches(executor, events.values())
+
+    for team in teams:
+        if team.key not in season_events:
+            continue
+        raw_events, raw_awards = season_events[team.key]
+        try:
+            _merge_season(team, seasons[team.key], raw_events, raw_awards,
+                          matches)
+        except Exception as error:  # pylint: disable=W0703
+            result.failures[team.key] = error
+        else:
+            result.items[team.key] = team
+    return result
+
+
+def _check_include(include, allowed):
+    include = tuple(include)
+    unknown = [name for name in include if name not in allowed]
+    if unknown:
+        raise ValueError("Unknown include %s, expected any of %s" %
+                         (', '.join(unknown), ', '.join(allowed)))
+    return include
+
+
+def _parse(url, parse):
+    return parse(get_data(url))
+
+
+def _event_matches(executor, raw_events):
+    # Returns a future of the Event model, with its matches loaded, keyed by
+    # event key.
+    from TBApython.event import Event
+
+    futures = {}
+    for raw_event in raw_events:
+        event = resolve(Event, raw_event['key'])
+        if Event.matches.is_loaded(event):
+            future = concurrent.futures.Future()
+            future.set_result(event)
+        else:
+            future = executor.submit(_load_event_matches, event, raw_event)
+        futures[event.key] = future
+    return futures
+
+
+def _load_event_matches(event, raw_event):
+    # Fill in the event details from the team's event list so the model is
+    # usable without a request of its own.
+    if getattr(event, 'name', None) is None:
+        event.event_from_raw_data(raw_event)
+    return event.matches_from_raw_data(get_data(event.matches_url()))
+
+
+def _merge_season(team, years, raw_events, raw_awards, matches):
+    from TBApython.team import Team
+
+    season = [matches[raw_event['key']].result() for raw_event in raw_events]
+    for event in season:
+        team.matches_from_event(event)
+    if Team.events.is_loaded(team):
+        known = {event.key for event in team.events}
+        team.events = team.events + [event for event in season
+                                     if event.key not in known]
+    else:
+        team.events = season
+
+    # The award history covers every year; keep the loaded ones per event.
+    team.awards_from_raw_data(raw_awards)
+    years = set(years)
+    awards = {}
+    for award in team.awards:
+        if award.year in years:
+            awards.setdefault(award.event_key, []).append(award)
+    for event in season:
+        team.awards_by_event[event.key] = awards.get(event.key, [])
+
+
+def _run(plan, max_workers):
+    result = BatchResult()
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = {}
+        for _, _, steps in plan:
+            for url, _ in steps:
+                if url not in futures:
+                    futures[url] = executor.submit(get_data, url)
+        for key, model, steps in plan:
+            try:
+                for url, parse in steps:
+                    parse(futures[url].result())
+            except Exception as error:  # pylint: disable=W0703
+                result.failures[key] = error
+            else:
+                result.items[key] = model
+    return result
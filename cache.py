@@ -0,0 +1,284 @@
+"""This script holds the response caches used by get_data for The Blue
+Alliance API
+"""
+
+import collections
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL = 600
+# Seconds the last access time of a disk cache entry may lag behind. Hits
+# within it don't write to the database; LRU eviction doesn't need more.
+ACCESS_RESOLUTION = 5
+
+# Seconds each kind of URL stays fresh on disk. The first matching pattern
+# wins, anything else uses DEFAULT_TTL.
+DEFAULT_TTLS = (
+    (r'/matches$', 180),
+    (r'/stats$', 180),
+    (r'/match/[^/]+$', 180),
+    (r'/awards$', 3600),
+    (r'/teams$', 3600),
+    (r'/events$', 3600),
+    (r'/event/[^/]+$', 3600),
+    (r'/years_participated$', 86400),
+    (r'/team/[^/]+$', 86400),
+)
+
+
+class CacheEntry(object):
+    """Model for a cached response and its validators.
+
+    Attributes:
+        etag: String containing the ETag header of the response, if any.
+        last_modified: String containing the Last-Modified header of the
+            response, if any.
+        data: The decoded JSON data of the response. Entries read from a
+            DiskCache hold the raw response body as bytes instead.
+        expires: Float containing the UNIX time the entry goes stale, or None
+            if it never does.
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self, etag, last_modified, data, expires=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.data = data
+        self.expires = expires
+
+    def __repr__(self):
+        return "%s %s" % (self.etag, self.last_modified)
+
+    def is_fresh(self, now=None):
+        """Returns whether the entry can be used without revalidating."""
+        if self.expires is None:
+            return False
+        return (time.time() if now is None else now) < self.expires
+
+    def validators(self):
+        """Returns the conditional request headers for this entry."""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    # pylint: enable=R0903
+
+
+class ValidationCache(object):
+    """In-memory cache of decoded responses keyed by URL.
+
+    Entries are revalidated with If-None-Match/If-Modified-Since, and a 304
+    response hands back the stored data without decoding anything. The same
+    object is returned every time, so callers should not mutate it. The
+    least recently used entry is dropped once max_entries is reached.
+
+    Attributes:
+        max_entries: Integer containing the maximum number of URLs kept.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url):
+        """Returns the CacheEntry stored for url, or None."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def store(self, url, etag, last_modified, data):
+        """Stores data for url if the response carried any validators.
+
+        Args:
+            url: String containing the requested URL.
+            etag: String containing the ETag header, or None.
+            last_modified: String containing the Last-Modified header, or
+                None.
+            data: The decoded JSON data.
+
+        Returns:
+            The stored CacheEntry, or None if there was nothing to validate
+            against.
+        """
+        if etag is None and last_modified is None:
+            self.discard(url)
+            return None
+        entry = CacheEntry(etag, last_modified, data)
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, url):
+        """Removes the entry for url, if any."""
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache(object):
+    """Persistent response cache stored in an SQLite database.
+
+    Bodies are stored compressed, with zlib or with gzip as the API sent
+    them, and keyed by URL. An entry is served
+    without contacting the API until its TTL runs out, after which it is
+    revalidated with its ETag/Last-Modified. Once the stored bodies exceed
+    max_bytes the least recently used entries are evicted. The database runs
+    in WAL mode so several worker processes on one machine can share a file.
+
+    Attributes:
+        path: String containing the path of the SQLite database file.
+        max_bytes: Integer containing the maximum total size of the stored
+            (compressed) bodies.
+        ttls: Sequence of (regular expression, seconds) pairs matched against
+            the URL path to pick the TTL of a response.
+        default_ttl: Integer containing the TTL of URLs matching none of ttls.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, ttls=DEFAULT_TTLS,
+                 default_ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'url TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, '
+                'last_modified TEXT, expires REAL NOT NULL, '
+                'accessed REAL NOT NULL, size INTEGER NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed '
+                         'ON responses (accessed)')
+
+    def __repr__(self):
+        return "DiskCache(%s)" % self.path
+
+    def ttl_for(self, url):
+        """Returns the TTL in seconds for url."""
+        for pattern, ttl in self.ttls:
+            if pattern.search(url.split('?', 1)[0]):
+                return ttl
+        return self.default_ttl
+
+    def get(self, url):
+        """Returns the CacheEntry stored for url, or None.
+
+        The entry's data holds the raw response body as bytes. Its access
+        time is only written back once it is ACCESS_RESOLUTION seconds old,
+        so repeated hits are plain reads.
+        """
+        conn = self._connect()
+        row = conn.execute('SELECT body, etag, last_modified, expires, '
+                           'accessed FROM responses WHERE url = ?',
+                           (url,)).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, expires, accessed = row
+        now = time.time()
+        if now - accessed > ACCESS_RESOLUTION:
+            with conn:
+                conn.execute('UPDATE responses SET accessed = ? '
+                             'WHERE url = ?', (now, url))
+        # Bodies are zlib streams, or gzip ones stored as the API sent them.
+        return CacheEntry(etag, last_modified,
+                          zlib.decompress(body, zlib.MAX_WBITS | 32), expires)
+
+    def store(self, url, etag, last_modified, body, gzipped=None):
+        """Stores the raw body of a response for url.
+
+        Args:
+            url: String containing the requested URL.
+            etag: String containing the ETag header, or None.
+            last_modified: String containing the Last-Modified header, or
+                None.
+            body: Bytes containing the raw response body.
+            gzipped: Bytes containing body as sent with gzip
+                Content-Encoding, stored as is instead of compressing body
+                again, or None.
+
+        Returns:
+            None
+        """
+        now = time.time()
+        compressed = gzipped if gzipped is not None else zlib.compress(body)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, compressed, etag, last_modified,
+                 now + self.ttl_for(url), now, len(compressed)))
+            self._evict(conn)
+
+    def touch(self, url):
+        """Restarts the TTL of url after a successful revalidation."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('UPDATE responses SET expires = ?, accessed = ? '
+                         'WHERE url = ?', (now + self.ttl_for(url), now, url))
+
+    def discard(self, url):
+        """Removes the entry for url, if any."""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+
+    def clear(self):
+        """Removes every entry."""
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM responses')
+
+    def size(self):
+        """Returns the total size in bytes of the stored bodies."""
+        row = self._connect().execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return row[0]
+
+    def _evict(self, conn):
+        total = conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute('SELECT url, size FROM responses '
+                            'ORDER BY accessed').fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,134 @@
+"""This script coalesces concurrent requests for the same URL to The Blue
+Alliance API
+
+While a request is in flight, other callers asking for the same URL wait for
+it and share its result instead of sending their own. get_data and
+get_data_async coalesce by default; many threads or tasks loading the same
+hot event then cost one upstream request:
+
+    flight = TBApython.get_single_flight()
+    print(flight.coalesced)
+"""
+
+import asyncio
+import threading
+
+
+class SingleFlight(object):
+    """Runs one call per key at a time for threaded callers.
+
+    Attributes:
+        coalesced: Integer containing the number of calls that waited for
+            another caller's call instead of running their own.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "SingleFlight(%d in flight, %d coalesced)" % (
+            len(self._calls), self.coalesced)
+
+    def do(self, key, function, *args):
+        """Returns function(*args), or the result of the call in flight.
+
+        Args:
+            key: Hashable identifying the call. Example: a URL
+            function: Callable to run if no call for key is in flight.
+            args: Arguments of function.
+
+        Returns:
+            The result of the call, shared by every caller that waited for
+            it, so it should not be mutated.
+
+        Raises:
+            Raises whatever the call raised, in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function(*args)
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight(object):
+    """Runs one call per key at a time for asyncio callers.
+
+    The call runs in its own task, so a caller being cancelled doesn't
+    cancel it for the others.
+
+    Attributes:
+        coalesced: Integer containing the number of calls that waited for
+            another caller's call instead of running their own.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._tasks = {}
+
+    def __repr__(self):
+        return "AsyncSingleFlight(%d in flight, %d coalesced)" % (
+            len(self._tasks), self.coalesced)
+
+    async def do(self, key, function, *args):
+        """Returns await function(*args), or the result of the call in
+        flight on the running event loop.
+
+        Args:
+            key: Hashable identifying the call. Example: a URL
+            function: Coroutine function to run if no call for key is in
+                flight.
+            args: Arguments of function.
+
+        Returns:
+            The result of the call, shared by every caller that waited for
+            it, so it should not be mutated.
+
+        Raises:
+            Raises whatever the call raised, in every caller.
+        """
+        # Tasks belong to one event loop, so each loop has its own calls.
+        key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        del self._tasks[key]
+        # Mark the exception retrieved in case every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+
+class _Call(object):
+    # pylint: disable=R0903
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
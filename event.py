@@ -2,11 +2,31 @@
 Alliance API
 """
 
-from TBApython import API_URL
+import functools
+import operator
+
+from TBApython import get_api_url
 from TBApython import get_data
+from TBApython.identity import is_shared
+from TBApython.identity import register
+from TBApython.identity import resolve
+from TBApython.identity import shared
+from TBApython.lazy import Relationship
+from TBApython.lazy import check_fields
+from TBApython.lazy import invalidate
+from TBApython.lazy import model_state
+from TBApython.lazy import refresh
 from TBApython.exceptions import EventFormattingError
 from TBApython.exceptions import StatsFormattingError
 
+# Fields event_from_raw_data can be limited to. Raw json data missing any
+# of them is badly formatted.
+EVENT_FIELDS = ('key', 'website', 'official', 'end_date', 'name',
+                'short_name', 'facebook_eid', 'event_district_string',
+                'venue_address', 'event_district', 'location', 'event_code',
+                'year', 'webcast', 'alliances', 'event_type_string',
+                'start_date', 'event_type')
+
 class Event:
     """Model for event information from The Blue Alliance
 
@@ -57,8 +77,14 @@ class Event:
             http://www.firstsv.org
         official: Boolean containing whether this is a FIRST official event, or
             an offseason event.
-        teams: List of team models that attended the event.
-        matches: List of match models for the event.
+        teams: List of team models that attended the event. Fetched on
+            first access.
+        matches: List of match models for the event. Fetched on first
+            access.
+        match_index: MatchIndex looking up the matches by team, comp level,
+            number and schedule order. Kept up to date with matches.
+        awards: List of award models given at the event. Fetched on first
+            access.
         webcast: If the event has webcast data associated with it, this
             contains JSON data of the streams
         alliances: If we have alliance selection data for this event, this
@@ -67,12 +93,54 @@ class Event:
         district_points: If this event is part of a district, this contains
             the number and breakdown of points that each team attending earned.
         stats: JSON containing events statistics
+        start_date: String containing the date the event starts. Example:
+            2015-03-05
+        end_date: String containing the date the event ends. Example:
+            2015-03-07
+        facebook_eid: String containing the Facebook event id, if any.
+        url: String containing the API URL the event was loaded from.
     """
     # pylint: disable=R0902
     # All of these are available from the API and need to maintain constistency.
 
-    def __init__(self, key=None):
+    __slots__ = ('key', 'name', 'short_name', 'event_code',
+                 'event_type_string', 'event_type', 'event_district_string',
+                 'event_district', 'year', 'location', 'venue_address',
+                 'website', 'official', '_teams', '_matches', '_awards',
+                 'webcast', 'alliances', 'district_points', 'stats',
+                 'start_date', 'end_date', 'facebook_eid', 'url',
+                 '_match_index', '__weakref__')
+
+    teams = Relationship('get_teams')
+    matches = Relationship('get_matches')
+    awards = Relationship('get_awards')
+
+    def __new__(cls, key=None, lazy=False):
+        # pylint: disable=W0613
+        model = shared(cls, key) if key is not None else None
+        return model if model is not None else object.__new__(cls)
+
+    def __init__(self, key=None, lazy=False):
+        if key is not None and shared(Event, key) is self:
+            # __new__ returned the shared instance; keep what it loaded.
+            if not lazy:
+                self.load()
+            return None
         self.key = key
+        self.url = None
+        self._teams = None
+        self._matches = None
+        self._match_index = None
+        self._awards = None
+        self.district_points = None
+        self.stats = None
+        if key is not None and lazy:
+            # The remaining fields stay unset until __getattr__ loads them.
+            # Keys are registered lowercased, as shared() looks them up.
+            self.key = key.lower()
+            self.url = get_api_url() + 'event/' + self.key
+            register(self)
+            return None
         self.name = None
         self.short_name = None
         self.event_code = None
@@ -85,39 +153,166 @@ class Event:
         self.venue_address = None
         self.website = None
         self.official = None
-        self.teams = []
-        self.matches = []
-        self.awards = []
         self.webcast = None
         self.alliances = None
-        self.district_points = None
-        self.stats = None
+        self.start_date = None
+        self.end_date = None
+        self.facebook_eid = None
         if key is not None:
-            self.url = API_URL + 'event/' + key.lower()
-            raw_data = get_data(self.url)
-            self = self.event_from_raw_data(raw_data)
+            self.url = get_api_url() + 'event/' + key.lower()
+            self.load()
+            register(self)
         else:
             return None
 
     def __repr__(self):
         return self.key
 
-    def event_from_raw_data(self, raw_data):
+    def __getstate__(self):
+        return model_state(self, transient=('_match_index',))
+
+    @property
+    def match_index(self):
+        """MatchIndex over the event's matches.
+
+        Built on first access, fetching the matches if needed, and updated
+        with only the changed matches whenever the matches list is replaced,
+        as matches_from_raw_data and EventPoller do.
+        """
+        matches = self.matches
+        index = self._match_index
+        if index is None:
+            from TBApython.matchindex import MatchIndex
+
+            index = self._match_index = MatchIndex(matches)
+        elif index.source is not matches:
+            index.update(matches)
+        return index
+
+    def __getattr__(self, name):
+        # Only reached for unset slots, which are the fields of an event
+        # constructed with lazy=True that hasn't been loaded yet.
+        if name in Event.__slots__ and not name.startswith('_'):
+            if self.url is not None:
+                self.load()
+                return object.__getattribute__(self, name)
+        raise AttributeError("'Event' object has no attribute '%s'" % name)
+
+    def load(self):
+        """Retreives the event's own json data from API.
+
+        Called by the constructor, or on first attribute access for events
+        constructed with lazy=True.
+
+        Args:
+            None
+
+        Returns:
+            self
+
+        Raises:
+            Raises a EventFormattingError if the data doesn't have proper
+            formatting.
+
+        """
+        if self.url is None:
+            self.url = get_api_url() + 'event/' + self.key.lower()
+        return self.event_from_raw_data(get_data(self.url))
+
+    def invalidate(self, *names):
+        """Forgets loaded teams, matches or awards.
+
+        Their next access fetches them from the API again.
+
+        Args:
+            names: Names of the relationships to forget. Example: 'matches'.
+                All of them when none are given.
+
+        Returns:
+            None
+
+        Raises:
+            Raises a ValueError for an unknown relationship name.
+
+        """
+        invalidate(self, names)
+
+    def refresh(self, *names):
+        """Fetches teams, matches or awards from the API again right away.
+
+        Args:
+            names: Names of the relationships to fetch. Example: 'matches'.
+                Every loaded one when none are given.
+
+        Returns:
+            None
+
+        Raises:
+            Raises a ValueError for an unknown relationship name.
+
+        """
+        refresh(self, names)
+
+    @classmethod
+    def from_raw_data(cls, raw_data, fields=None):
+        """Builds an event from raw json data, setting each field only once.
+
+        Faster than Event().event_from_raw_data(raw_data) for bulk
+        construction. The event isn't added to the identity map.
+
+        Args:
+            raw_data: string of json data
+            fields: Iterable of the names in EVENT_FIELDS to copy, or None
+                for all of them.
+
+        Returns:
+            An Event.
+
+        Raises:
+            Raises a EventFormattingError if raw_data doesn't have proper
+            formatting, and a ValueError if fields names an unknown field.
+        """
+        event = object.__new__(cls)
+        event.key = None
+        event.url = None
+        event._teams = None
+        event._matches = None
+        event._match_index = None
+        event._awards = None
+        event.district_points = None
+        event.stats = None
+        if fields is not None:
+            return event._project(raw_data, fields)
+        return event.event_from_raw_data(raw_data)
+
+    def event_from_raw_data(self, raw_data, fields=None):
         """Populates event model from raw json data.
 
-        Insert description here.
+        When fields is given only those fields are copied and the others are
+        set to None, so the models don't keep the bulky venue_address,
+        webcast and alliances alive once the raw json data is dropped.
 
         Args:
             raw_data: string of json data
+            fields: Iterable of the names in EVENT_FIELDS to copy, or None
+                for all of them. The key is always copied. Example:
+                ('name', 'start_date')
 
         Returns:
             self
 
         Raises:
             Raises a EventFormattingError if raw_data doesn't have proper
-            formatting.
+            formatting, and a ValueError if fields names an unknown field or
+            the event is shared through the identity map, whose other
+            holders would lose the fields left out.
 
         """
+        if fields is not None:
+            if is_shared(self):
+                raise ValueError("Can't project the shared event %s" %
+                                 self.key)
+            return self._project(raw_data, fields)
         try:
             self.key = raw_data['key']
             self.website = raw_data['website']
@@ -141,6 +336,49 @@ class Event:
         except KeyError:
             raise EventFormattingError()
 
+    def _project(self, raw_data, fields):
+        # event_from_raw_data with fields, minus the identity map check.
+        try:
+            kept, check = _projection(tuple(fields))
+            check(raw_data)
+            # Whether each of EVENT_FIELDS is copied.
+            (_, website, official, end_date, name, short_name,
+             facebook_eid, event_district_string, venue_address,
+             event_district, location, event_code, year, webcast,
+             alliances, event_type_string, start_date,
+             event_type) = kept
+            self.key = raw_data['key']
+            self.website = raw_data['website'] if website else None
+            self.official = raw_data['official'] if official else None
+            self.end_date = raw_data['end_date'] if end_date else None
+            self.name = raw_data['name'] if name else None
+            self.short_name = (raw_data['short_name'] if short_name
+                               else None)
+            self.facebook_eid = (raw_data['facebook_eid']
+                                 if facebook_eid else None)
+            self.event_district_string = (
+                raw_data['event_district_string']
+                if event_district_string else None)
+            self.venue_address = (raw_data['venue_address']
+                                  if venue_address else None)
+            self.event_district = (raw_data['event_district']
+                                   if event_district else None)
+            self.location = raw_data['location'] if location else None
+            self.event_code = (raw_data['event_code'] if event_code
+                               else None)
+            self.year = raw_data['year'] if year else None
+            self.webcast = raw_data['webcast'] if webcast else None
+            self.alliances = raw_data['alliances'] if alliances else None
+            self.event_type_string = (raw_data['event_type_string']
+                                      if event_type_string else None)
+            self.start_date = (raw_data['start_date'] if start_date
+                               else None)
+            self.event_type = (raw_data['event_type'] if event_type
+                               else None)
+            return self
+        except KeyError:
+            raise EventFormattingError()
+
     def get_teams(self):
         """Retreives team json data from API.
 
@@ -155,16 +393,36 @@ class Event:
         Raises:
             None
 
+        """
+        self.teams_from_raw_data(get_data(self.teams_url()))
+
+    def teams_url(self):
+        """Returns the API URL of the teams attending the event."""
+        return get_api_url() + 'event/' + self.key + '/teams'
+
+    def teams_from_raw_data(self, raw_data):
+        """Populates teams from raw json data.
+
+        Args:
+            raw_data: list of team json data
+
+        Returns:
+            self
+
+        Raises:
+            Raises a TeamFormattingError if raw_data doesn't have proper
+            formatting.
+
         """
         from TBApython.team import Team
 
-        self.teams.clear()
-        get_teams_url = API_URL + 'event/' + self.key + '/teams'
-        get_teams_raw_data = get_data(get_teams_url)
-        for team in get_teams_raw_data:
-            this_team = Team()
+        teams = []
+        for team in raw_data:
+            this_team = resolve(Team, team.get('key'))
             this_team.team_from_raw_data(team)
-            self.teams.append(this_team)
+            teams.append(this_team)
+        self.teams = teams
+        return self
 
     def get_matches(self):
         """Retreives match json data from API.
@@ -182,15 +440,35 @@ class Event:
 
         """
 
+        self.matches_from_raw_data(get_data(self.matches_url()))
+
+    def matches_url(self):
+        """Returns the API URL of the matches played at the event."""
+        return get_api_url() + 'event/' + self.key + '/matches'
+
+    def matches_from_raw_data(self, raw_data):
+        """Populates matches from raw json data.
+
+        Args:
+            raw_data: list of match json data
+
+        Returns:
+            self
+
+        Raises:
+            Raises a MatchFormattingError if raw_data doesn't have proper
+            formatting.
+
+        """
         from TBApython.match import Match
 
-        self.matches.clear()
-        get_matches_url = API_URL + 'event/' + self.key + '/matches'
-        get_matches_raw_data = get_data(get_matches_url)
-        for match in get_matches_raw_data:
-            this_match = Match()
+        matches = []
+        for match in raw_data:
+            this_match = resolve(Match, match.get('key'))
             this_match.match_from_raw_data(match)
-            self.matches.append(this_match)
+            matches.append(this_match)
+        self.matches = matches
+        return self
 
     def get_awards(self):
         """Retreives awards json data from API.
@@ -206,16 +484,35 @@ class Event:
         Raises:
             None
 
+        """
+        self.awards_from_raw_data(get_data(self.awards_url()))
+
+    def awards_url(self):
+        """Returns the API URL of the awards given at the event."""
+        return get_api_url() + 'event/' + self.key + '/awards'
+
+    def awards_from_raw_data(self, raw_data):
+        """Populates awards from raw json data.
+
+        Args:
+            raw_data: list of award json data
+
+        Returns:
+            self
+
+        Raises:
+            None
+
         """
         from TBApython.award import Award
 
-        self.awards.clear()
-        get_awards_url = API_URL + 'event/' + self.key + '/awards'
-        get_awards_raw_data = get_data(get_awards_url)
-        for award in get_awards_raw_data:
+        awards = []
+        for award in raw_data:
             this_award = Award()
             this_award.award_from_raw_data(award)
-            self.awards.append(this_award)
+            awards.append(this_award)
+        self.awards = awards
+        return self
 
     def get_stats(self):
         """Retreives stats json data from API.
@@ -233,11 +530,61 @@ class Event:
             formatting.
 
         """
-        get_stats_url = API_URL + 'event/' + self.key + '/stats'
-        get_stats_raw_data = get_data(get_stats_url)
+        self.stats_from_raw_data(get_data(self.stats_url()))
+
+    def stats_url(self):
+        """Returns the API URL of the event's statistics."""
+        return get_api_url() + 'event/' + self.key + '/stats'
+
+    def stats_from_raw_data(self, raw_data):
+        """Populates stats from raw json data.
+
+        Args:
+            raw_data: stats json data
+
+        Returns:
+            self
+
+        Raises:
+            Raises a StatsFormattingError if raw_data doesn't have proper
+            formatting.
+
+        """
         try:
-            self.stats = get_stats_raw_data
+            self.stats = raw_data
+            return self
         except KeyError:
             raise StatsFormattingError()
 
+    def compute_stats(self):
+        """Populates stats locally from the event's matches.
+
+        Useful for offseason events, which have no stats on the API, and
+        during live play when the API lags behind. Needs NumPy.
+
+        Args:
+            None
+
+        Returns:
+            self
+
+        Raises:
+            Raises a MatchFormattingError if a match has no alliance data.
+
+        """
+        from TBApython.stats import compute_stats
+
+        self.stats = compute_stats(self.matches)
+        return self
+
     # pylint: enable=R0902
+
+
+@functools.lru_cache(maxsize=64)
+def _projection(fields):
+    # Returns whether each of EVENT_FIELDS is copied, and a function raising
+    # KeyError if raw json data misses any of the fields that aren't.
+    kept = check_fields(fields, EVENT_FIELDS) | {'key'}
+    return (tuple(name in kept for name in EVENT_FIELDS),
+            operator.itemgetter('key', *[name for name in EVENT_FIELDS
+                                         if name not in kept]))
@@ -0,0 +1,131 @@
+"""This script keeps one shared model instance per key for The Blue Alliance
+API models
+"""
+
+import threading
+import weakref
+
+from TBApython import get_api_url
+
+
+class IdentityMap(object):
+    """Weak-valued registry of Event, Team and Match models by key.
+
+    Parsers and the model constructors resolve models through the map, so
+    every event a team attended lists the same Team instance, Event(key) is
+    Event(key) and re-parsing a record updates that instance in place.
+    Models are only held weakly and disappear from the map once nothing else
+    refers to them. Each API URL has its own models, so pointing the client
+    at another server with set_api_url doesn't mix their data.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "IdentityMap(%d models)" % len(self)
+
+    def __len__(self):
+        return sum(len(models) for models in self._models.values())
+
+    def get(self, cls, key):
+        """Returns the live instance of cls with key, or None."""
+        models = self._models.get((get_api_url(), cls))
+        return models.get(key) if models is not None else None
+
+    def resolve(self, cls, key):
+        """Returns the live instance of cls with key, creating it if needed.
+
+        Args:
+            cls: Model class. Example: Team
+            key: String containing the model's key. Example: frc281
+
+        Returns:
+            The shared model instance. A new one only has its key set.
+        """
+        with self._lock:
+            models = self._models.setdefault((get_api_url(), cls),
+                                             weakref.WeakValueDictionary())
+            model = models.get(key)
+            if model is None:
+                model = cls()
+                model.key = key
+                models[key] = model
+            return model
+
+    def register(self, model):
+        """Adds model to the map unless an instance with its key is live.
+
+        Returns:
+            The shared instance for the model's key.
+        """
+        with self._lock:
+            models = self._models.setdefault((get_api_url(), type(model)),
+                                             weakref.WeakValueDictionary())
+            return models.setdefault(model.key, model)
+
+    def clear(self):
+        """Forgets every model."""
+        with self._lock:
+            self._models.clear()
+
+
+_IDENTITY_MAP = IdentityMap()
+
+
+def get_identity_map():
+    """Returns the identity map used by the model parsers, or None."""
+    return _IDENTITY_MAP
+
+
+def set_identity_map(identity_map):
+    """Replaces the identity map used by the model parsers.
+
+    Args:
+        identity_map: IdentityMap instance, or None to create a new model
+            for every record.
+
+    Returns:
+        The previous identity map.
+    """
+    global _IDENTITY_MAP  # pylint: disable=W0603
+    previous = _IDENTITY_MAP
+    _IDENTITY_MAP = identity_map
+    return previous
+
+
+def resolve(cls, key):
+    """Returns the shared instance of cls with key from the identity map.
+
+    Creates a fresh model when the identity map is disabled or key is None.
+    """
+    if _IDENTITY_MAP is None or key is None:
+        model = cls()
+        model.key = key
+        return model
+    return _IDENTITY_MAP.resolve(cls, key)
+
+
+def shared(cls, key):
+    """Returns the live instance of cls with key from the identity map.
+
+    Returns None when there is none, the identity map is disabled or key is
+    None. Model constructors return this instance instead of a new one.
+    """
+    if _IDENTITY_MAP is None or key is None:
+        return None
+    return _IDENTITY_MAP.get(cls, key.lower())
+
+
+def is_shared(model):
+    """Returns whether model is the instance the identity map shares."""
+    key = getattr(model, 'key', None)
+    return (_IDENTITY_MAP is not None and key is not None and
+            _IDENTITY_MAP.get(type(model), key) is model)
+
+
+def register(model):
+    """Adds a freshly loaded model to the identity map, if enabled."""
+    if _IDENTITY_MAP is not None and model.key is not None:
+        _IDENTITY_MAP.register(model)
@@ -0,0 +1,207 @@
+"""This script ingests many seasons of The Blue Alliance API data using every
+CPU core
+
+Downloading is I/O bound and runs on a thread pool; decoding the JSON and
+converting it is CPU bound and runs on a process pool, so it isn't held
+back by the GIL. Each event's matches come back from the workers as a
+MatchTable, whose NumPy columns are much cheaper to send between processes
+than match dictionaries, and awards come back as plain tuples. Events are
+parsed as soon as their download finishes, so both pools stay busy. On a
+single CPU there is no core to spare for the process pool and events are
+parsed on the download threads instead. Needs NumPy:
+
+    result = ingest_seasons(range(2010, 2020))
+    print(result, result.matches.team_average_scores())
+
+iter_ingest yields each event's results as they arrive instead.
+"""
+
+import concurrent.futures
+import json
+import os
+
+from TBApython import get_api_url
+from TBApython import get_data
+from TBApython import get_raw_data
+from TBApython.award import Award
+from TBApython.bulk import DEFAULT_MAX_WORKERS
+from TBApython.exceptions import UnexpectedDataError
+from TBApython.identity import resolve
+from TBApython.table import MatchTable
+
+PARTS = ('/matches', '/awards')
+
+
+class IngestResult(object):
+    """Model for the data of several seasons.
+
+    Attributes:
+        events: List of the Event models of the seasons.
+        matches: MatchTable of every ingested event's matches.
+        awards: List of every ingested event's Award models.
+        failures: Dictionary of the exception that stopped each failed event
+            key.
+    """
+
+    def __init__(self, events, matches, awards, failures):
+        self.events = events
+        self.matches = matches
+        self.awards = awards
+        self.failures = failures
+
+    def __repr__(self):
+        return "%d events, %d matches, %d awards, %d failed" % (
+            len(self.events), len(self.matches), len(self.awards),
+            len(self.failures))
+
+
+def ingest_seasons(years, max_workers=DEFAULT_MAX_WORKERS, processes=None):
+    """Downloads and parses the events, matches and awards of seasons.
+
+    Args:
+        years: Integer or iterable of integers containing the seasons.
+            Example: range(2010, 2020)
+        max_workers: Integer containing the number of concurrent requests.
+        processes: Integer containing the number of parsing processes, or 0
+            to parse on the download threads. Defaults to the number of
+            CPUs, or 0 on a single CPU.
+
+    Returns:
+        An IngestResult.
+
+    Raises:
+        Raises the get_data exceptions if a season's event list can't be
+        retrieved.
+    """
+    events = _season_events(years)
+    tables = []
+    awards = []
+    failures = {}
+    for key, table, event_awards in _ingest(
+            [event.key for event in events], max_workers, processes,
+            failures):
+        tables.append(table)
+        awards.extend(event_awards)
+    return IngestResult(events, MatchTable.concatenate(tables), awards,
+                        failures)
+
+
+def iter_ingest(event_keys, max_workers=DEFAULT_MAX_WORKERS,
+                processes=None):
+    """Downloads and parses the matches and awards of events.
+
+    Args:
+        event_keys: Iterable of event keys. Example: ['2015scmb']
+        max_workers: Integer containing the number of concurrent requests.
+        processes: Integer containing the number of parsing processes, or 0
+            to parse on the download threads. Defaults to the number of
+            CPUs, or 0 on a single CPU.
+
+    Yields:
+        (event key, MatchTable, list of Award models) tuples in the order
+        the events finish parsing.
+
+    Raises:
+        Raises the exception that stopped the first event that failed.
+    """
+    for item in _ingest(list(event_keys), max_workers, processes, None):
+        yield item
+
+
+def _ingest(event_keys, max_workers, processes, failures):
+    # Downloads feed the process pool as they finish and parsed events are
+    # yielded as they come back. Failed events go to failures, or are raised
+    # if it is None.
+    if processes is None:
+        processes = os.cpu_count() or 1
+        if processes == 1:
+            # Handing bodies to another process only pays off with a core to
+            # spare for it; on one core parsing on the download threads is
+            # faster.
+            processes = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as downloads:
+        if not processes:
+            parsing = {downloads.submit(_download_and_parse, key): key
+                       for key in event_keys}
+            for future in concurrent.futures.as_completed(parsing):
+                for item in _parsed(parsing[future], future, failures):
+                    yield item
+            return
+        with concurrent.futures.ProcessPoolExecutor(processes) as parsers:
+            fetching = {downloads.submit(_download, key): key
+                        for key in event_keys}
+            parsing = {}
+            pending = set(fetching)
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        key = fetching[future]
+                        try:
+                            parsed = parsers.submit(_parse, *future.result())
+                        except Exception as error:  # pylint: disable=W0703
+                            _fail(failures, key, error)
+                        else:
+                            parsing[parsed] = key
+                            pending.add(parsed)
+                        continue
+                    for item in _parsed(parsing[future], future, failures):
+                        yield item
+
+
+def _parsed(key, future, failures):
+    # Yields the event of a finished parsing future, or records its failure.
+    try:
+        table, rows = future.result()
+    except ValueError:
+        _fail(failures, key, UnexpectedDataError(
+            url=get_api_url() + 'event/' + key))
+    except Exception as error:  # pylint: disable=W0703
+        _fail(failures, key, error)
+    else:
+        yield key, table, [_award(row) for row in rows]
+
+
+def _fail(failures, key, error):
+    if failures is None:
+        raise error
+    failures[key] = error
+
+
+def _season_events(years):
+    from TBApython.event import Event
+
+    if isinstance(years, int):
+        years = [years]
+    events = []
+    for year in years:
+        for raw_event in get_data(get_api_url() + 'events/%d' % year):
+            event = resolve(Event, raw_event['key'])
+            events.append(event.event_from_raw_data(raw_event))
+    return events
+
+
+def _download(event_key):
+    # The raw bodies are handed to the parsing processes undecoded.
+    return [get_raw_data(get_api_url() + 'event/' + event_key + part)
+            for part in PARTS]
+
+
+def _download_and_parse(event_key):
+    return _parse(*_download(event_key))
+
+
+def _parse(matches_body, awards_body):
+    # Runs in the parsing processes, or the download threads without them.
+    table = MatchTable.from_raw_data(json.loads(matches_body.decode('utf-8')))
+    rows = [tuple(award.get(name) for name in Award.__slots__)
+            for award in json.loads(awards_body.decode('utf-8'))]
+    return table, rows
+
+
+def _award(row):
+    award = Award()
+    for name, value in zip(Award.__slots__, row):
+        setattr(award, name, value)
+    return award
@@ -0,0 +1,129 @@
+"""This script holds the lazily loaded relationships of The Blue Alliance API
+models
+"""
+
+
+class Relationship(object):
+    """Descriptor for a related list that is fetched on first access.
+
+    The value lives in the slot named after the attribute with a leading
+    underscore; None there means not loaded yet. Reading the attribute calls
+    the model's loader method once and memoizes the result. Models without a
+    key have nothing to fetch and get an empty list.
+
+    Attributes:
+        loader: String containing the name of the model method that fetches
+            the relationship. Example: get_teams
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.name = None
+        self.slot = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = '_' + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if value is None:
+            if instance.key is None:
+                setattr(instance, self.slot, [])
+            else:
+                getattr(instance, self.loader)()
+            value = getattr(instance, self.slot)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+    def is_loaded(self, instance):
+        """Returns whether the relationship has been loaded on instance."""
+        return getattr(instance, self.slot) is not None
+
+
+def model_state(model, transient=()):
+    """Returns the state pickle and copy save for a lazily loaded model.
+
+    The slots a model constructed with lazy=True hasn't loaded yet are left
+    out instead of being loaded, so the copy loads on first access.
+
+    Args:
+        model: Event or Team instance.
+        transient: Iterable of slot names saved as None, which the model
+            rebuilds when needed. Example: ('_match_index',)
+
+    Returns:
+        A (None, dictionary of slot values) tuple, as object.__getstate__
+        returns for slotted classes.
+    """
+    state = {}
+    for slot in type(model).__slots__:
+        if slot == '__weakref__':
+            continue
+        if slot in transient:
+            state[slot] = None
+            continue
+        try:
+            state[slot] = object.__getattribute__(model, slot)
+        except AttributeError:
+            pass
+    return None, state
+
+
+def relationships(cls):
+    """Returns the names of the Relationship attributes of a model class."""
+    return [name for name in dir(cls)
+            if isinstance(getattr(cls, name, None), Relationship)]
+
+
+def invalidate(model, names):
+    """Forgets loaded relationships so their next access fetches again.
+
+    Args:
+        model: Event or Team instance.
+        names: Iterable of relationship names, or empty for all of them.
+    """
+    for name in names or relationships(type(model)):
+        _relationship(model, name)
+        setattr(model, '_' + name, None)
+
+
+def refresh(model, names):
+    """Fetches relationships again right away.
+
+    Args:
+        model: Event or Team instance.
+        names: Iterable of relationship names, or empty for every one that
+            has been loaded.
+    """
+    if not names:
+        names = [name for name in relationships(type(model))
+                 if _relationship(model, name).is_loaded(model)]
+    for name in names:
+        getattr(model, _relationship(model, name).loader)()
+
+
+def check_fields(fields, allowed):
+    """Returns fields as a frozenset after checking every name is allowed.
+
+    Raises:
+        Raises a ValueError if fields names an unknown field.
+    """
+    fields = frozenset(fields)
+    unknown = sorted(fields.difference(allowed))
+    if unknown:
+        raise ValueError("Unknown field %s, expected any of %s" %
+                         (', '.join(unknown), ', '.join(allowed)))
+    return fields
+
+
+def _relationship(model, name):
+    descriptor = getattr(type(model), name, None)
+    if not isinstance(descriptor, Relationship):
+        raise ValueError("%s has no relationship %s" %
+                         (type(model).__name__, name))
+    return descriptor
@@ -2,10 +2,23 @@
 Alliance API
 """
 
-from TBApython import API_URL
+import functools
+import operator
+
+from TBApython import get_api_url
 from TBApython import get_data
+from TBApython.identity import is_shared
+from TBApython.identity import register
+from TBApython.identity import shared
+from TBApython.lazy import check_fields
 from TBApython.exceptions import MatchFormattingError
 
+# Fields match_from_raw_data can be limited to. Raw json data missing any
+# of them is badly formatted.
+MATCH_FIELDS = ('key', 'comp_level', 'set_number', 'match_number',
+                'alliances', 'score_breakdown', 'event_key', 'videos',
+                'time_string', 'time')
+
 class Match:
     """Model for match information from The Blue Alliance
 
@@ -43,12 +56,26 @@ class Match:
             often run ahead or behind schedule. Example: 11:15 AM
         time: Integer containing UNIX timestamp of match time, as taken from
             the published schedule.
+        url: String containing the API URL the match was loaded from.
     """
 
     # pylint: disable=R0902, R0903
     # All of these are available from the API and need to maintain constistency.
 
+    __slots__ = ('key', 'comp_level', 'set_number', 'match_number',
+                 'alliances', 'score_breakdown', 'event_key', 'videos',
+                 'time_string', 'time', 'url', '__weakref__')
+
+    def __new__(cls, key=None):
+        model = shared(cls, key) if key is not None else None
+        return model if model is not None else object.__new__(cls)
+
     def __init__(self, key=None):
+        if key is not None and shared(Match, key) is self:
+            # __new__ returned the shared instance; refresh it in place.
+            self.url = get_api_url() + 'match/' + key.lower()
+            self.match_from_raw_data(get_data(self.url))
+            return None
         self.key = key
         self.comp_level = None
         self.set_number = None
@@ -59,32 +86,71 @@ class Match:
         self.videos = None
         self.time_string = None
         self.time = None
+        self.url = None
         if key is not None:
-            self.url = API_URL + 'match/' + key.lower()
+            self.url = get_api_url() + 'match/' + key.lower()
             raw_data = get_data(self.url)
             self = self.match_from_raw_data(raw_data)
+            register(self)
         else:
             return None
 
     def __repr__(self):
         return self.key
 
-    def match_from_raw_data(self, raw_data):
+    @classmethod
+    def from_raw_data(cls, raw_data, fields=None):
+        """Builds a match from raw json data, setting each field only once.
+
+        Faster than Match().match_from_raw_data(raw_data) for bulk
+        construction. The match isn't added to the identity map.
+
+        Args:
+            raw_data: string of json data
+            fields: Iterable of the names in MATCH_FIELDS to copy, or None
+                for all of them.
+
+        Returns:
+            A Match.
+
+        Raises:
+            Raises a MatchFormattingError if raw_data doesn't have proper
+            formatting, and a ValueError if fields names an unknown field.
+        """
+        match = object.__new__(cls)
+        match.url = None
+        if fields is not None:
+            return match._project(raw_data, fields)
+        return match.match_from_raw_data(raw_data)
+
+    def match_from_raw_data(self, raw_data, fields=None):
         """Populates match model from raw json data.
 
-        Insert description here.
+        When fields is given only those fields are copied and the others are
+        set to None, so the models don't keep the bulky score_breakdown and
+        videos alive once the raw json data is dropped.
 
         Args:
             raw_data: string of json data
+            fields: Iterable of the names in MATCH_FIELDS to copy, or None
+                for all of them. The key is always copied. Example:
+                ('alliances', 'time')
 
         Returns:
             self
 
         Raises:
             Raises a MatchFormattingError if raw_data doesn't have proper
-            formatting.
+            formatting, and a ValueError if fields names an unknown field or
+            the match is shared through the identity map, whose other
+            holders would lose the fields left out.
 
         """
+        if fields is not None:
+            if is_shared(self):
+                raise ValueError("Can't project the shared match %s" %
+                                 self.key)
+            return self._project(raw_data, fields)
         try:
             self.comp_level = raw_data['comp_level']
             self.match_number = raw_data['match_number']
@@ -100,6 +166,43 @@ class Match:
         except KeyError:
             raise MatchFormattingError()
 
+    def _project(self, raw_data, fields):
+        # match_from_raw_data with fields, minus the identity map check.
+        try:
+            kept, check = _projection(tuple(fields))
+            check(raw_data)
+            # Whether each of MATCH_FIELDS is copied.
+            (_, comp_level, set_number, match_number, alliances,
+             score_breakdown, event_key, videos, time_string,
+             time) = kept
+            self.key = raw_data['key']
+            self.comp_level = (raw_data['comp_level'] if comp_level
+                               else None)
+            self.set_number = (raw_data['set_number'] if set_number
+                               else None)
+            self.match_number = (raw_data['match_number']
+                                 if match_number else None)
+            self.alliances = raw_data['alliances'] if alliances else None
+            self.score_breakdown = (raw_data['score_breakdown']
+                                    if score_breakdown else None)
+            self.event_key = raw_data['event_key'] if event_key else None
+            self.videos = raw_data['videos'] if videos else None
+            self.time_string = (raw_data['time_string'] if time_string
+                                else None)
+            self.time = raw_data['time'] if time else None
+            return self
+        except KeyError:
+            raise MatchFormattingError()
+
     # pylint: enable=R0902, R0903
     # All of these are available from the API and need to maintain constistency.
-    
\ No newline at end of file
+
+
+@functools.lru_cache(maxsize=64)
+def _projection(fields):
+    # Returns whether each of MATCH_FIELDS is copied, and a function raising
+    # KeyError if raw json data misses any of the fields that aren't.
+    kept = check_fields(fields, MATCH_FIELDS) | {'key'}
+    return (tuple(name in kept for name in MATCH_FIELDS),
+            operator.itemgetter('key', *[name for name in MATCH_FIELDS
+                                         if name not in kept]))
@@ -0,0 +1,258 @@
+"""This script indexes the matches of an event from The Blue Alliance API for
+fast lookups
+
+An Event builds its MatchIndex the first time one is asked for and updates
+it whenever its matches are replaced, re-indexing only the matches that
+changed:
+
+    index = event.match_index
+    print(index.next_match('frc281'), index.for_comp_level('sf'))
+    print(index.partners('frc281'), index.opponents('frc281'))
+"""
+
+import bisect
+import collections
+import threading
+
+COMP_LEVELS = ('qm', 'ef', 'qf', 'sf', 'f')
+
+
+class MatchIndex(object):
+    """Lookup tables over a list of matches.
+
+    Lookups return the stored lists in schedule order: unscheduled matches
+    last, then by comp level, set number and match number. The lists are
+    kept sorted in place as the index changes, so callers should copy one
+    to hold on to it and should not mutate it.
+
+    Attributes:
+        source: The list of matches the index was last updated from.
+    """
+
+    def __init__(self, matches=()):
+        self.source = None
+        self._matches = {}
+        self._signatures = {}
+        self._alliances = {}
+        self._orders = {}
+        self._by_team = {}
+        self._by_level = {}
+        self._by_number = {}
+        self._schedule = _SortedMatches()
+        self._lock = threading.Lock()
+        self.update(matches)
+
+    def __repr__(self):
+        return "MatchIndex(%d matches, %d teams)" % (len(self._matches),
+                                                     len(self._by_team))
+
+    def __len__(self):
+        return len(self._matches)
+
+    def update(self, matches, complete=True):
+        """Brings the index up to date with matches.
+
+        A match that is the indexed object with the same alliances object,
+        comp level, numbers and time is skipped without looking further;
+        the parsers replace alliances whenever they parse a match again.
+        Only the others are compared in full, and only those that changed
+        are moved in the sorted lists.
+
+        Args:
+            matches: List of match objects.
+            complete: Whether matches is the whole list. Indexed matches
+                missing from a complete list are removed; otherwise they are
+                kept.
+
+        Returns:
+            The set of keys of the added, changed and removed matches.
+        """
+        with self._lock:
+            changed = set()
+            for match in matches:
+                key = match.key
+                signature = self._signatures.get(key)
+                if signature is not None and self._matches[key] is match and (
+                        self._alliances[key] is match.alliances and
+                        signature[3] == match.time and
+                        signature[2] == match.match_number and
+                        signature[1] == match.set_number and
+                        signature[0] == match.comp_level):
+                    continue
+                new_signature = _signature(match)
+                if signature is not None:
+                    if (signature == new_signature and
+                            self._matches[key] is match):
+                        self._alliances[key] = match.alliances
+                        continue
+                    self._forget(key)
+                self._add(key, match, new_signature)
+                changed.add(key)
+            if complete:
+                if len(self._matches) > len(matches) or changed:
+                    seen = {match.key for match in matches}
+                    for key in [key for key in self._matches
+                                if key not in seen]:
+                        self._forget(key)
+                        changed.add(key)
+                self.source = matches
+            return changed
+
+    def for_team(self, team_key):
+        """Returns the matches team_key plays in. Example: 'frc281'"""
+        entry = self._by_team.get(team_key)
+        return entry.matches if entry is not None else []
+
+    def for_comp_level(self, comp_level):
+        """Returns the matches of a comp level. Example: 'qm'"""
+        entry = self._by_level.get(comp_level)
+        return entry.matches if entry is not None else []
+
+    def playoffs(self, team_key=None):
+        """Returns the elimination matches, optionally only team_key's."""
+        if team_key is None:
+            matches = self._schedule.matches
+        else:
+            matches = self.for_team(team_key)
+        return [match for match in matches if match.comp_level != 'qm']
+
+    def match(self, comp_level, set_number, match_number):
+        """Returns the match with the given numbers, or None.
+
+        Args:
+            comp_level: String containing the comp level. Example: 'qf'
+            set_number: Integer containing the set number. Example: 2
+            match_number: Integer containing the match number. Example: 1
+        """
+        return self._by_number.get((comp_level, set_number, match_number))
+
+    def schedule(self):
+        """Returns every match in schedule order."""
+        return self._schedule.matches
+
+    def next_match(self, team_key=None):
+        """Returns the first unplayed match, of team_key if given, or None."""
+        if team_key is None:
+            matches = self._schedule.matches
+        else:
+            matches = self.for_team(team_key)
+        for match in matches:
+            if not _played(match):
+                return match
+        return None
+
+    def partners(self, team_key):
+        """Returns how often each team was on team_key's alliance.
+
+        Returns:
+            A collections.Counter of matches played together keyed by team
+            key.
+        """
+        return self._count(team_key, same=True)
+
+    def opponents(self, team_key):
+        """Returns how often each team was on the opposing alliance.
+
+        Returns:
+            A collections.Counter of matches played against keyed by team
+            key.
+        """
+        return self._count(team_key, same=False)
+
+    def _count(self, team_key, same):
+        counts = collections.Counter()
+        for match in self.for_team(team_key):
+            red, blue = self._signatures[match.key][6:]
+            ours, theirs = (red, blue) if team_key in red else (blue, red)
+            counts.update(team for team in (ours if same else theirs)
+                          if team != team_key)
+        return counts
+
+    def _add(self, key, match, signature):
+        self._matches[key] = match
+        self._signatures[key] = signature
+        self._alliances[key] = match.alliances
+        level, set_number, match_number, time = signature[:4]
+        order = self._orders[key] = (time is None, time or 0, _level(level),
+                                     set_number or 0, match_number or 0,
+                                     key)
+        self._by_number[(level, set_number, match_number)] = match
+        self._schedule.insert(order, match)
+        for team in set(signature[5]):
+            self._by_team.setdefault(team, _SortedMatches()).insert(order,
+                                                                    match)
+        self._by_level.setdefault(level, _SortedMatches()).insert(order,
+                                                                  match)
+
+    def _forget(self, key):
+        signature = self._signatures.pop(key)
+        match = self._matches.pop(key)
+        del self._alliances[key]
+        order = self._orders.pop(key)
+        numbers = tuple(signature[:3])
+        # Another match may have taken these numbers in the same update.
+        if self._by_number.get(numbers) is match:
+            del self._by_number[numbers]
+        self._schedule.remove(order)
+        for team in set(signature[5]):
+            _remove(self._by_team, team, order)
+        _remove(self._by_level, signature[0], order)
+
+
+class _SortedMatches(object):
+    # Matches kept in schedule order, next to their sort keys for bisect.
+    # pylint: disable=R0903
+
+    __slots__ = ('orders', 'matches')
+
+    def __init__(self):
+        self.orders = []
+        self.matches = []
+
+    def insert(self, order, match):
+        position = bisect.bisect_left(self.orders, order)
+        self.orders.insert(position, order)
+        self.matches.insert(position, match)
+
+    def remove(self, order):
+        position = bisect.bisect_left(self.orders, order)
+        del self.orders[position]
+        del self.matches[position]
+
+
+def _remove(lists, name, order):
+    entry = lists[name]
+    entry.remove(order)
+    if not entry.matches:
+        del lists[name]
+
+
+def _signature(match):
+    # Everything the index depends on: (comp_level, set_number,
+    # match_number, time, scores, all teams, red teams, blue teams), with
+    # the teams as tuples of team keys.
+    alliances = match.alliances or {}
+    red = _teams(alliances.get('red'))
+    blue = _teams(alliances.get('blue'))
+    scores = tuple((alliances.get(color) or {}).get('score')
+                   for color in ('red', 'blue'))
+    return (match.comp_level, match.set_number, match.match_number,
+            match.time, scores, red + blue, red, blue)
+
+
+def _teams(alliance):
+    alliance = alliance or {}
+    return tuple(alliance.get('teams') or alliance.get('team_keys') or ())
+
+
+def _level(comp_level):
+    try:
+        return COMP_LEVELS.index(comp_level)
+    except ValueError:
+        return len(COMP_LEVELS)
+
+
+def _played(match):
+    alliances = match.alliances or {}
+    return all((alliances.get(color) or {}).get('score') not in (None, -1)
+               for color in ('red', 'blue'))
@@ -0,0 +1,369 @@
+"""This script instruments requests to The Blue Alliance API
+
+Observers are callables that get_data, get_data_async and stream.iter_data
+call with a RequestEvent after every request, successful or not. While none are
+registered the requests take their usual path and pay for one check only.
+MetricsCollector is a ready-made observer that keeps per-endpoint counters
+and latency histograms in memory:
+
+    collector = add_observer(MetricsCollector())
+    Event('2015scmb').get_matches()
+    print(collector.render())
+"""
+
+import bisect
+import functools
+import threading
+import time
+import urllib.parse
+
+# Upper bounds in seconds of the histogram buckets.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+PHASES = ('wait', 'dns', 'connect', 'transfer', 'parse', 'total')
+# Path segments followed by a key that varies from request to request.
+_KEY_SEGMENTS = {
+    'event': '{event_key}',
+    'team': '{team_key}',
+    'match': '{match_key}',
+    'district': '{district_key}',
+}
+
+_OBSERVERS = ()
+_OBSERVERS_LOCK = threading.Lock()
+
+
+class RequestEvent(object):
+    """Model for what happened during one get_data call.
+
+    Attributes:
+        url: String containing the requested URL.
+        endpoint: String containing the URL with its keys replaced by
+            placeholders. Example: event/{event_key}/matches
+        status: int HTTP status, or None if no response was received or the
+            on-disk cache answered.
+        bytes: int length of the response body as transferred, so
+            compressed if the API compressed it, or 0.
+        cache: String containing 'fresh' if the on-disk cache answered
+            without a request, 'revalidated' for a 304 answer, 'miss' for a
+            full response, or None if no request was answered.
+        error: The exception get_data raised, or None. For errors raised
+            while reaching the API its __cause__ holds the original one.
+        retries: int of the number of times the request was retried.
+        timings: Dictionary of seconds spent per phase. 'wait' is the time
+            spent waiting for the rate limiter or between retries and is
+            only present if there was any. 'dns' and 'connect' are only
+            present when a new connection was opened, and
+            'transfer' and 'parse' only when a request was sent or a cached
+            body decoded. 'total' is always present.
+    """
+
+    __slots__ = ('url', 'endpoint', 'status', 'bytes', 'cache', 'error',
+                 'retries', 'timings')
+
+    def __init__(self, url):
+        self.url = url
+        self.endpoint = endpoint_template(url)
+        self.status = None
+        self.bytes = 0
+        self.cache = None
+        self.error = None
+        self.retries = 0
+        self.timings = {}
+
+    def __repr__(self):
+        return "RequestEvent(%s, %s, %.1f ms)" % (
+            self.endpoint, self.status if self.error is None else
+            type(self.error).__name__, 1000.0 * self.timings.get('total', 0))
+
+
+class Observation(object):
+    """Times one observed request and reports it to the observers.
+
+    Attributes:
+        event: The RequestEvent being filled in.
+    """
+
+    def __init__(self, url):
+        self.event = RequestEvent(url)
+        self._started = time.perf_counter()
+
+    def phase(self, name, started):
+        """Adds the seconds since started to the timing of phase name."""
+        timings = self.event.timings
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() -
+                                                  started)
+
+    def sent(self, response, started, size=None):
+        """Records a response to a request sent at started.
+
+        The time spent waiting and opening connections is counted in its
+        own phases, so it is left out of 'transfer'. Streamed responses have
+        no body to measure and pass the number of bytes read as size.
+        """
+        event = self.event
+        event.status = response.status
+        event.bytes = len(response.raw_body) if size is None else size
+        elapsed = time.perf_counter() - started
+        event.timings['transfer'] = max(0.0, elapsed - sum(
+            event.timings.get(phase, 0.0)
+            for phase in ('wait', 'dns', 'connect')))
+
+    def done(self, error=None):
+        """Finishes the event and calls every observer with it."""
+        self.event.error = error
+        self.event.timings['total'] = time.perf_counter() - self._started
+        notify(self.event)
+
+
+class Histogram(object):
+    """Fixed-bucket histogram of durations in seconds.
+
+    Attributes:
+        buckets: Sorted tuple of the bucket upper bounds.
+        counts: List of observations per bucket, plus one overflow bucket.
+        count: int total of observations.
+        sum: Float total of the observed values.
+        max: Float of the largest observed value.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def __repr__(self):
+        return "Histogram(%d observations)" % self.count
+
+    def observe(self, value):
+        """Adds one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile):
+        """Returns an upper estimate of a percentile from 0 to 100.
+
+        The estimate is the upper bound of the bucket the percentile falls
+        in, or the largest value seen if it falls past the last bucket.
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percentile / 100.0
+        seen = 0
+        for position, count in enumerate(self.counts[:-1]):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets[position], self.max)
+        return self.max
+
+    def to_dict(self):
+        """Returns the histogram as a json serializable dictionary."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': dict(zip([str(bound) for bound in self.buckets] +
+                                ['+Inf'], self.counts)),
+        }
+
+
+class _EndpointMetrics(object):
+    # pylint: disable=R0903
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.statuses = {}
+        self.cache = {}
+        self.errors = {}
+        self.timings = {phase: Histogram(buckets) for phase in PHASES}
+
+
+class MetricsCollector(object):
+    """Observer keeping per-endpoint request metrics in memory.
+
+    It is safe to use from several threads. Read the metrics with snapshot,
+    or render for the Prometheus text format.
+
+    Attributes:
+        buckets: Tuple of the histogram bucket upper bounds in seconds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "MetricsCollector(%d endpoints)" % len(self._endpoints)
+
+    def __call__(self, event):
+        with self._lock:
+            metrics = self._endpoints.get(event.endpoint)
+            if metrics is None:
+                metrics = _EndpointMetrics(self.buckets)
+                self._endpoints[event.endpoint] = metrics
+            metrics.requests += 1
+            metrics.retries += event.retries
+            metrics.bytes += event.bytes
+            _increment(metrics.statuses, event.status)
+            _increment(metrics.cache, event.cache)
+            if event.error is not None:
+                _increment(metrics.errors, _error_name(event.error))
+            for phase, seconds in event.timings.items():
+                metrics.timings[phase].observe(seconds)
+
+    def snapshot(self):
+        """Returns the metrics as a json serializable dictionary.
+
+        Returns:
+            A dictionary keyed by endpoint template, each holding the
+            request and retry counts, response bytes, counts per status,
+            cache outcome and error type, and a histogram per timing phase.
+        """
+        with self._lock:
+            return {endpoint: {
+                'requests': metrics.requests,
+                'retries': metrics.retries,
+                'bytes': metrics.bytes,
+                'statuses': {str(status): count for status, count
+                             in metrics.statuses.items()},
+                'cache': {str(state): count for state, count
+                          in metrics.cache.items()},
+                'errors': dict(metrics.errors),
+                'timings': {phase: histogram.to_dict() for phase, histogram
+                            in metrics.timings.items() if histogram.count},
+            } for endpoint, metrics in self._endpoints.items()}
+
+    def render(self, prefix='tba'):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = [
+            '# TYPE %s_requests_total counter' % prefix,
+            '# TYPE %s_retries_total counter' % prefix,
+            '# TYPE %s_response_bytes_total counter' % prefix,
+            '# TYPE %s_request_errors_total counter' % prefix,
+            '# TYPE %s_request_seconds histogram' % prefix,
+        ]
+        with self._lock:
+            for endpoint, metrics in sorted(self._endpoints.items()):
+                label = 'endpoint="%s"' % endpoint
+                for status, count in metrics.statuses.items():
+                    lines.append('%s_requests_total{%s,status="%s"} %d' % (
+                        prefix, label, status or '', count))
+                lines.append('%s_retries_total{%s} %d' % (
+                    prefix, label, metrics.retries))
+                lines.append('%s_response_bytes_total{%s} %d' % (
+                    prefix, label, metrics.bytes))
+                for error, count in metrics.errors.items():
+                    lines.append('%s_request_errors_total{%s,error="%s"} %d'
+                                 % (prefix, label, error, count))
+                for phase, histogram in metrics.timings.items():
+                    if histogram.count:
+                        lines.extend(_histogram_lines(
+                            prefix + '_request_seconds',
+                            '%s,phase="%s"' % (label, phase), histogram))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Forgets every metric collected so far."""
+        with self._lock:
+            self._endpoints.clear()
+
+
+def add_observer(observer):
+    """Registers observer to be called with every RequestEvent.
+
+    Observers run on the thread, or event loop, that made the request, so
+    they should be quick and must not raise.
+
+    Args:
+        observer: Callable taking a RequestEvent, such as a
+            MetricsCollector.
+
+    Returns:
+        observer
+    """
+    global _OBSERVERS  # pylint: disable=W0603
+    with _OBSERVERS_LOCK:
+        _OBSERVERS = _OBSERVERS + (observer,)
+    return observer
+
+
+def remove_observer(observer):
+    """Unregisters observer; does nothing if it isn't registered."""
+    global _OBSERVERS  # pylint: disable=W0603
+    with _OBSERVERS_LOCK:
+        _OBSERVERS = tuple(registered for registered in _OBSERVERS
+                           if registered != observer)
+
+
+def get_observers():
+    """Returns a tuple of the registered observers."""
+    return _OBSERVERS
+
+
+def is_enabled():
+    """Returns whether any observer is registered."""
+    return bool(_OBSERVERS)
+
+
+def notify(event):
+    """Calls every registered observer with event."""
+    for observer in _OBSERVERS:
+        observer(event)
+
+
+@functools.lru_cache(maxsize=4096)
+def endpoint_template(url):
+    """Returns the API path of url with its keys replaced by placeholders.
+
+    Args:
+        url: string containing an API URL. Example:
+            http://www.thebluealliance.com/api/v2/team/frc281/2015/events
+
+    Returns:
+        A string such as team/{team_key}/{year}/events.
+    """
+    segments = urllib.parse.urlsplit(url).path.strip('/').split('/')
+    if 'api' in segments:
+        # Drop everything up to and including the version, such as api/v2.
+        segments = segments[segments.index('api') + 2:]
+    template = []
+    for position, segment in enumerate(segments):
+        if position and segments[position - 1] in _KEY_SEGMENTS:
+            template.append(_KEY_SEGMENTS[segments[position - 1]])
+        elif segment.isdigit():
+            template.append('{year}')
+        else:
+            template.append(segment)
+    return '/'.join(template)
+
+
+def _increment(counts, key):
+    counts[key] = counts.get(key, 0) + 1
+
+
+def _error_name(error):
+    return type(error.__cause__ or error).__name__
+
+
+def _histogram_lines(name, labels, histogram):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, bound,
+                                                   cumulative))
+    lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, labels,
+                                                 histogram.count))
+    lines.append('%s_sum{%s} %r' % (name, labels, histogram.sum))
+    lines.append('%s_count{%s} %d' % (name, labels, histogram.count))
+    return lines
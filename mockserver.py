@@ -0,0 +1,453 @@
+"""This script serves The Blue Alliance API v2 locally from recorded fixtures
+
+It lets the client run without thebluealliance.com, for example to
+benchmark it in CI or to work in an environment with no network. Responses
+can be delayed and made to fail on purpose:
+
+    with MockServer(synthetic_fixtures(), latency=0.05) as server:
+        event = Event('2015mock0')
+        print(event.matches, server.hits)
+
+Inside the with block every model talks to the mock server. To serve a
+directory of fixtures to another process instead, run
+
+    python -m TBApython.mockserver fixtures/ --port 8000
+
+and set the environment variable TBA_API_URL to the URL it prints.
+Fixtures are stored one JSON file per endpoint, laid out like the API:
+fixtures/event/2015scmb/matches.json holds event/2015scmb/matches.
+"""
+
+import argparse
+import collections
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import random
+import threading
+import time
+
+import TBApython
+
+API_PATH = '/api/v2/'
+# Passed as a status to drop the connection without answering.
+DISCONNECT = 0
+
+
+def load_fixtures(directory):
+    """Reads the fixtures stored under directory.
+
+    Args:
+        directory: string containing the path of the fixture directory.
+
+    Returns:
+        A dictionary of raw json data keyed by API path. Example:
+        {'event/2015scmb/matches': [...]}
+    """
+    fixtures = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(root, name)
+            endpoint = os.path.relpath(path, directory)[:-len('.json')]
+            with open(path, encoding='utf-8') as fixture:
+                fixtures[endpoint.replace(os.sep, '/')] = json.load(fixture)
+    return fixtures
+
+
+def save_fixtures(fixtures, directory):
+    """Writes fixtures to directory in the layout load_fixtures reads.
+
+    Args:
+        fixtures: dictionary of raw json data keyed by API path.
+        directory: string containing the path of the fixture directory.
+    """
+    for endpoint, data in fixtures.items():
+        path = os.path.join(directory, *endpoint.split('/')) + '.json'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fixture:
+            json.dump(data, fixture)
+
+
+def record_fixtures(endpoints, directory=None):
+    """Records live API responses as fixtures.
+
+    Args:
+        endpoints: Iterable of API paths to record. Example:
+            ['event/2015scmb', 'event/2015scmb/matches']
+        directory: string containing the path to save the fixtures to, or
+            None to only return them.
+
+    Returns:
+        A dictionary of raw json data keyed by API path.
+
+    Raises:
+        Raises the get_data exceptions if an endpoint can't be retrieved.
+    """
+    fixtures = {}
+    for endpoint in endpoints:
+        fixtures[endpoint] = TBApython.get_data(TBApython.get_api_url() +
+                                                endpoint)
+    if directory is not None:
+        save_fixtures(fixtures, directory)
+    return fixtures
+
+
+def synthetic_fixtures(year=2015, events=2, teams_per_event=24,
+                       matches_per_event=60, seed=0):
+    """Generates a consistent season of made-up fixtures.
+
+    Every event has teams, a qualification schedule with scores, awards and
+    stats, and every team has its events, matches, awards and years
+    participated, so all model methods have something to load.
+
+    Args:
+        year: int of the season.
+        events: int of the number of events. Their keys are
+            <year>mock0, <year>mock1, ...
+        teams_per_event: int of the number of teams at each event, at least
+            6. Events share half of their teams with the next event.
+        matches_per_event: int of the number of qualification matches at
+            each event.
+        seed: Seed for the scores, so repeated runs serve the same data.
+
+    Returns:
+        A dictionary of raw json data keyed by API path.
+    """
+    # pylint: disable=R0914
+    rand = random.Random(seed)
+    fixtures = {}
+    team_events = collections.defaultdict(list)
+    team_matches = collections.defaultdict(list)
+    start = int(time.mktime((year, 3, 1, 9, 0, 0, 0, 0, -1)))
+    for number in range(events):
+        event_key = '%dmock%d' % (year, number)
+        first = 1 + number * (teams_per_event // 2)
+        team_numbers = list(range(first, first + teams_per_event))
+        event = _event_fixture(event_key, year, number)
+        fixtures['event/' + event_key] = event
+        fixtures['event/%s/teams' % event_key] = [
+            _team_fixture(team_number) for team_number in team_numbers]
+        matches = []
+        for match_number in range(1, matches_per_event + 1):
+            lineup = rand.sample(team_numbers, 6)
+            matches.append(_match_fixture(
+                event_key, match_number,
+                start + number * 7 * 86400 + match_number * 420,
+                lineup, rand.randint(20, 160), rand.randint(20, 160)))
+        fixtures['event/%s/matches' % event_key] = matches
+        awards = [_award_fixture(event_key, year, 'Winner', 1,
+                                 team_numbers[:3])]
+        fixtures['event/%s/awards' % event_key] = awards
+        fixtures['event/%s/stats' % event_key] = _stats_fixture(team_numbers,
+                                                                matches)
+        for team_number in team_numbers:
+            team_events[team_number].append(event)
+            for match in matches:
+                alliances = match['alliances']
+                if ('frc%d' % team_number in alliances['red']['teams'] +
+                        alliances['blue']['teams']):
+                    team_matches[(team_number, event_key)].append(match)
+            fixtures['team/frc%d/event/%s/awards' % (team_number,
+                                                     event_key)] = [
+                award for award in awards
+                if {'team_number': team_number, 'awardee': None}
+                in award['recipient_list']]
+        for match in matches:
+            fixtures['match/' + match['key']] = match
+    fixtures['events/%d' % year] = [fixtures['event/%dmock%d' % (year, number)]
+                                    for number in range(events)]
+    for team_number, team_event_list in team_events.items():
+        team_key = 'frc%d' % team_number
+        fixtures['team/' + team_key] = _team_fixture(team_number)
+        fixtures['team/%s/events' % team_key] = team_event_list
+        fixtures['team/%s/%d/events' % (team_key, year)] = team_event_list
+        fixtures['team/%s/years_participated' % team_key] = [year]
+        fixtures['team/%s/history/awards' % team_key] = [
+            award for event in team_event_list
+            for award in fixtures['team/%s/event/%s/awards' % (team_key,
+                                                               event['key'])]]
+    for (team_number, event_key), matches in team_matches.items():
+        fixtures['team/frc%d/event/%s/matches' % (team_number,
+                                                  event_key)] = matches
+    return fixtures
+
+
+class MockServer(object):
+    """Local HTTP server answering TBA API v2 requests from fixtures.
+
+    Like the real API it answers 400 without an X-TBA-App-Id header and 404
+    for unknown paths, and sends an ETag so conditional requests get 304.
+
+    Attributes:
+        fixtures: dictionary of raw json data keyed by API path. It may be
+            changed while the server runs, for example with set_fixture.
+        latency: Seconds every response is delayed by.
+        jitter: Upper bound of a random extra delay in seconds.
+        error_rate: Fraction of requests, from 0 to 1, answered with
+            error_status instead of the fixture.
+        error_status: int HTTP status of injected errors, or DISCONNECT.
+        retry_after: Seconds sent as Retry-After with injected 429 and 503
+            errors, or None to leave the header out.
+        compress: Whether to gzip responses for clients that accept it, as
+            the real API does.
+        hits: collections.Counter of requests per API path.
+        url: string containing the API base URL of the running server.
+    """
+
+    # pylint: disable=R0902,R0913
+
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, seed=None, host='127.0.0.1', port=0,
+                 retry_after=None, compress=True):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.compress = compress
+        self.hits = collections.Counter()
+        self.url = None
+        self._random = random.Random(seed)
+        self._address = (host, port)
+        self._forced = collections.deque()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._previous_url = None
+        self._gzipped = {}
+
+    def __repr__(self):
+        return "MockServer(%s, %d fixtures)" % (self.url, len(self.fixtures))
+
+    def __enter__(self):
+        self.start()
+        self._previous_url = TBApython.set_api_url(self.url)
+        return self
+
+    def __exit__(self, *exc_info):
+        TBApython.set_api_url(self._previous_url)
+        self.stop()
+
+    def start(self):
+        """Starts serving on a background thread.
+
+        Returns:
+            self
+        """
+        handler = type('Handler', (_Handler,), {'mock': self})
+        self._server = http.server.ThreadingHTTPServer(self._address, handler)
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.url = 'http://%s:%d%s' % (host, port, API_PATH)
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the listening socket."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = self._thread = None
+
+    def set_fixture(self, endpoint, data):
+        """Replaces the data served for endpoint. Example: event/2015scmb"""
+        self.fixtures[endpoint] = data
+
+    def fail_next(self, count=1, status=503):
+        """Answers the next count requests with status, whatever the path.
+
+        Args:
+            count: int of the number of requests to fail.
+            status: int HTTP status, or DISCONNECT to drop the connection.
+        """
+        with self._lock:
+            self._forced.extend([status] * count)
+
+    def _injected_status(self):
+        with self._lock:
+            if self._forced:
+                return self._forced.popleft()
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+            return None
+
+    def _gzip(self, etag, body):
+        # Fixtures rarely change, so compress each version only once.
+        gzipped = self._gzipped.get(etag)
+        if gzipped is None:
+            gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+            with self._lock:
+                if len(self._gzipped) > 4096:
+                    self._gzipped.clear()
+                self._gzipped[etag] = gzipped
+        return gzipped
+
+    def _delay(self):
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0
+        return self.latency + extra
+
+    # pylint: enable=R0902,R0913
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    mock = None
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Answers one API request."""
+        mock = self.mock
+        endpoint = self.path.split('?')[0]
+        if endpoint.startswith(API_PATH):
+            endpoint = endpoint[len(API_PATH):].rstrip('/')
+        with mock._lock:  # pylint: disable=W0212
+            mock.hits[endpoint] += 1
+        delay = mock._delay()  # pylint: disable=W0212
+        if delay > 0:
+            time.sleep(delay)
+        status = mock._injected_status()  # pylint: disable=W0212
+        if status == DISCONNECT:
+            self.close_connection = True
+            return
+        if status is not None:
+            self._send(status, {'Error': 'Injected error'})
+        elif not self.headers.get('X-TBA-App-Id'):
+            self._send(400, {'Error': 'X-TBA-App-Id is a required header'})
+        elif endpoint not in mock.fixtures:
+            self._send(404, {'404': '%s not found' % endpoint})
+        else:
+            self._send(200, mock.fixtures[endpoint])
+
+    def _send(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if self.mock.compress and 'gzip' in self.headers.get(
+                'Accept-Encoding', ''):
+            body = self.mock._gzip(etag, body)  # pylint: disable=W0212
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+        elif status in (429, 503) and self.mock.retry_after is not None:
+            self.send_header('Retry-After', str(self.mock.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+def _event_fixture(event_key, year, number):
+    return {
+        'key': event_key, 'website': None, 'official': True,
+        'end_date': '%d-03-%02d' % (year, 3 + number * 7 % 25),
+        'name': 'Mock Regional %d' % number, 'short_name': 'Mock %d' % number,
+        'facebook_eid': None, 'event_district_string': None,
+        'venue_address': None, 'event_district': 0, 'location': 'Nowhere',
+        'event_code': 'mock%d' % number, 'year': year, 'webcast': [],
+        'alliances': [], 'event_type_string': 'Regional',
+        'start_date': '%d-03-%02d' % (year, 1 + number * 7 % 25),
+        'event_type': 0,
+    }
+
+
+def _team_fixture(team_number):
+    return {
+        'website': None, 'name': 'Mock Team %d' % team_number,
+        'locality': 'Nowhere', 'rookie_year': 2000, 'region': None,
+        'team_number': team_number, 'location': 'Nowhere',
+        'key': 'frc%d' % team_number, 'country_name': None,
+        'nickname': 'Mock %d' % team_number,
+    }
+
+
+def _match_fixture(event_key, match_number, scheduled, lineup, red_score,
+                   blue_score):
+    # pylint: disable=R0913
+    return {
+        'comp_level': 'qm', 'match_number': match_number, 'videos': [],
+        'time_string': None, 'set_number': 1,
+        'key': '%s_qm%d' % (event_key, match_number), 'time': scheduled,
+        'score_breakdown': None, 'event_key': event_key,
+        'alliances': {
+            'red': {'teams': ['frc%d' % team for team in lineup[:3]],
+                    'score': red_score},
+            'blue': {'teams': ['frc%d' % team for team in lineup[3:]],
+                     'score': blue_score},
+        },
+    }
+
+
+def _award_fixture(event_key, year, name, award_type, team_numbers):
+    # pylint: disable=R0913
+    return {
+        'name': name, 'award_type': award_type, 'event_key': event_key,
+        'year': year,
+        'recipient_list': [{'team_number': team_number, 'awardee': None}
+                           for team_number in team_numbers],
+    }
+
+
+def _stats_fixture(team_numbers, matches):
+    # Average alliance scores stand in for OPR; good enough to parse.
+    totals = collections.defaultdict(list)
+    for match in matches:
+        for color in ('red', 'blue'):
+            alliance = match['alliances'][color]
+            for team in alliance['teams']:
+                totals[team[3:]].append(alliance['score'] / 3.0)
+    oprs = {str(number): (sum(totals[str(number)]) /
+                          max(len(totals[str(number)]), 1))
+            for number in team_numbers}
+    return {'oprs': oprs, 'dprs': dict(oprs),
+            'ccwms': {number: 0.0 for number in oprs}}
+
+
+def main():
+    """Serves a fixture directory until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fixtures', nargs='?',
+                        help='fixture directory; synthetic data if omitted')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        fixtures = synthetic_fixtures()
+    server = MockServer(fixtures, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate,
+                        error_status=args.error_status, host=args.host,
+                        port=args.port).start()
+    print('Serving %d fixtures at %s' % (len(fixtures), server.url))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
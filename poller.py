@@ -0,0 +1,283 @@
+"""This script polls live events on The Blue Alliance API for match changes
+
+One poller watches any number of events from a single thread (run) or event
+loop (run_async). Events that are due together are fetched concurrently, on
+a thread pool or the event loop, while callbacks always run on the polling
+thread or loop. Each event is refreshed on its own schedule: every
+fast_interval seconds while matches are scheduled close to now, every
+slow_interval seconds otherwise. Callbacks only fire for matches that are
+new or changed since the previous refresh:
+
+    poller = EventPoller()
+    poller.on_score(lambda event, match: print(match, match.alliances))
+    poller.watch('2015scmb')
+    poller.run()
+"""
+
+import concurrent.futures
+import threading
+import time
+
+from TBApython import get_data
+from TBApython.bulk import DEFAULT_MAX_WORKERS
+from TBApython.exceptions import APIUnavailableError
+from TBApython.exceptions import ResourceUnavailableError
+from TBApython.exceptions import UnexpectedDataError
+from TBApython.identity import resolve
+
+DEFAULT_FAST_INTERVAL = 15
+DEFAULT_SLOW_INTERVAL = 300
+DEFAULT_ACTIVE_WINDOW = 30 * 60
+FETCH_ERRORS = (APIUnavailableError, ResourceUnavailableError,
+                UnexpectedDataError)
+
+
+class MatchChange(object):
+    """Model for one change found while polling an event.
+
+    Attributes:
+        kind: String containing 'new', 'changed' or 'score'.
+        event: The Event the match belongs to.
+        match: The updated Match model.
+        previous: The raw json data of the match before the change, or None
+            for new matches.
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self, kind, event, match, previous):
+        self.kind = kind
+        self.event = event
+        self.match = match
+        self.previous = previous
+
+    def __repr__(self):
+        return "%s %s" % (self.kind, self.match)
+
+    # pylint: enable=R0903
+
+
+class _Watched(object):
+    # pylint: disable=R0903
+
+    def __init__(self, event):
+        self.event = event
+        self.raw_data = None
+        self.snapshot = {}
+        self.matches = {}
+        self.due = 0.0
+        self.last_error = None
+
+
+class EventPoller(object):
+    """Polls the match lists of several events and reports what changed.
+
+    Attributes:
+        fast_interval: Seconds between refreshes while matches are being
+            played.
+        slow_interval: Seconds between refreshes otherwise.
+        active_window: Seconds before and after a scheduled match time during
+            which an event counts as being played.
+        max_workers: Integer containing the number of events run_pending
+            fetches at once.
+    """
+
+    def __init__(self, fast_interval=DEFAULT_FAST_INTERVAL,
+                 slow_interval=DEFAULT_SLOW_INTERVAL,
+                 active_window=DEFAULT_ACTIVE_WINDOW, clock=time.time,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        # pylint: disable=R0913
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.active_window = active_window
+        self.max_workers = max_workers
+        self._clock = clock
+        self._watched = {}
+        self._callbacks = {'new': [], 'changed': [], 'score': []}
+        self._stop = threading.Event()
+
+    def __repr__(self):
+        return "EventPoller(%s)" % ', '.join(sorted(self._watched))
+
+    def watch(self, event):
+        """Starts polling an event.
+
+        Args:
+            event: Event model or event key. Example: 2015scmb
+
+        Returns:
+            The watched Event. Its matches list is kept up to date.
+        """
+        from TBApython.event import Event
+
+        if not isinstance(event, Event):
+            event = resolve(Event, event.lower())
+        self._watched.setdefault(event.key, _Watched(event))
+        return event
+
+    def unwatch(self, event_key):
+        """Stops polling the event with event_key."""
+        self._watched.pop(event_key, None)
+
+    def on_new_match(self, callback):
+        """Registers callback(event, match) for matches seen the first time."""
+        self._callbacks['new'].append(callback)
+
+    def on_match_changed(self, callback):
+        """Registers callback(event, match) for any change to a known match."""
+        self._callbacks['changed'].append(callback)
+
+    def on_score(self, callback):
+        """Registers callback(event, match) for alliance score changes."""
+        self._callbacks['score'].append(callback)
+
+    def interval(self, event_key, now=None):
+        """Returns the seconds until the event should be refreshed again."""
+        watched = self._watched[event_key]
+        now = self._clock() if now is None else now
+        for raw_match in watched.snapshot.values():
+            scheduled = raw_match.get('time')
+            if scheduled and abs(scheduled - now) <= self.active_window:
+                return self.fast_interval
+        return self.slow_interval
+
+    def poll(self, event_key):
+        """Refreshes one event right away.
+
+        Args:
+            event_key: String containing the key of a watched event.
+
+        Returns:
+            A list of MatchChange for what changed since the last refresh.
+
+        Raises:
+            Raises the get_data exceptions if the match list can't be
+            retrieved.
+        """
+        watched = self._watched[event_key]
+        return self._apply(watched,
+                           get_data(watched.event.matches_url()))
+
+    def run_pending(self):
+        """Refreshes every event that is due.
+
+        The match lists are fetched concurrently on a thread pool; the
+        changes are applied and the callbacks called on this thread.
+
+        Returns:
+            A list of MatchChange for all refreshed events.
+        """
+        due = self._due()
+        if not due:
+            return []
+        workers = max(1, min(self.max_workers, len(due)))
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            futures = [executor.submit(get_data, watched.event.matches_url())
+                       for watched in due]
+            changes = []
+            for watched, future in zip(due, futures):
+                try:
+                    raw_data = future.result()
+                except FETCH_ERRORS as error:
+                    self._failed(watched, error)
+                else:
+                    changes.extend(self._apply(watched, raw_data))
+        return changes
+
+    def run(self):
+        """Polls until stop() is called, sleeping between refreshes."""
+        self._stop.clear()
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self._sleep_time())
+
+    async def run_async(self):
+        """Polls on the running event loop until stop() is called.
+
+        Events that are due at the same time are refreshed concurrently.
+        """
+        import asyncio
+        from TBApython.aio import get_data_async
+
+        self._stop.clear()
+        while not self._stop.is_set():
+            due = self._due()
+            results = await asyncio.gather(
+                *[get_data_async(watched.event.matches_url())
+                  for watched in due], return_exceptions=True)
+            for watched, result in zip(due, results):
+                if isinstance(result, FETCH_ERRORS):
+                    self._failed(watched, result)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    self._apply(watched, result)
+            # Sleep in short steps so stop() takes effect promptly.
+            wake = self._clock() + self._sleep_time()
+            while not self._stop.is_set() and self._clock() < wake:
+                await asyncio.sleep(min(1.0, wake - self._clock()))
+
+    def stop(self):
+        """Makes run or run_async return after the current refresh."""
+        self._stop.set()
+
+    def _due(self):
+        now = self._clock()
+        return [watched for watched in list(self._watched.values())
+                if watched.due <= now]
+
+    def _sleep_time(self):
+        if not self._watched:
+            return self.fast_interval
+        upcoming = min(watched.due for watched in self._watched.values())
+        return max(0.0, upcoming - self._clock())
+
+    def _failed(self, watched, error):
+        watched.last_error = error
+        watched.due = self._clock() + self.fast_interval
+
+    def _apply(self, watched, raw_data):
+        from TBApython.match import Match
+
+        event = watched.event
+        watched.last_error = None
+        # get_data hands back the same object when the API answered 304.
+        if raw_data is watched.raw_data:
+            watched.due = self._clock() + self.interval(event.key)
+            return []
+        changes = []
+        matches = []
+        snapshot = {}
+        known = {}
+        for raw_match in raw_data:
+            key = raw_match.get('key')
+            previous = watched.snapshot.get(key)
+            match = watched.matches.get(key)
+            if previous != raw_match or match is None:
+                match = resolve(Match, key).match_from_raw_data(raw_match)
+                if previous is None:
+                    changes.append(MatchChange('new', event, match, None))
+                else:
+                    changes.append(MatchChange('changed', event, match,
+                                               previous))
+                    if _scores(previous) != _scores(raw_match):
+                        changes.append(MatchChange('score', event, match,
+                                                   previous))
+            matches.append(match)
+            snapshot[key] = raw_match
+            known[key] = match
+        watched.raw_data = raw_data
+        watched.snapshot = snapshot
+        watched.matches = known
+        event.matches = matches
+        watched.due = self._clock() + self.interval(event.key)
+        for change in changes:
+            for callback in self._callbacks[change.kind]:
+                callback(event, change.match)
+        return changes
+
+
+def _scores(raw_match):
+    alliances = raw_match.get('alliances') or {}
+    return tuple((alliances.get(color) or {}).get('score')
+                 for color in ('red', 'blue'))
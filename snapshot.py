@@ -0,0 +1,560 @@
+"""This script keeps a local, indexed snapshot of seasons of The Blue
+Alliance API data
+
+A season is downloaded once into an SQLite database; queries are then
+answered locally with the usual Event, Team, Match and Award models instead
+of one API call per event:
+
+    store = SeasonStore('tba-2015.db')
+    store.ingest_season(2015)
+    for match in store.matches(team=281, year=2015):
+        print(match)
+"""
+
+import concurrent.futures
+import json
+import os
+import sqlite3
+import string
+import threading
+import time
+
+from TBApython import get_api_url
+from TBApython import get_data
+from TBApython import get_data_if_modified
+from TBApython.bulk import BatchResult
+from TBApython.bulk import DEFAULT_MAX_WORKERS
+from TBApython.identity import resolve
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS seasons ('
+    'year INTEGER PRIMARY KEY, ingested REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS events ('
+    'key TEXT PRIMARY KEY, year INTEGER NOT NULL, start_date TEXT, '
+    'data TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS events_year ON events (year, start_date)',
+    'CREATE TABLE IF NOT EXISTS teams ('
+    'team_number INTEGER PRIMARY KEY, data TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS event_teams ('
+    'event_key TEXT NOT NULL, team_number INTEGER NOT NULL, '
+    'PRIMARY KEY (event_key, team_number)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS event_teams_team '
+    'ON event_teams (team_number, event_key)',
+    'CREATE TABLE IF NOT EXISTS matches ('
+    'key TEXT PRIMARY KEY, event_key TEXT NOT NULL, year INTEGER NOT NULL, '
+    'comp_level TEXT NOT NULL, set_number INTEGER, match_number INTEGER, '
+    'time INTEGER, data TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS matches_event ON matches (event_key)',
+    'CREATE INDEX IF NOT EXISTS matches_level ON matches (year, comp_level)',
+    'CREATE TABLE IF NOT EXISTS match_teams ('
+    'match_key TEXT NOT NULL, team_key TEXT NOT NULL, '
+    'year INTEGER NOT NULL, alliance TEXT NOT NULL, '
+    'PRIMARY KEY (match_key, team_key)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS match_teams_team '
+    'ON match_teams (team_key, year)',
+    'CREATE TABLE IF NOT EXISTS awards ('
+    'id INTEGER PRIMARY KEY, event_key TEXT NOT NULL, '
+    'year INTEGER NOT NULL, award_type INTEGER, data TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS awards_event ON awards (event_key)',
+    'CREATE INDEX IF NOT EXISTS awards_type ON awards (award_type, year)',
+    'CREATE TABLE IF NOT EXISTS award_recipients ('
+    'award_id INTEGER NOT NULL, team_number INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS award_recipients_team '
+    'ON award_recipients (team_number)',
+    'CREATE TABLE IF NOT EXISTS event_stats ('
+    'event_key TEXT PRIMARY KEY, data TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS validators ('
+    'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT)',
+    'CREATE TABLE IF NOT EXISTS event_sync ('
+    'event_key TEXT PRIMARY KEY, checked REAL NOT NULL, '
+    'complete INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS sync_runs ('
+    'year INTEGER PRIMARY KEY, started REAL NOT NULL, finished REAL)',
+    'CREATE TABLE IF NOT EXISTS sync_failures ('
+    'event_key TEXT PRIMARY KEY, year INTEGER NOT NULL, '
+    'failed REAL NOT NULL, error TEXT NOT NULL)',
+)
+# Sort key matching how TBA orders matches within an event.
+_MATCH_ORDER = ("ORDER BY m.event_key, CASE m.comp_level WHEN 'qm' THEN 0 "
+                "WHEN 'ef' THEN 1 WHEN 'qf' THEN 2 WHEN 'sf' THEN 3 "
+                "ELSE 4 END, m.set_number, m.match_number")
+
+
+class SeasonStore(object):
+    """Local SQLite snapshot of events, teams, matches and awards.
+
+    Every row keeps the raw json data of the API, so query results are the
+    same models get_* would have returned. Matches are indexed by event,
+    team, year and comp level, and awards by event, team, year and award
+    type. The database runs in WAL mode, so other processes can query it
+    while a season is ingested.
+
+    Attributes:
+        path: String containing the path of the SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # Stores written before B teams such as frc254B were supported
+            # indexed the teams of matches by number; index them again.
+            reindex = 'team_number' in [row[1] for row in conn.execute(
+                'PRAGMA table_info(match_teams)')]
+            if reindex:
+                conn.execute('DROP TABLE match_teams')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            if reindex:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO match_teams VALUES (?, ?, ?, ?)',
+                    [row for year, data in conn.execute(
+                        'SELECT year, data FROM matches').fetchall()
+                     for row in _match_teams(year, [json.loads(data)])])
+
+    def __repr__(self):
+        return "SeasonStore(%s)" % self.path
+
+    def ingest_season(self, year, event_keys=None,
+                      max_workers=DEFAULT_MAX_WORKERS):
+        """Downloads every event of a season with its teams, matches, awards
+        and stats, and replaces what the store held for those events.
+
+        To refresh a season that is already stored, sync.sync_season only
+        downloads what changed.
+
+        Args:
+            year: Integer containing the season. Example: 2015
+            event_keys: Iterable of the event keys to ingest, or None for
+                every event of the season.
+            max_workers: Integer containing the number of concurrent
+                requests.
+
+        Returns:
+            A BatchResult of the ingested Event models keyed by event key.
+            Events that failed to download are left as they were.
+
+        Raises:
+            Raises the get_data exceptions if the season's event list can't
+            be retrieved.
+        """
+        if event_keys is None:
+            event_keys = [event['key'] for event in
+                          get_data(get_api_url() + 'events/%d' % year)]
+        parts = ('', '/teams', '/matches', '/awards', '/stats')
+        result = BatchResult()
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            futures = {key: [(url, executor.submit(get_data_if_modified, url))
+                             for url in [get_api_url() + 'event/' + key +
+                                         part for part in parts]]
+                       for key in event_keys}
+            for key, pending in futures.items():
+                try:
+                    entries = {url: future.result()
+                               for url, future in pending}
+                    raw = [entry.data for entry in entries.values()]
+                    # Keep the validators so a later sync can revalidate.
+                    self.update_event(
+                        key, *raw, validators={
+                            url: (entry.etag, entry.last_modified)
+                            for url, entry in entries.items()})
+                except Exception as error:  # pylint: disable=W0703
+                    result.failures[key] = error
+                else:
+                    result.items[key] = _event(raw[0])
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO seasons VALUES (?, ?)',
+                         (year, time.time()))
+        return result
+
+    def store_event(self, event, teams, matches, awards, stats=None):
+        """Replaces everything stored for one event in a single transaction.
+
+        Args:
+            event: Raw json data of the event.
+            teams: List of raw json data of the event's teams.
+            matches: List of raw json data of the event's matches.
+            awards: List of raw json data of the event's awards.
+            stats: Raw json data of the event's stats, or None to keep what
+                is stored.
+        """
+        self.update_event(event['key'], event=event, teams=teams,
+                          matches=matches, awards=awards, stats=stats)
+
+    def update_event(self, key, event=None, teams=None, matches=None,
+                     awards=None, stats=None, validators=None, synced=None,
+                     complete=False):
+        """Replaces parts of what is stored for one event atomically.
+
+        Args:
+            key: String containing the event key. Example: 2015scmb
+            event, teams, matches, awards, stats: Raw json data replacing
+                that part, or None to keep what is stored.
+            validators: Dictionary of (etag, last_modified) pairs keyed by
+                URL, saved for later conditional requests.
+            synced: UNIX time the event was checked by a sync, or None.
+            complete: Whether the event was over when it was checked, so
+                later syncs can skip it.
+
+        Raises:
+            Raises a KeyError if the event isn't stored and event is None.
+        """
+        # pylint: disable=R0913
+        conn = self._connect()
+        with conn:
+            if event is not None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?)',
+                    (key, event['year'], event.get('start_date'),
+                     json.dumps(event)))
+            row = conn.execute('SELECT year FROM events WHERE key = ?',
+                               (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            year = row[0]
+            if teams is not None:
+                self._store_teams(conn, key, teams)
+            if matches is not None:
+                self._store_matches(conn, key, year, matches)
+            if awards is not None:
+                self._store_awards(conn, key, year, awards)
+            if stats is not None:
+                conn.execute('INSERT OR REPLACE INTO event_stats '
+                             'VALUES (?, ?)', (key, json.dumps(stats)))
+            conn.executemany(
+                'INSERT OR REPLACE INTO validators VALUES (?, ?, ?)',
+                [(url, etag, last_modified) for url, (etag, last_modified)
+                 in (validators or {}).items()])
+            if synced is not None:
+                conn.execute('INSERT OR REPLACE INTO event_sync '
+                             'VALUES (?, ?, ?)', (key, synced, int(complete)))
+                conn.execute('DELETE FROM sync_failures WHERE event_key = ?',
+                             (key,))
+
+    def validators(self, url):
+        """Returns the (etag, last_modified) pair saved for url."""
+        row = self._connect().execute(
+            'SELECT etag, last_modified FROM validators WHERE url = ?',
+            (url,)).fetchone()
+        return tuple(row) if row is not None else (None, None)
+
+    def save_validators(self, url, etag, last_modified):
+        """Saves the validators of url for later conditional requests."""
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO validators VALUES (?, ?, ?)',
+                         (url, etag, last_modified))
+
+    def sync_state(self, event_key):
+        """Returns (UNIX time last synced, complete) for an event, or
+        (None, False) if it was never synced."""
+        row = self._connect().execute(
+            'SELECT checked, complete FROM event_sync WHERE event_key = ?',
+            (event_key,)).fetchone()
+        return (row[0], bool(row[1])) if row is not None else (None, False)
+
+    def record_failure(self, year, event_key, error):
+        """Remembers that syncing an event failed, until it next succeeds.
+
+        Args:
+            year: Integer containing the season of the event.
+            event_key: String containing the event key. Example: 2015scmb
+            error: The exception that stopped the event.
+        """
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO sync_failures '
+                         'VALUES (?, ?, ?, ?)',
+                         (event_key, year, time.time(), repr(error)))
+
+    def sync_failures(self, year):
+        """Returns the events of year whose last sync failed.
+
+        Returns:
+            A dictionary of the error description keyed by event key.
+        """
+        return dict(self._connect().execute(
+            'SELECT event_key, error FROM sync_failures WHERE year = ?',
+            (year,)))
+
+    def begin_sync(self, year):
+        """Starts a sync run of year, or resumes an interrupted one.
+
+        Returns:
+            A tuple of the UNIX time the run started and whether it is
+            resumed. Finished events checked since then don't need checking
+            again.
+        """
+        conn = self._connect()
+        with conn:
+            row = conn.execute('SELECT started, finished FROM sync_runs '
+                               'WHERE year = ?', (year,)).fetchone()
+            if row is not None and row[1] is None:
+                return row[0], True
+            started = time.time()
+            conn.execute('INSERT OR REPLACE INTO sync_runs VALUES (?, ?, ?)',
+                         (year, started, None))
+        return started, False
+
+    def finish_sync(self, year):
+        """Marks the sync run of year as finished."""
+        with self._connect() as conn:
+            conn.execute('UPDATE sync_runs SET finished = ? WHERE year = ?',
+                         (time.time(), year))
+            conn.execute('INSERT OR REPLACE INTO seasons VALUES (?, ?)',
+                         (year, time.time()))
+
+    def seasons(self):
+        """Returns a dictionary of ingestion UNIX times keyed by year."""
+        return dict(self._connect().execute(
+            'SELECT year, ingested FROM seasons'))
+
+    def event(self, key, include=()):
+        """Returns the stored Event with key, or None.
+
+        Args:
+            key: String containing the event key. Example: 2015scmb
+            include: Iterable of the relationships to fill from the store,
+                any of 'teams', 'matches' and 'awards'.
+        """
+        row = self._connect().execute('SELECT data FROM events WHERE key = ?',
+                                      (key.lower(),)).fetchone()
+        if row is None:
+            return None
+        event = _event(json.loads(row[0]))
+        for name in include:
+            if name not in ('teams', 'matches', 'awards'):
+                raise ValueError("Unknown include %s" % name)
+            setattr(event, name, getattr(self, name)(event_key=event.key))
+        return event
+
+    def events(self, year=None, team=None):
+        """Returns the stored events, ordered by start date.
+
+        Args:
+            year: Integer limiting the events to one season.
+            team: Team number or key limiting the events to those the team
+                attended. Example: 281 or frc281
+        """
+        sql = 'SELECT e.data FROM events e'
+        clauses, params = [], []
+        if team is not None:
+            sql += ' JOIN event_teams et ON et.event_key = e.key'
+            clauses.append('et.team_number = ?')
+            params.append(_team_number(team))
+        if year is not None:
+            clauses.append('e.year = ?')
+            params.append(year)
+        rows = self._query(sql, clauses, params, 'ORDER BY e.start_date, '
+                           'e.key')
+        return [_event(json.loads(data)) for data, in rows]
+
+    def team(self, team):
+        """Returns the stored Team, or None.
+
+        Args:
+            team: Team number or key. Example: 281 or frc281
+        """
+        row = self._connect().execute(
+            'SELECT data FROM teams WHERE team_number = ?',
+            (_team_number(team),)).fetchone()
+        return _team(json.loads(row[0])) if row is not None else None
+
+    def teams(self, event_key=None):
+        """Returns the stored teams ordered by number, optionally only those
+        at event_key."""
+        sql = 'SELECT t.data FROM teams t'
+        clauses, params = [], []
+        if event_key is not None:
+            sql += ' JOIN event_teams et ON et.team_number = t.team_number'
+            clauses.append('et.event_key = ?')
+            params.append(event_key.lower())
+        rows = self._query(sql, clauses, params, 'ORDER BY t.team_number')
+        return [_team(json.loads(data)) for data, in rows]
+
+    def stats(self, event_key):
+        """Returns the stored stats of an event, shaped like Event.stats,
+        or None."""
+        row = self._connect().execute(
+            'SELECT data FROM event_stats WHERE event_key = ?',
+            (event_key.lower(),)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def match(self, key):
+        """Returns the stored Match with key, or None."""
+        row = self._connect().execute(
+            'SELECT data FROM matches WHERE key = ?',
+            (key.lower(),)).fetchone()
+        return _match(json.loads(row[0])) if row is not None else None
+
+    def matches(self, team=None, event_key=None, year=None, comp_level=None):
+        """Returns the stored matches matching every given filter.
+
+        Args:
+            team: Team number or key that played in the matches. A B-team
+                key such as frc254B only matches the B team's matches.
+            event_key: String containing the key of the event.
+            year: Integer containing the season.
+            comp_level: String containing the comp level. Example: qm
+
+        Returns:
+            A list of Match models ordered by event, then as TBA orders
+            matches within an event.
+        """
+        sql = 'SELECT m.data FROM matches m'
+        clauses, params = [], []
+        if team is not None:
+            sql += ' JOIN match_teams mt ON mt.match_key = m.key'
+            clauses.append('mt.team_key = ?')
+            params.append(_team_key(team))
+            if year is not None:
+                clauses.append('mt.year = ?')
+                params.append(year)
+        elif year is not None:
+            clauses.append('m.year = ?')
+            params.append(year)
+        if event_key is not None:
+            clauses.append('m.event_key = ?')
+            params.append(event_key.lower())
+        if comp_level is not None:
+            clauses.append('m.comp_level = ?')
+            params.append(comp_level)
+        rows = self._query(sql, clauses, params, _MATCH_ORDER)
+        return [_match(json.loads(data)) for data, in rows]
+
+    def awards(self, team=None, event_key=None, year=None, award_type=None):
+        """Returns the stored awards matching every given filter.
+
+        Args:
+            team: Team number or key among the recipients.
+            event_key: String containing the key of the event.
+            year: Integer containing the season.
+            award_type: Integer containing the TBA award type. Example: 1
+
+        Returns:
+            A list of Award models in the order they were stored.
+        """
+        sql = 'SELECT a.data FROM awards a'
+        clauses, params = [], []
+        if team is not None:
+            sql += ' JOIN award_recipients ar ON ar.award_id = a.id'
+            clauses.append('ar.team_number = ?')
+            params.append(_team_number(team))
+        for column, value in (('a.event_key', event_key), ('a.year', year),
+                              ('a.award_type', award_type)):
+            if value is not None:
+                clauses.append(column + ' = ?')
+                params.append(value.lower() if column == 'a.event_key'
+                              else value)
+        rows = self._query(sql, clauses, params, 'ORDER BY a.id')
+        return [_award(json.loads(data)) for data, in rows]
+
+    def close(self):
+        """Closes the calling thread's connection to the database."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _store_teams(conn, event_key, teams):
+        conn.executemany(
+            'INSERT OR REPLACE INTO teams VALUES (?, ?)',
+            [(team['team_number'], json.dumps(team)) for team in teams])
+        conn.execute('DELETE FROM event_teams WHERE event_key = ?',
+                     (event_key,))
+        conn.executemany(
+            'INSERT INTO event_teams VALUES (?, ?)',
+            [(event_key, team['team_number']) for team in teams])
+
+    @staticmethod
+    def _store_awards(conn, event_key, year, awards):
+        conn.execute('DELETE FROM award_recipients WHERE award_id IN '
+                     '(SELECT id FROM awards WHERE event_key = ?)',
+                     (event_key,))
+        conn.execute('DELETE FROM awards WHERE event_key = ?', (event_key,))
+        for award in awards:
+            award_id = conn.execute(
+                'INSERT INTO awards (event_key, year, award_type, data) '
+                'VALUES (?, ?, ?, ?)',
+                (event_key, year, award.get('award_type'),
+                 json.dumps(award))).lastrowid
+            conn.executemany(
+                'INSERT INTO award_recipients VALUES (?, ?)',
+                [(award_id, recipient['team_number'])
+                 for recipient in award.get('recipient_list') or []
+                 if recipient.get('team_number') is not None])
+
+    @staticmethod
+    def _store_matches(conn, event_key, year, matches):
+        conn.execute('DELETE FROM match_teams WHERE match_key IN '
+                     '(SELECT key FROM matches WHERE event_key = ?)',
+                     (event_key,))
+        conn.execute('DELETE FROM matches WHERE event_key = ?', (event_key,))
+        conn.executemany(
+            'INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            [(match['key'], event_key, year, match['comp_level'],
+              match.get('set_number'), match.get('match_number'),
+              match.get('time'), json.dumps(match)) for match in matches])
+        conn.executemany(
+            'INSERT OR REPLACE INTO match_teams VALUES (?, ?, ?, ?)',
+            _match_teams(year, matches))
+
+    def _query(self, sql, clauses, params, order):
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        return self._connect().execute(sql + ' ' + order, params).fetchall()
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+
+def _team_key(team):
+    # Accepts 281, '281', 'frc281' and B-team keys such as 'frc254B'.
+    team = str(team)
+    if team.lower().startswith('frc'):
+        team = team[3:]
+    return 'frc' + team.upper()
+
+
+def _team_number(team):
+    # Teams, events and awards belong to the main team: frc254B is 254.
+    return int(_team_key(team)[3:].rstrip(string.ascii_uppercase))
+
+
+def _match_teams(year, matches):
+    # match_teams rows of raw match json data.
+    return [(match['key'], _team_key(team), year, color)
+            for match in matches
+            for color, alliance in (match.get('alliances') or {}).items()
+            for team in alliance.get('teams') or []]
+
+
+def _event(raw_data):
+    from TBApython.event import Event
+
+    return resolve(Event, raw_data['key']).event_from_raw_data(raw_data)
+
+
+def _team(raw_data):
+    from TBApython.team import Team
+
+    return resolve(Team, raw_data['key']).team_from_raw_data(raw_data)
+
+
+def _match(raw_data):
+    from TBApython.match import Match
+
+    return resolve(Match, raw_data['key']).match_from_raw_data(raw_data)
+
+
+def _award(raw_data):
+    from TBApython.award import Award
+
+    return Award().award_from_raw_data(raw_data)
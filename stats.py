@@ -0,0 +1,246 @@
+"""This script computes OPR, DPR and CCWM locally from match data from The
+Blue Alliance API
+
+Like TBA, only played qualification matches are used. Results have the same
+shape as Event.stats:
+
+    {'oprs': {'281': 31.2, ...}, 'dprs': {...}, 'ccwms': {...}}
+
+Each team's OPR is the least-squares solution of "the OPRs of an alliance
+add up to its score" over every alliance in every match, DPR uses the
+opposing score instead and CCWM is their difference. It needs NumPy.
+"""
+
+import numpy
+
+from TBApython.table import NO_TEAM
+from TBApython.table import MatchTable
+
+
+class StatsEngine(object):
+    """Incrementally maintained OPR/DPR/CCWM for one event.
+
+    Only the normal equations are stored, so adding matches costs a few
+    array updates and solving is one small linear solve. A match that is
+    added again, for example after a score correction, replaces its earlier
+    contribution.
+
+    Attributes:
+        team_keys: List of the team keys seen so far, in column order.
+    """
+
+    def __init__(self):
+        self.team_keys = []
+        self._columns = {}
+        self._normal = numpy.zeros((0, 0))
+        self._scores = numpy.zeros((0, 2))
+        self._rows = {}
+
+    def __repr__(self):
+        return "StatsEngine(%d teams, %d matches)" % (len(self.team_keys),
+                                                      len(self._rows))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add_matches(self, matches):
+        """Adds new or changed matches.
+
+        Matches that were added before but are no longer played
+        qualification matches, for example because their score was reset,
+        are removed.
+
+        Args:
+            matches: list of Match models, or a MatchTable.
+
+        Returns:
+            self
+        """
+        if not isinstance(matches, MatchTable):
+            matches = MatchTable.from_matches(matches)
+        mask = _qualification_mask(matches)
+        table = matches.select(mask)
+        if self._rows:
+            for key in matches.select(~mask).keys():
+                self.remove_match(key)
+        added = []
+        for position, key in enumerate(table.keys()):
+            row = (_team_keys(table, table.red_teams[position]),
+                   _team_keys(table, table.blue_teams[position]),
+                   int(table.red_score[position]),
+                   int(table.blue_score[position]))
+            previous = self._rows.get(key)
+            if previous == row:
+                continue
+            if previous is not None:
+                self._contribute([previous], -1)
+            self._rows[key] = row
+            added.append(row)
+        if added:
+            self._contribute(added, 1)
+        return self
+
+    def remove_match(self, key):
+        """Removes the contribution of the match with key, if any."""
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._contribute([row], -1)
+
+    def solve(self):
+        """Returns the current stats in the shape of Event.stats."""
+        if not self.team_keys:
+            return _as_stats([], numpy.zeros((0, 2)))
+        solution = numpy.linalg.lstsq(self._normal, self._scores,
+                                      rcond=None)[0]
+        return _as_stats(self.team_keys, solution)
+
+    def _contribute(self, rows, sign):
+        for row in rows:
+            for team in row[0] + row[1]:
+                if team not in self._columns:
+                    self._columns[team] = len(self.team_keys)
+                    self.team_keys.append(team)
+        size = len(self.team_keys)
+        if size > len(self._normal):
+            normal = numpy.zeros((size, size))
+            normal[:len(self._normal), :len(self._normal)] = self._normal
+            scores = numpy.zeros((size, 2))
+            scores[:len(self._scores)] = self._scores
+            self._normal, self._scores = normal, scores
+        width = max(len(teams) for row in rows for teams in row[:2])
+        red = _columns(self._columns, [row[0] for row in rows], width)
+        blue = _columns(self._columns, [row[1] for row in rows], width)
+        red_score = numpy.array([row[2] for row in rows], dtype=float)
+        blue_score = numpy.array([row[3] for row in rows], dtype=float)
+        normal, scores = _normal_equations(
+            numpy.concatenate([red, blue]),
+            numpy.concatenate([red_score, blue_score]),
+            numpy.concatenate([blue_score, red_score]), size)
+        self._normal += sign * normal
+        self._scores += sign * scores
+
+
+def compute_stats(matches):
+    """Computes OPR, DPR and CCWM for one event.
+
+    Args:
+        matches: list of Match models, such as Event.matches, or a
+            MatchTable.
+
+    Returns:
+        A dictionary shaped like Event.stats.
+    """
+    return StatsEngine().add_matches(matches).solve()
+
+
+def compute_season_stats(table):
+    """Computes OPR, DPR and CCWM for every event in a table at once.
+
+    The normal equations of all events are padded to the size of the
+    largest event and solved in one batched call.
+
+    Args:
+        table: MatchTable holding the matches of many events, for example
+            from MatchTable.concatenate.
+
+    Returns:
+        A dictionary of Event.stats-shaped dictionaries keyed by event key.
+    """
+    table = _qualification_table(table)
+    events = []
+    for position, event_key in enumerate(table.event_keys):
+        rows = table.select(table.event_index == position)
+        if not len(rows):
+            continue
+        teams = numpy.unique(numpy.concatenate([rows.red_teams.ravel(),
+                                                rows.blue_teams.ravel()]))
+        teams = teams[teams != NO_TEAM]
+        events.append((event_key, rows, teams))
+    if not events:
+        return {}
+
+    size = max(len(teams) for _, _, teams in events)
+    normal = numpy.zeros((len(events), size, size))
+    scores = numpy.zeros((len(events), size, 2))
+    for position, (_, rows, teams) in enumerate(events):
+        # Maps positions in team_keys to the event's columns; the extra
+        # last entry keeps NO_TEAM padding, whose index is -1, as is.
+        lookup = numpy.full(len(table.team_keys) + 1, NO_TEAM,
+                            dtype=numpy.int64)
+        lookup[teams] = numpy.arange(len(teams))
+        red_score = rows.red_score.astype(float)
+        blue_score = rows.blue_score.astype(float)
+        event_normal, event_scores = _normal_equations(
+            lookup[numpy.concatenate([rows.red_teams, rows.blue_teams])],
+            numpy.concatenate([red_score, blue_score]),
+            numpy.concatenate([blue_score, red_score]), len(teams))
+        normal[position, :len(teams), :len(teams)] = event_normal
+        scores[position, :len(teams)] = event_scores
+        # Keep the padding decoupled from the teams; its solution is zero.
+        padding = numpy.arange(len(teams), size)
+        normal[position, padding, padding] = 1.0
+
+    # The pseudo-inverse gives the same minimum-norm answer as lstsq for
+    # events with too few matches to have a unique solution.
+    solutions = numpy.matmul(numpy.linalg.pinv(normal), scores)
+    return {event_key: _as_stats([table.team_keys[team] for team in teams],
+                                 solutions[position, :len(teams)])
+            for position, (event_key, _, teams) in enumerate(events)}
+
+
+def _qualification_table(matches):
+    if not isinstance(matches, MatchTable):
+        matches = MatchTable.from_matches(matches)
+    return matches.select(_qualification_mask(matches))
+
+
+def _qualification_mask(table):
+    return table.played() & table.for_comp_level('qm')
+
+
+def _team_keys(table, positions):
+    return tuple(table.team_keys[position] for position in positions
+                 if position != NO_TEAM)
+
+
+def _columns(columns, alliances, width):
+    # The column of every team of every alliance, padded with NO_TEAM.
+    array = numpy.full((len(alliances), width), NO_TEAM, dtype=numpy.int64)
+    for position, teams in enumerate(alliances):
+        array[position, :len(teams)] = [columns[team] for team in teams]
+    return array
+
+
+def _normal_equations(columns, own, opponent, size):
+    # Each row of columns is one alliance, holding the columns of its teams
+    # padded with NO_TEAM; it played for own[i] points and allowed
+    # opponent[i]. Returns A^T A and A^T [own, opponent] for the 0/1
+    # alliance membership matrix A without building A.
+    valid = columns != NO_TEAM
+    normal = numpy.zeros(size * size)
+    for first in range(columns.shape[1]):
+        for second in range(columns.shape[1]):
+            both = valid[:, first] & valid[:, second]
+            normal += numpy.bincount(
+                columns[both, first] * size + columns[both, second],
+                minlength=size * size)
+    scores = numpy.zeros((size, 2))
+    flat_columns = columns[valid]
+    alliance = numpy.nonzero(valid)[0]
+    scores[:, 0] = numpy.bincount(flat_columns, weights=own[alliance],
+                                  minlength=size)
+    scores[:, 1] = numpy.bincount(flat_columns, weights=opponent[alliance],
+                                  minlength=size)
+    return normal.reshape(size, size), scores
+
+
+def _as_stats(team_keys, solution):
+    # Like TBA, stats are keyed by the team key without its frc prefix.
+    oprs, dprs, ccwms = {}, {}, {}
+    for position, team_key in enumerate(team_keys):
+        opr, dpr = float(solution[position, 0]), float(solution[position, 1])
+        name = team_key[3:]
+        oprs[name] = opr
+        dprs[name] = dpr
+        ccwms[name] = opr - dpr
+    return {'oprs': oprs, 'dprs': dprs, 'ccwms': ccwms}
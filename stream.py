@@ -0,0 +1,274 @@
+"""This script streams large list responses from The Blue Alliance API
+
+The response is decompressed and parsed element by element as it arrives
+instead of being read, decoded and parsed as a whole, so memory stays flat
+however long the list is:
+
+    for award in iter_awards(team.awards_url()):
+        print(award)
+
+Streamed responses bypass the response caches, but are paced and retried
+like get_data's.
+"""
+
+import codecs
+import contextlib
+import http.client
+import json
+import time
+
+import TBApython
+from TBApython import metrics
+from TBApython.exceptions import APIUnavailableError
+from TBApython.exceptions import APPIDNotSetError
+from TBApython.exceptions import ResourceUnavailableError
+from TBApython.exceptions import UnexpectedDataError
+from TBApython.identity import resolve
+from TBApython.transport import iter_content
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(chunks):
+    """Yields the elements of a JSON array spread over chunks of bytes.
+
+    Args:
+        chunks: Iterable of bytes holding UTF-8 encoded JSON text whose top
+            level value is an array.
+
+    Yields:
+        Each decoded element of the array, in order.
+
+    Raises:
+        Raises a ValueError if the text isn't a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    position = 0
+    started = False
+    finished = False
+    # False right after an element, when only ',' or ']' may come next.
+    separated = True
+    empty = True
+    while True:
+        while position < len(buffer) and buffer[position] in _WHITESPACE:
+            position += 1
+        if position < len(buffer):
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                position += 1
+                continue
+            if char == ']':
+                if separated and not empty:
+                    raise ValueError('Trailing comma in JSON array')
+                return
+            if char == ',' and not separated:
+                separated = True
+                position += 1
+                continue
+            if not separated:
+                raise ValueError("Expected ',' or ']' in JSON array")
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                end = None
+            # A number cut off by the end of a chunk parses as a shorter
+            # number, so an element only counts once a delimiter follows it.
+            following = buffer[end:end + 1] if end is not None else ''
+            if following and following in _WHITESPACE + ',]':
+                yield element
+                position = end
+                separated = empty = False
+                continue
+            if finished:
+                raise ValueError('Malformed JSON array element')
+        if finished:
+            raise ValueError('Unterminated JSON array')
+        # Need more data; drop what has been consumed first.
+        buffer = buffer[position:]
+        position = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += text_decoder.decode(b'', final=True)
+            finished = True
+        else:
+            buffer += text_decoder.decode(chunk)
+
+
+def iter_data(url, transport=None):
+    """Yields the elements of a JSON array retrieved from TBA API.
+
+    The request is paced, retried and reported to the metrics observers
+    like get_data's; for streamed responses 'transfer' includes the time
+    spent consuming the elements.
+
+    Args:
+        url: string containing the API URL of a list endpoint.
+        transport: Transport to send the request over. Defaults to the
+            shared keep-alive transport.
+
+    Yields:
+        Each element of the list as raw json data.
+
+    Raises:
+        Raises a ResourceUnavailableError if the API returns an error status,
+        an APIUnavailableError if the API can't be reached and an
+        UnexpectedDataError if the response isn't a JSON array.
+    """
+    if TBApython.API_URL == '':
+        raise APPIDNotSetError()
+    if transport is None:
+        transport = TBApython.get_transport()
+    # pylint: disable=W0212
+    fetch = TBApython._Fetch.revalidating(url, None, None)
+    observation = metrics.Observation(url) if metrics.is_enabled() else None
+    streams = _Streams(transport)
+    error = None
+    try:
+        sent = time.perf_counter()
+        response = TBApython._send(fetch, transport, observation,
+                                   streams.request)
+        if response.status >= 300:
+            if observation is not None:
+                observation.sent(response, sent, 0)
+            raise ResourceUnavailableError(url=url)
+        if observation is not None:
+            observation.event.status = response.status
+        body = _CountingReader(response)
+        try:
+            for element in iter_json_array(iter_content(body, CHUNK_SIZE)):
+                yield element
+        except ValueError:
+            raise UnexpectedDataError(url=url)
+        except (http.client.HTTPException, OSError) as cause:
+            raise APIUnavailableError() from cause
+        if observation is not None:
+            observation.event.cache = 'miss'
+            observation.sent(response, sent, body.bytes)
+    except BaseException as raised:
+        # Includes the GeneratorExit of a consumer that stops early, which
+        # the observers see as the request's error.
+        error = raised
+        raise
+    finally:
+        streams.close()
+        if observation is not None:
+            observation.done(error)
+
+
+class _Streams(object):
+    """Opens streamed responses for _send, keeping only the last one."""
+
+    def __init__(self, transport):
+        self._transport = transport
+        self._stack = contextlib.ExitStack()
+
+    def request(self, url, headers=None, timings=None):
+        """Closes the response of the previous attempt and opens another."""
+        self._stack.close()
+        return self._stack.enter_context(self._transport.stream(
+            url, headers=headers, timings=timings))
+
+    def close(self):
+        """Closes the open response, pooling its connection if it was read
+        to the end."""
+        self._stack.close()
+
+
+class _CountingReader(object):
+    """Counts the bytes read from a response as they are transferred."""
+
+    # pylint: disable=R0903
+
+    def __init__(self, response):
+        self.response = response
+        self.bytes = 0
+
+    def getheader(self, name, default=None):
+        """Returns the response header name."""
+        return self.response.getheader(name, default)
+
+    def read(self, size):
+        """Reads up to size bytes of the body."""
+        chunk = self.response.read(size)
+        self.bytes += len(chunk)
+        return chunk
+
+
+def iter_matches(url, transport=None):
+    """Yields Match models from a match list endpoint one at a time.
+
+    Args:
+        url: string containing the API URL. Example: event.matches_url()
+        transport: Transport to send the request over.
+
+    Yields:
+        Match models.
+    """
+    from TBApython.match import Match
+
+    for raw_data in iter_data(url, transport):
+        yield resolve(Match, raw_data.get('key')).match_from_raw_data(
+            raw_data)
+
+
+def iter_teams(url, transport=None):
+    """Yields Team models from a team list endpoint one at a time.
+
+    Args:
+        url: string containing the API URL. Example: event.teams_url()
+        transport: Transport to send the request over.
+
+    Yields:
+        Team models.
+    """
+    from TBApython.team import Team
+
+    for raw_data in iter_data(url, transport):
+        yield resolve(Team, raw_data.get('key')).team_from_raw_data(raw_data)
+
+
+def iter_events(url, transport=None):
+    """Yields Event models from an event list endpoint one at a time.
+
+    Args:
+        url: string containing the API URL. Example: team.events_url(2015)
+        transport: Transport to send the request over.
+
+    Yields:
+        Event models.
+    """
+    from TBApython.event import Event
+
+    for raw_data in iter_data(url, transport):
+        yield resolve(Event, raw_data.get('key')).event_from_raw_data(
+            raw_data)
+
+
+def iter_awards(url, transport=None):
+    """Yields Award models from an award list endpoint one at a time.
+
+    Args:
+        url: string containing the API URL. Example: team.awards_url()
+        transport: Transport to send the request over.
+
+    Yields:
+        Award models.
+
+    Raises:
+        Raises an UnexpectedDataError if an award isn't properly formatted.
+    """
+    from TBApython.award import Award
+
+    for raw_data in iter_data(url, transport):
+        # award_from_raw_data returns None for badly formatted data.
+        award = Award().award_from_raw_data(raw_data)
+        if award is None:
+            raise UnexpectedDataError(url=url)
+        yield award
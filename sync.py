@@ -0,0 +1,169 @@
+"""This script incrementally syncs a SeasonStore with The Blue Alliance API
+
+Instead of downloading a season again, a sync walks the season's event list
+and only asks for what may have changed:
+
+* events that were already over when last synced are skipped,
+* events that haven't started yet only have their details and teams
+  checked,
+* everything else is checked with conditional requests, so unchanged parts
+  cost a 304 answer and nothing is rewritten.
+
+Each event is committed on its own, so an interrupted sync resumes where it
+stopped when run again. A run always finishes, even if some events failed;
+those are recorded in the store and checked again by the next run, without
+holding back the others:
+
+    report = sync_season(SeasonStore('tba-2015.db'), 2015)
+    print(report, report.updated)
+"""
+
+import concurrent.futures
+import datetime
+import time
+
+from TBApython import get_api_url
+from TBApython import get_data_if_modified
+from TBApython.bulk import DEFAULT_MAX_WORKERS
+
+# Days after its end date an event's results are considered final.
+FINISHED_GRACE = datetime.timedelta(days=2)
+# Days before its start date an event may already have a schedule.
+UPCOMING_WINDOW = datetime.timedelta(days=1)
+PARTS = (('event', ''), ('teams', '/teams'), ('matches', '/matches'),
+         ('awards', '/awards'), ('stats', '/stats'))
+UPCOMING_PARTS = PARTS[:2]
+
+
+class SyncReport(object):
+    """Model for what a sync run did.
+
+    Attributes:
+        year: Integer containing the synced season.
+        resumed: Whether the run picked up an interrupted one.
+        updated: Dictionary of the changed part names, such as ['matches'],
+            keyed by event key.
+        unchanged: List of the checked event keys nothing changed for.
+        skipped: Dictionary of the reason, 'complete' or 'resumed', keyed by
+            the event keys that weren't checked.
+        failures: Dictionary of the exception that stopped each failed
+            event key. They are recorded in the store and the next run
+            retries them.
+        requests: Integer containing the number of requests sent.
+    """
+
+    def __init__(self, year, resumed):
+        self.year = year
+        self.resumed = resumed
+        self.updated = {}
+        self.unchanged = []
+        self.skipped = {}
+        self.failures = {}
+        self.requests = 0
+
+    def __repr__(self):
+        return "%d updated, %d unchanged, %d skipped, %d failed" % (
+            len(self.updated), len(self.unchanged), len(self.skipped),
+            len(self.failures))
+
+
+def sync_season(store, year, today=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Brings a season in store up to date with the API.
+
+    Args:
+        store: SeasonStore to update.
+        year: Integer containing the season. Example: 2015
+        today: datetime.date the event dates are compared to. Defaults to
+            the current date.
+        max_workers: Integer containing the number of concurrent requests.
+
+    Returns:
+        A SyncReport.
+
+    Raises:
+        Raises the get_data exceptions if the season's event list can't be
+        retrieved.
+    """
+    started, resumed = store.begin_sync(year)
+    report = SyncReport(year, resumed)
+    today = today or datetime.date.today()
+
+    list_url = get_api_url() + 'events/%d' % year
+    listing = get_data_if_modified(list_url, *store.validators(list_url))
+    report.requests += 1
+    if listing is None:
+        events = [(event.key, event.start_date, event.end_date)
+                  for event in store.events(year=year)]
+    else:
+        events = [(event['key'], event.get('start_date'),
+                   event.get('end_date')) for event in listing.data]
+
+    plan = []
+    failed = store.sync_failures(year)
+    for key, start_date, end_date in events:
+        checked, complete = store.sync_state(key)
+        upcoming = _date(start_date) is not None and (
+            _date(start_date) - UPCOMING_WINDOW > today)
+        finished = _date(end_date) is not None and (
+            _date(end_date) + FINISHED_GRACE < today)
+        if complete:
+            report.skipped[key] = 'complete'
+        elif (resumed and finished and key not in failed and
+              checked is not None and checked >= started):
+            # Live and upcoming events are always checked again; only
+            # finished ones are left alone when resuming.
+            report.skipped[key] = 'resumed'
+        elif upcoming:
+            plan.append((key, UPCOMING_PARTS, False))
+        else:
+            plan.append((key, PARTS, finished))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = {}
+        for key, parts, _ in plan:
+            for _, suffix in parts:
+                url = get_api_url() + 'event/' + key + suffix
+                futures[url] = executor.submit(
+                    get_data_if_modified, url, *store.validators(url))
+        report.requests += len(futures)
+        for key, parts, finished in plan:
+            _apply(store, report, key, parts, finished, futures)
+
+    for key, error in report.failures.items():
+        store.record_failure(year, key, error)
+    if listing is not None and not report.failures:
+        # A failed event may not be stored yet, so the next run needs the
+        # full list to find it again.
+        store.save_validators(list_url, listing.etag, listing.last_modified)
+    store.finish_sync(year)
+    return report
+
+
+def _apply(store, report, key, parts, finished, futures):
+    # pylint: disable=R0913
+    changed = {}
+    validators = {}
+    try:
+        for name, suffix in parts:
+            url = get_api_url() + 'event/' + key + suffix
+            entry = futures[url].result()
+            if entry is not None:
+                changed[name] = entry.data
+                validators[url] = (entry.etag, entry.last_modified)
+        store.update_event(key, validators=validators, synced=time.time(),
+                           complete=finished, **changed)
+    except Exception as error:  # pylint: disable=W0703
+        report.failures[key] = error
+        return
+    if changed:
+        report.updated[key] = [name for name, _ in parts if name in changed]
+    else:
+        report.unchanged.append(key)
+
+
+def _date(value):
+    # Event dates look like 2015-03-05.
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,325 @@
+"""This script holds a columnar representation of match data from The Blue
+Alliance API
+
+It needs NumPy, which the rest of the module does not:
+
+    table = MatchTable.from_raw_data(get_data(event.matches_url()))
+    teams, averages = table.team_average_scores()
+"""
+
+import numpy
+
+from TBApython.exceptions import MatchFormattingError
+
+COMP_LEVELS = ('qm', 'ef', 'qf', 'sf', 'f')
+ALLIANCE_SIZE = 3
+NO_TEAM = -1
+NO_TIME = -1
+NO_SCORE = -1
+
+
+class MatchTable(object):
+    """Columnar model for a list of matches.
+
+    Every column is a NumPy array with one row per match, so aggregations
+    over a season run vectorized instead of looping over Match objects.
+    Event and team keys are stored once in event_keys and team_keys and
+    referenced by index, so B teams such as frc254B get their own column.
+
+    Attributes:
+        event_keys: List of the distinct event keys. Example: ['2015scmb']
+        team_keys: List of the distinct team keys. Example: ['frc281']
+        event_index: int32 array of each match's position in event_keys.
+        comp_level: int8 array of each match's position in COMP_LEVELS.
+        set_number: int16 array of set numbers.
+        match_number: int16 array of match numbers.
+        time: int64 array of UNIX timestamps, NO_TIME when unscheduled.
+        red_teams: int32 array of shape (matches, alliance size) containing
+            the positions of the red teams in team_keys, padded with
+            NO_TEAM.
+        blue_teams: int32 array like red_teams for the blue alliance.
+        red_score: int16 array of red scores, NO_SCORE when not played.
+        blue_score: int16 array of blue scores, NO_SCORE when not played.
+    """
+
+    # pylint: disable=R0902
+    # One attribute per column.
+
+    def __init__(self, event_keys, team_keys, event_index, comp_level,
+                 set_number, match_number, time, red_teams, blue_teams,
+                 red_score, blue_score):
+        # pylint: disable=R0913
+        self.event_keys = list(event_keys)
+        self.team_keys = list(team_keys)
+        self.event_index = numpy.asarray(event_index, dtype=numpy.int32)
+        self.comp_level = numpy.asarray(comp_level, dtype=numpy.int8)
+        self.set_number = numpy.asarray(set_number, dtype=numpy.int16)
+        self.match_number = numpy.asarray(match_number, dtype=numpy.int16)
+        self.time = numpy.asarray(time, dtype=numpy.int64)
+        self.red_teams = numpy.asarray(red_teams, dtype=numpy.int32)
+        self.blue_teams = numpy.asarray(blue_teams, dtype=numpy.int32)
+        self.red_score = numpy.asarray(red_score, dtype=numpy.int16)
+        self.blue_score = numpy.asarray(blue_score, dtype=numpy.int16)
+
+    def __repr__(self):
+        return "MatchTable(%d matches, %d events, %d teams)" % (
+            len(self), len(self.event_keys), len(self.team_keys))
+
+    def __len__(self):
+        return len(self.event_index)
+
+    @classmethod
+    def from_raw_data(cls, raw_data):
+        """Builds a table straight from raw match json data.
+
+        Args:
+            raw_data: list of match json data, as returned for
+                event/<key>/matches.
+
+        Returns:
+            A MatchTable.
+
+        Raises:
+            Raises a MatchFormattingError if raw_data doesn't have proper
+            formatting.
+        """
+        rows = []
+        try:
+            for match in raw_data:
+                alliances = match['alliances']
+                rows.append((match['event_key'], match['comp_level'],
+                             match['set_number'], match['match_number'],
+                             match['time'], alliances['red']['teams'],
+                             alliances['blue']['teams'],
+                             alliances['red']['score'],
+                             alliances['blue']['score']))
+        except (KeyError, TypeError):
+            raise MatchFormattingError()
+        return cls._from_rows(rows)
+
+    @classmethod
+    def from_matches(cls, matches):
+        """Builds a table from a list of Match models.
+
+        Args:
+            matches: list of Match models, such as Event.matches.
+
+        Returns:
+            A MatchTable.
+
+        Raises:
+            Raises a MatchFormattingError if a match has no alliance data.
+        """
+        rows = []
+        try:
+            for match in matches:
+                alliances = match.alliances
+                rows.append((match.event_key, match.comp_level,
+                             match.set_number, match.match_number,
+                             match.time, alliances['red']['teams'],
+                             alliances['blue']['teams'],
+                             alliances['red']['score'],
+                             alliances['blue']['score']))
+        except (KeyError, TypeError):
+            raise MatchFormattingError()
+        return cls._from_rows(rows)
+
+    @classmethod
+    def concatenate(cls, tables):
+        """Joins several tables, for example one per event, into one."""
+        tables = list(tables)
+        if not tables:
+            return cls._from_rows([])
+        events = {}
+        teams = {}
+        event_index = []
+        red_teams = []
+        blue_teams = []
+        width = max(table.red_teams.shape[1] for table in tables)
+        for table in tables:
+            remap = numpy.array([events.setdefault(key, len(events))
+                                 for key in table.event_keys],
+                                dtype=numpy.int32)
+            event_index.append(remap[table.event_index])
+            # The trailing NO_TEAM keeps padding, whose index is -1, as is.
+            remap = numpy.array([teams.setdefault(key, len(teams))
+                                 for key in table.team_keys] + [NO_TEAM],
+                                dtype=numpy.int32)
+            red_teams.append(_pad(remap[table.red_teams], width))
+            blue_teams.append(_pad(remap[table.blue_teams], width))
+
+        def join(column):
+            return numpy.concatenate([getattr(table, column)
+                                      for table in tables])
+
+        return cls(sorted(events, key=events.get),
+                   sorted(teams, key=teams.get),
+                   numpy.concatenate(event_index), join('comp_level'),
+                   join('set_number'), join('match_number'), join('time'),
+                   numpy.concatenate(red_teams),
+                   numpy.concatenate(blue_teams), join('red_score'),
+                   join('blue_score'))
+
+    @classmethod
+    def _from_rows(cls, rows):
+        events = {}
+        teams = {}
+        count = len(rows)
+        width = max([ALLIANCE_SIZE] + [max(len(row[5]), len(row[6]))
+                                       for row in rows])
+        event_index = numpy.empty(count, dtype=numpy.int32)
+        comp_level = numpy.empty(count, dtype=numpy.int8)
+        red_teams = numpy.full((count, width), NO_TEAM, dtype=numpy.int32)
+        blue_teams = numpy.full((count, width), NO_TEAM, dtype=numpy.int32)
+        try:
+            for position, row in enumerate(rows):
+                event_index[position] = events.setdefault(row[0],
+                                                          len(events))
+                comp_level[position] = COMP_LEVELS.index(row[1])
+                red_teams[position, :len(row[5])] = [
+                    teams.setdefault(team, len(teams)) for team in row[5]]
+                blue_teams[position, :len(row[6])] = [
+                    teams.setdefault(team, len(teams)) for team in row[6]]
+        except (TypeError, ValueError):
+            raise MatchFormattingError()
+        return cls(sorted(events, key=events.get),
+                   sorted(teams, key=teams.get), event_index,
+                   comp_level, [row[2] for row in rows],
+                   [row[3] for row in rows],
+                   [NO_TIME if row[4] is None else row[4] for row in rows],
+                   red_teams, blue_teams,
+                   [NO_SCORE if row[7] is None else row[7] for row in rows],
+                   [NO_SCORE if row[8] is None else row[8] for row in rows])
+
+    def keys(self):
+        """Returns the TBA match key of every row as a list of strings."""
+        keys = []
+        for position in range(len(self)):
+            event_key = self.event_keys[self.event_index[position]]
+            level = COMP_LEVELS[self.comp_level[position]]
+            if level == 'qm':
+                keys.append('%s_qm%d' % (event_key,
+                                         self.match_number[position]))
+            else:
+                keys.append('%s_%s%dm%d' % (event_key, level,
+                                            self.set_number[position],
+                                            self.match_number[position]))
+        return keys
+
+    def to_matches(self):
+        """Converts the table back into a list of Match models.
+
+        Only the columns of the table are restored; score_breakdown, videos
+        and time_string are left as None.
+
+        Returns:
+            A list of Match models in row order.
+        """
+        from TBApython.match import Match
+
+        matches = []
+        for position, key in enumerate(self.keys()):
+            match = Match()
+            match.key = key
+            match.event_key = self.event_keys[self.event_index[position]]
+            match.comp_level = COMP_LEVELS[self.comp_level[position]]
+            match.set_number = int(self.set_number[position])
+            match.match_number = int(self.match_number[position])
+            time = int(self.time[position])
+            match.time = None if time == NO_TIME else time
+            match.alliances = {
+                'red': self._alliance(self.red_teams[position],
+                                      self.red_score[position]),
+                'blue': self._alliance(self.blue_teams[position],
+                                       self.blue_score[position]),
+            }
+            matches.append(match)
+        return matches
+
+    def select(self, mask):
+        """Returns a new table with the rows where mask is true."""
+        return MatchTable(self.event_keys, self.team_keys,
+                          self.event_index[mask],
+                          self.comp_level[mask], self.set_number[mask],
+                          self.match_number[mask], self.time[mask],
+                          self.red_teams[mask], self.blue_teams[mask],
+                          self.red_score[mask], self.blue_score[mask])
+
+    def played(self):
+        """Returns a boolean mask of the rows that have scores."""
+        return (self.red_score != NO_SCORE) & (self.blue_score != NO_SCORE)
+
+    def for_event(self, event_key):
+        """Returns a boolean mask of the rows played at event_key."""
+        if event_key not in self.event_keys:
+            return numpy.zeros(len(self), dtype=bool)
+        return self.event_index == self.event_keys.index(event_key)
+
+    def for_team(self, team):
+        """Returns a boolean mask of the rows a team played in.
+
+        Args:
+            team: Team number or key. Example: 281, 'frc281' or 'frc254B'
+        """
+        team_key = team if isinstance(team, str) else 'frc%d' % team
+        if team_key not in self.team_keys:
+            return numpy.zeros(len(self), dtype=bool)
+        position = self.team_keys.index(team_key)
+        return ((self.red_teams == position).any(axis=1) |
+                (self.blue_teams == position).any(axis=1))
+
+    def for_comp_level(self, comp_level):
+        """Returns a boolean mask of the rows at comp_level. Example: qm"""
+        return self.comp_level == COMP_LEVELS.index(comp_level)
+
+    def team_scores(self):
+        """Returns one (team, alliance score) pair per team per match.
+
+        Unplayed matches and empty alliance slots are left out.
+
+        Returns:
+            Two arrays of equal length: positions in team_keys and alliance
+            scores.
+        """
+        played = self.select(self.played())
+        width = played.red_teams.shape[1]
+        teams = numpy.concatenate([played.red_teams.ravel(),
+                                   played.blue_teams.ravel()])
+        scores = numpy.concatenate([numpy.repeat(played.red_score, width),
+                                    numpy.repeat(played.blue_score, width)])
+        keep = teams != NO_TEAM
+        return teams[keep], scores[keep].astype(numpy.int64)
+
+    def team_average_scores(self):
+        """Returns the average alliance score of every team.
+
+        Returns:
+            A list of the team keys in team_keys order, leaving out teams
+            without a played match, and an array of their average alliance
+            score over the played matches in the table.
+        """
+        teams, scores = self.team_scores()
+        positions, inverse = numpy.unique(teams, return_inverse=True)
+        totals = numpy.bincount(inverse, weights=scores,
+                                minlength=len(positions))
+        counts = numpy.bincount(inverse, minlength=len(positions))
+        return ([self.team_keys[position] for position in positions],
+                totals / numpy.maximum(counts, 1))
+
+    def _alliance(self, teams, score):
+        return {
+            'teams': [self.team_keys[position] for position in teams
+                      if position != NO_TEAM],
+            'score': int(score),
+        }
+
+    # pylint: enable=R0902
+
+
+def _pad(teams, width):
+    if teams.shape[1] == width:
+        return teams
+    padded = numpy.full((teams.shape[0], width), NO_TEAM, dtype=teams.dtype)
+    padded[:, :teams.shape[1]] = teams
+    return padded
+
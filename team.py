@@ -2,8 +2,14 @@
 Alliance API
 """
 
-from TBApython import API_URL
+from TBApython import get_api_url
 from TBApython import get_data
+from TBApython.identity import register
+from TBApython.identity import resolve
+from TBApython.identity import shared
+from TBApython.lazy import Relationship
+from TBApython.lazy import invalidate
+from TBApython.lazy import refresh
 from TBApython.exceptions import TeamFormattingError
 from TBApython.exceptions import YearsParticipatedFormattingError
 
@@ -34,38 +40,145 @@ class Team:
         nickname: String containing nickname provided by FIRST. Example: EnTech
             GreenVillians
         rookie_year: Integer containing the team's rookie year. Example: 1999
-        events: list containing event objects the team is attending.
-        matches: list containing match objects the team is participating in.
-        awards: list containing award objects the team has won
+        events: list containing event objects the team is attending. Fetched
+            on first access.
+        matches: list containing match objects the team is participating in,
+            for every event loaded so far.
+        matches_by_event: Dictionary of the team's match objects keyed by
+            event key.
+        awards_by_event: Dictionary of the award objects the team won at
+            each event loaded by load_seasons, keyed by event key.
+        awards: list containing award objects the team has won. Fetched on
+            first access.
         years_participated: list containing years in which the team
-            participated.
+            participated. Fetched on first access.
+        url: String containing the API URL the team was loaded from.
     """
 
     # pylint: disable=R0902
     # All of these are available from the API and need to maintain constistency.
 
-    def __init__(self, key=None):
+    __slots__ = ('website', 'name', 'locality', 'region', 'country_name',
+                 'location', 'team_number', 'key', 'nickname', 'rookie_year',
+                 '_events', 'matches', 'matches_by_event', '_awards',
+                 'awards_by_event', '_years_participated', 'url',
+                 '__weakref__')
+
+    events = Relationship('get_events')
+    awards = Relationship('get_awards')
+    years_participated = Relationship('get_years_participated')
+
+    def __new__(cls, key=None, lazy=False):
+        # pylint: disable=W0613
+        model = shared(cls, key) if key is not None else None
+        return model if model is not None else object.__new__(cls)
+
+    def __init__(self, key=None, lazy=False):
+        if key is not None and shared(Team, key) is self:
+            # __new__ returned the shared instance; keep what it loaded.
+            if not lazy:
+                self.load()
+            return None
+        self.key = key
+        self.url = None
+        self._events = None
+        self.matches = []
+        self.matches_by_event = {}
+        self._awards = None
+        self.awards_by_event = {}
+        self._years_participated = None
+        if key is not None and lazy:
+            # The remaining fields stay unset until __getattr__ loads them.
+            # Keys are registered lowercased, as shared() looks them up.
+            self.key = key.lower()
+            self.url = get_api_url() + 'team/' + self.key
+            register(self)
+            return None
         self.website = None
         self.name = None
         self.locality = None
         self.region = None
+        self.country_name = None
+        self.location = None
         self.team_number = None
-        self.key = key
         self.nickname = None
         self.rookie_year = None
-        self.events = []
-        self.matches = []
-        self.awards = []
-        self.years_participated = []
         if key is not None:
-            self.url = API_URL + 'team/' + key.lower()
-            raw_data = get_data(self.url)
-            self = self.team_from_raw_data(raw_data)
+            self.url = get_api_url() + 'team/' + key.lower()
+            self.load()
+            register(self)
         else:
             return None
 
     def __repr__(self):
-        return str(self.team_number)
+        # A lazy team that hasn't loaded shows its key instead of loading.
+        try:
+            return str(object.__getattribute__(self, 'team_number'))
+        except AttributeError:
+            return str(self.key)
+
+    def __getattr__(self, name):
+        # Only reached for unset slots, which are the fields of a team
+        # constructed with lazy=True that hasn't been loaded yet.
+        if name in Team.__slots__ and not name.startswith('_'):
+            if self.url is not None:
+                self.load()
+                return object.__getattribute__(self, name)
+        raise AttributeError("'Team' object has no attribute '%s'" % name)
+
+    def load(self):
+        """Retreives the team's own json data from API.
+
+        Called by the constructor, or on first attribute access for teams
+        constructed with lazy=True.
+
+        Args:
+            None
+
+        Returns:
+            self
+
+        Raises:
+            Raises a TeamFormattingError if the data doesn't have proper
+            formatting.
+        """
+        if self.url is None:
+            self.url = get_api_url() + 'team/' + self.key.lower()
+        return self.team_from_raw_data(get_data(self.url))
+
+    def invalidate(self, *names):
+        """Forgets loaded events, awards or years participated.
+
+        Their next access fetches them from the API again.
+
+        Args:
+            names: Names of the relationships to forget. Example: 'events'.
+                All of them when none are given.
+
+        Returns:
+            None
+
+        Raises:
+            Raises a ValueError for an unknown relationship name.
+        """
+        invalidate(self, names)
+
+    def refresh(self, *names):
+        """Fetches events, awards or years participated again right away.
+
+        Events and awards are refreshed for all years and events.
+
+        Args:
+            names: Names of the relationships to fetch. Example: 'events'.
+                Every loaded one when none are given.
+
+        Returns:
+            None
+
+        Raises:
+            Raises a ValueError for an unknown relationship name.
+        """
+        refresh(self, names)
 
     def team_from_raw_data(self, raw_data):
         """Populates team model from raw json data.
@@ -112,20 +225,38 @@ class Team:
             None
 
         """
-        from TBApython.event import Event
+        self.events_from_raw_data(get_data(self.events_url(year)))
 
-        self.events.clear()
+    def events_url(self, year=None):
+        """Returns the API URL of the team's events, optionally for a year."""
         if year is not None:
-            get_events_url = (API_URL + 'team/' + self.key + '/' + str(year) +
-                              '/events')
-        else:
-            get_events_url = API_URL + 'team/' + self.key + '/events'
-        get_events_raw_data = get_data(get_events_url)
-        for event in get_events_raw_data:
-            this_event = Event()
-            this_event.event_from_raw_data(event)
-            self.events.append(this_event)
+            return (get_api_url() + 'team/' + self.key + '/' + str(year) +
+                    '/events')
+        return get_api_url() + 'team/' + self.key + '/events'
 
+    def events_from_raw_data(self, raw_data):
+        """Populates events from raw json data.
+
+        Args:
+            raw_data: list of event json data
+
+        Returns:
+            self
+
+        Raises:
+            Raises a EventFormattingError if raw_data doesn't have proper
+            formatting.
+
+        """
+        from TBApython.event import Event
+
+        events = []
+        for event in raw_data:
+            this_event = resolve(Event, event.get('key'))
+            this_event.event_from_raw_data(event)
+            events.append(this_event)
+        self.events = events
+        return self
 
     def get_matches(self, event_key):
         """Retreives match json data from API.
@@ -141,17 +272,91 @@ class Team:
         Raises:
             None
 
+        """
+        self.matches_from_raw_data(get_data(self.matches_url(event_key)),
+                                   [event_key])
+
+    def matches_url(self, event_key):
+        """Returns the API URL of the team's matches at an event."""
+        return (get_api_url() + 'team/' + self.key + '/event/' + event_key +
+                '/matches')
+
+    def matches_from_raw_data(self, raw_data, event_keys=()):
+        """Populates matches from raw json data.
+
+        Args:
+            raw_data: list of match json data
+            event_keys: Iterable of the keys of the events whose complete
+                match lists raw_data holds. Their matches are replaced even
+                when raw_data has none left for them.
+
+        Returns:
+            self
+
+        Raises:
+            Raises a MatchFormattingError if raw_data doesn't have proper
+            formatting.
+
         """
         from TBApython.match import Match
 
-        self.matches.clear()
-        get_matches_url = (API_URL + 'team/' + self.key + '/event/' + event_key
-                           + '/matches')
-        get_matches_raw_data = get_data(get_matches_url)
-        for match in get_matches_raw_data:
-            this_match = Match()
+        matches = {event_key: [] for event_key in event_keys}
+        for match in raw_data:
+            this_match = resolve(Match, match.get('key'))
             this_match.match_from_raw_data(match)
-            self.matches.append(this_match)
+            matches.setdefault(this_match.event_key, []).append(this_match)
+        for event_key, event_matches in matches.items():
+            self._set_event_matches(event_key, event_matches)
+        return self
+
+    def matches_from_event(self, event):
+        """Populates the team's matches at an event from the event's matches.
+
+        Args:
+            event: Event object whose matches are loaded, or loaded on access.
+
+        Returns:
+            self
+        """
+        matches = []
+        for match in event.matches:
+            for alliance in (match.alliances or {}).values():
+                if self.key in (alliance.get('teams') or
+                                alliance.get('team_keys') or ()):
+                    matches.append(match)
+                    break
+        self._set_event_matches(event.key, matches)
+        return self
+
+    def load_seasons(self, years=None):
+        """Retreives the team's events, matches and awards for whole seasons.
+
+        The requests are sent concurrently, and match lists already loaded
+        for an event are reused. Use bulk.load_seasons for several teams.
+
+        Args:
+            years: Integer or iterable of integers containing the seasons to
+                load. Example: 2015. Defaults to years_participated.
+
+        Returns:
+            self
+
+        Raises:
+            Raises the exception that stopped loading.
+        """
+        from TBApython.bulk import load_seasons
+
+        result = load_seasons([self], years)
+        if self.key in result.failures:
+            raise result.failures[self.key]
+        return self
+
+    def _set_event_matches(self, event_key, matches):
+        # Replaces one event's matches and keeps the other events' ones.
+        self.matches_by_event[event_key] = matches
+        self.matches = [match for event_matches in
+                        self.matches_by_event.values()
+                        for match in event_matches]
 
     def get_awards(self, event_key=None):
         """Retreives awards json data from API.
@@ -168,19 +373,37 @@ class Team:
             None
 
         """
-        from TBApython.award import Award
+        self.awards_from_raw_data(get_data(self.awards_url(event_key)))
 
-        self.awards.clear()
+    def awards_url(self, event_key=None):
+        """Returns the API URL of the team's awards, at an event or ever."""
         if event_key is not None:
-            get_awards_url = (API_URL + 'team/' + self.key + '/event/' +
-                              event_key + '/awards')
-        else:
-            get_awards_url = API_URL + 'team/' + self.key + '/history/awards'
-        get_awards_raw_data = get_data(get_awards_url)
-        for award in get_awards_raw_data:
+            return (get_api_url() + 'team/' + self.key + '/event/' +
+                    event_key + '/awards')
+        return get_api_url() + 'team/' + self.key + '/history/awards'
+
+    def awards_from_raw_data(self, raw_data):
+        """Populates awards from raw json data.
+
+        Args:
+            raw_data: list of award json data
+
+        Returns:
+            self
+
+        Raises:
+            None
+
+        """
+        from TBApython.award import Award
+
+        awards = []
+        for award in raw_data:
             this_award = Award()
             this_award.award_from_raw_data(award)
-            self.awards.append(this_award)
+            awards.append(this_award)
+        self.awards = awards
+        return self
 
     def get_years_participated(self):
         """Populates years participated from raw json data.
@@ -198,12 +421,29 @@ class Team:
             proper formatting.
         """
 
-        self.years_participated.clear()
-        get_years_participated_url = (API_URL + 'team/' + self.key +
-                                      '/years_participated')
-        get_years_participated_raw_data = get_data(get_years_participated_url)
+        self.years_participated_from_raw_data(
+            get_data(self.years_participated_url()))
+
+    def years_participated_url(self):
+        """Returns the API URL of the years the team participated in."""
+        return get_api_url() + 'team/' + self.key + '/years_participated'
+
+    def years_participated_from_raw_data(self, raw_data):
+        """Populates years participated from raw json data.
+
+        Args:
+            raw_data: list of years
+
+        Returns:
+            self
+
+        Raises:
+            Raises a YearsParticipatedFormattingError if raw_data doesn't have
+            proper formatting.
+        """
         try:
-            self.years_participated = get_years_participated_raw_data
+            self.years_participated = raw_data
+            return self
         except KeyError:
             raise YearsParticipatedFormattingError()
 
@@ -0,0 +1,67 @@
+"""Shared fixtures for the TBApython tests.
+
+The tests talk to a local MockServer, so they need no network access or
+APPID of their own.
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import TBApython
+except ImportError:
+    # The repository is the package; load it under its import name.
+    SPEC = importlib.util.spec_from_file_location(
+        'TBApython', os.path.join(ROOT, '__init__.py'),
+        submodule_search_locations=[ROOT])
+    TBApython = importlib.util.module_from_spec(SPEC)
+    sys.modules['TBApython'] = TBApython
+    SPEC.loader.exec_module(TBApython)
+
+from TBApython import identity  # noqa: E402
+from TBApython.cache import ValidationCache  # noqa: E402
+from TBApython.coalesce import SingleFlight  # noqa: E402
+from TBApython.mockserver import MockServer  # noqa: E402
+from TBApython.mockserver import synthetic_fixtures  # noqa: E402
+from TBApython.throttle import RetryPolicy  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Gives every test its own caches, identity map and APPID."""
+    monkeypatch.setattr(TBApython, 'API_APPID', 'frc1:tests:v1')
+    previous = (TBApython.set_validation_cache(ValidationCache()),
+                TBApython.set_disk_cache(None),
+                TBApython.set_rate_limiter(None),
+                TBApython.set_retry_policy(RetryPolicy(base_delay=0.01,
+                                                       max_delay=0.05)),
+                TBApython.set_single_flight(SingleFlight()),
+                identity.set_identity_map(identity.IdentityMap()))
+    yield
+    (validation_cache, disk_cache, limiter, policy, flight,
+     identity_map) = previous
+    TBApython.set_validation_cache(validation_cache)
+    TBApython.set_disk_cache(disk_cache)
+    TBApython.set_rate_limiter(limiter)
+    TBApython.set_retry_policy(policy)
+    TBApython.set_single_flight(flight)
+    identity.set_identity_map(identity_map)
+
+
+@pytest.fixture
+def fixtures():
+    """Returns a synthetic 2015 season of two events."""
+    return synthetic_fixtures(year=2015, events=3, teams_per_event=12,
+                              matches_per_event=12)
+
+
+@pytest.fixture
+def server(fixtures):  # pylint: disable=W0621
+    """Yields a MockServer the client is pointed at."""
+    with MockServer(fixtures) as mock:
+        yield mock
@@ -0,0 +1,52 @@
+"""Tests for the asyncio client."""
+
+import asyncio
+import threading
+
+import TBApython
+from TBApython import aio
+from TBApython.cache import DiskCache
+
+
+class RecordingDiskCache(DiskCache):
+    """DiskCache remembering which threads used it."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def get(self, url):
+        self.threads.add(threading.get_ident())
+        return super().get(url)
+
+    def store(self, url, etag, last_modified, body, gzipped=None):
+        # pylint: disable=R0913
+        self.threads.add(threading.get_ident())
+        return super().store(url, etag, last_modified, body, gzipped)
+
+
+def test_disk_cache_stays_off_the_event_loop(server, tmp_path):
+    cache = RecordingDiskCache(str(tmp_path / 'cache.db'))
+    TBApython.set_disk_cache(cache)
+
+    async def fetch_twice():
+        url = TBApython.get_api_url() + 'event/2015mock0'
+        return (await aio.get_data_async(url),
+                await aio.get_data_async(url), threading.get_ident())
+
+    first, second, loop_thread = asyncio.run(fetch_twice())
+    assert first == second == server.fixtures['event/2015mock0']
+    assert server.hits['event/2015mock0'] == 1
+    assert cache.threads and loop_thread not in cache.threads
+
+
+def test_fetch_event_fills_the_shared_model(server):
+    async def fetch():
+        event = await aio.fetch_event('2015mock1')
+        await aio.fetch_event_matches(event)
+        return event
+
+    event = asyncio.run(fetch())
+    assert event.name == 'Mock Regional 1'
+    assert len(event.matches) == len(
+        server.fixtures['event/2015mock1/matches'])
@@ -0,0 +1,59 @@
+"""Tests for the batch loaders in bulk."""
+
+from TBApython.bulk import load_events
+from TBApython.bulk import load_seasons
+from TBApython.bulk import load_teams
+from TBApython.exceptions import ResourceUnavailableError
+
+
+def test_repeated_keys_are_fetched_once(server):
+    result = load_events(['2015mock0', '2015MOCK0', '2015mock0'],
+                         include=('teams', 'matches'))
+    assert result.items['2015mock0'] is result.items['2015MOCK0']
+    assert not result.failures
+    for endpoint in ('event/2015mock0', 'event/2015mock0/teams',
+                     'event/2015mock0/matches'):
+        assert server.hits[endpoint] == 1
+
+
+def test_repeated_urls_across_teams_are_fetched_once(server):
+    result = load_teams(['frc7', 'FRC7'], include=('events', 'awards'),
+                        year=2015)
+    assert len(result) == 2 and not result.failures
+    assert server.hits['team/frc7/2015/events'] == 1
+    assert server.hits['team/frc7/history/awards'] == 1
+
+
+def test_a_failing_event_does_not_stop_the_others(server):
+    del server.fixtures['event/2015mock1/awards']
+    result = load_events(['2015mock0', '2015mock1', '2015mock2'],
+                         include=('matches', 'awards'))
+    assert list(result.items) == ['2015mock0', '2015mock2']
+    assert isinstance(result.failures['2015mock1'],
+                      ResourceUnavailableError)
+    assert len(result.items['2015mock2'].matches) == len(
+        server.fixtures['event/2015mock2/matches'])
+
+
+def test_a_failing_team_does_not_stop_the_others(server):
+    result = load_teams(['frc1', 'frc9999', 'frc2'],
+                        include=('years_participated',))
+    assert [team.key for team in result] == ['frc1', 'frc2']
+    assert list(result.failures) == ['frc9999']
+    assert result.items['frc2'].years_participated == [2015]
+
+
+def test_seasons_share_event_match_lists(server):
+    # frc7 and frc8 both played at 2015mock0 and 2015mock1.
+    result = load_seasons(['frc7', 'frc8', 'frc9999'], years=2015)
+    assert sorted(result.items) == ['frc7', 'frc8']
+    assert list(result.failures) == ['frc9999']
+    assert server.hits['event/2015mock0/matches'] == 1
+    assert server.hits['event/2015mock1/matches'] == 1
+    team = result.items['frc7']
+    assert sorted(team.matches_by_event) == ['2015mock0', '2015mock1']
+    assert team.matches_by_event['2015mock0'] == [
+        match for match in team.matches
+        if match.event_key == '2015mock0']
+    assert all('frc7' in match.alliances['red']['teams'] +
+               match.alliances['blue']['teams'] for match in team.matches)
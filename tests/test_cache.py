@@ -0,0 +1,94 @@
+"""Tests for the validation and disk caches."""
+
+import gzip
+import sqlite3
+import types
+
+import pytest
+
+from TBApython import cache
+from TBApython.cache import DiskCache
+from TBApython.cache import ValidationCache
+
+URL = 'https://www.thebluealliance.com/api/v2/'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000000.0)
+    clock.time = lambda: clock.now
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
+
+
+def _accessed(disk, url):
+    with sqlite3.connect(disk.path) as conn:
+        return conn.execute('SELECT accessed FROM responses WHERE url = ?',
+                            (url,)).fetchone()[0]
+
+
+def test_validation_cache_drops_the_least_recently_used():
+    validation = ValidationCache(max_entries=2)
+    validation.store('a', '"1"', None, 1)
+    validation.store('b', '"2"', None, 2)
+    validation.get('a')
+    validation.store('c', '"3"', None, 3)
+    assert validation.get('b') is None
+    assert validation.get('a').data == 1 and len(validation) == 2
+    assert validation.store('d', None, None, 4) is None
+
+
+def test_disk_entries_go_stale_after_their_ttl(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / 'cache.db'))
+    url = URL + 'event/2015mock0/matches'
+    assert disk.ttl_for(url) == 180
+    assert disk.ttl_for(URL + 'team/frc281') == 86400
+    assert disk.ttl_for(URL + 'unknown') == cache.DEFAULT_TTL
+    disk.store(url, '"1"', None, b'[]')
+    entry = disk.get(url)
+    assert entry.data == b'[]' and entry.validators() == {
+        'If-None-Match': '"1"'}
+    assert entry.is_fresh(clock.now + 179)
+    assert not entry.is_fresh(clock.now + 180)
+    clock.now += 200
+    assert not disk.get(url).is_fresh(clock.now)
+    disk.touch(url)
+    assert disk.get(url).is_fresh(clock.now)
+
+
+def test_disk_cache_evicts_the_least_recently_used(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / 'cache.db'))
+    bodies = {name: bytes(range(256)) * 8 for name in 'abc'}
+    disk.store(URL + 'a', None, None, bodies['a'])
+    clock.now += 10
+    disk.store(URL + 'b', None, None, bodies['b'])
+    disk.max_bytes = disk.size() + 10
+    clock.now += 10
+    disk.get(URL + 'a')
+    disk.store(URL + 'c', None, None, bodies['c'])
+    assert disk.get(URL + 'b') is None
+    assert disk.get(URL + 'a').data == bodies['a']
+    assert disk.get(URL + 'c').data == bodies['c']
+    assert disk.size() <= disk.max_bytes
+
+
+def test_disk_hits_update_the_access_time_sparingly(tmp_path, clock):
+    disk = DiskCache(str(tmp_path / 'cache.db'))
+    disk.store(URL + 'a', None, None, b'{}')
+    stored = clock.now
+    clock.now += cache.ACCESS_RESOLUTION
+    disk.get(URL + 'a')
+    assert _accessed(disk, URL + 'a') == stored
+    clock.now += 1
+    disk.get(URL + 'a')
+    assert _accessed(disk, URL + 'a') == clock.now
+
+
+def test_gzipped_bodies_are_stored_as_sent(tmp_path):
+    disk = DiskCache(str(tmp_path / 'cache.db'))
+    sent = gzip.compress(b'{"key": "2015mock0"}')
+    disk.store(URL + 'a', None, None, b'{"key": "2015mock0"}', gzipped=sent)
+    assert disk.size() == len(sent)
+    assert disk.get(URL + 'a').data == b'{"key": "2015mock0"}'
+    disk.discard(URL + 'a')
+    assert disk.get(URL + 'a') is None
@@ -0,0 +1,100 @@
+"""Tests for get_data and get_raw_data: caching, retries and coalescing."""
+
+import concurrent.futures
+import json
+
+import TBApython
+from TBApython.cache import DiskCache
+from TBApython.mockserver import MockServer
+from TBApython.transport import Transport
+
+EVENT = 'event/2015mock0'
+
+
+def test_revalidates_with_the_validation_cache(server):
+    url = TBApython.get_api_url() + EVENT
+    first = TBApython.get_data(url)
+    # The second request is answered 304 and the decoded copy is reused.
+    assert TBApython.get_data(url) is first
+    assert server.hits[EVENT] == 2
+
+
+def test_fresh_disk_cache_entries_skip_the_api(server, tmp_path):
+    TBApython.set_disk_cache(DiskCache(str(tmp_path / 'cache.db')))
+    url = TBApython.get_api_url() + EVENT
+    assert TBApython.get_data(url) == server.fixtures[EVENT]
+    TBApython.set_validation_cache(None)
+    assert TBApython.get_data(url) == server.fixtures[EVENT]
+    assert json.loads(TBApython.get_raw_data(url).decode('utf-8')) == (
+        server.fixtures[EVENT])
+    assert server.hits[EVENT] == 1
+
+
+def test_failed_requests_are_retried(server):
+    server.fail_next(2, 503)
+    url = TBApython.get_api_url() + EVENT
+    assert json.loads(TBApython.get_raw_data(url).decode('utf-8')) == (
+        server.fixtures[EVENT])
+    assert server.hits[EVENT] == 3
+
+
+def test_concurrent_calls_share_one_request(fixtures):
+    with MockServer(fixtures, latency=0.2) as server:
+        url = TBApython.get_api_url() + EVENT
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: TBApython.get_data(url),
+                                    range(4)))
+            bodies = list(pool.map(lambda _: TBApython.get_raw_data(url),
+                                   range(4)))
+    assert all(result is results[0] for result in results)
+    assert len(set(bodies)) == 1
+    assert server.hits[EVENT] == 2
+
+
+class _RecordingTransport(Transport):
+    """Transport keeping the status and headers of every request."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def request(self, url, headers=None, timings=None):
+        response = super().request(url, headers, timings)
+        self.sent.append((response.status, dict(headers or {})))
+        return response
+
+
+def test_revalidation_sends_the_etag_and_sees_changes(server):
+    transport = _RecordingTransport()
+    url = TBApython.get_api_url() + EVENT
+    first = TBApython.get_data(url, transport)
+    assert TBApython.get_data(url, transport) is first
+    (status, headers), (revalidated, conditional) = transport.sent
+    assert status == 200 and 'If-None-Match' not in headers
+    assert revalidated == 304 and conditional['If-None-Match']
+    server.set_fixture(EVENT, dict(server.fixtures[EVENT], name='Renamed'))
+    assert TBApython.get_data(url, transport)['name'] == 'Renamed'
+    assert transport.sent[-1][0] == 200
+
+
+def test_stale_disk_entries_are_revalidated(server, tmp_path):
+    disk = DiskCache(str(tmp_path / 'cache.db'), default_ttl=0, ttls=())
+    TBApython.set_disk_cache(disk)
+    TBApython.set_validation_cache(None)
+    transport = _RecordingTransport()
+    url = TBApython.get_api_url() + EVENT
+    assert TBApython.get_data(url, transport) == server.fixtures[EVENT]
+    assert TBApython.get_data(url, transport) == server.fixtures[EVENT]
+    assert [status for status, _ in transport.sent] == [200, 304]
+    assert server.hits[EVENT] == 2
+
+
+def test_get_data_if_modified(server):
+    url = TBApython.get_api_url() + EVENT
+    entry = TBApython.get_data_if_modified(url)
+    assert entry.data == server.fixtures[EVENT] and entry.etag
+    assert TBApython.get_data_if_modified(url, etag=entry.etag) is None
+    assert TBApython.get_data_if_modified(url, etag='"old"').data == (
+        server.fixtures[EVENT])
+    # It neither reads nor fills the validation cache.
+    assert TBApython.get_validation_cache().get(url) is None
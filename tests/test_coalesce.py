@@ -0,0 +1,113 @@
+"""Tests for SingleFlight and AsyncSingleFlight."""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from TBApython.coalesce import AsyncSingleFlight
+from TBApython.coalesce import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def load(key):
+        calls.append(key)
+        release.wait(5)
+        return {'key': key}
+
+    with concurrent.futures.ThreadPoolExecutor(6) as pool:
+        futures = [pool.submit(flight.do, 'a', load, 'a') for _ in range(5)]
+        other = pool.submit(flight.do, 'b', load, 'b')
+        while flight.coalesced < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+    assert sorted(calls) == ['a', 'b'] and other.result() == {'key': 'b'}
+    assert all(result is results[0] for result in results)
+    # The finished call is forgotten; the next one runs again.
+    assert flight.do('a', lambda: 'again') == 'again'
+
+
+def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise KeyError('a')
+
+    with concurrent.futures.ThreadPoolExecutor(3) as pool:
+        leader = pool.submit(flight.do, 'a', fail)
+        started.wait(5)
+        followers = [pool.submit(flight.do, 'a', fail) for _ in range(2)]
+        while flight.coalesced < 2:
+            time.sleep(0.01)
+        release.set()
+        for future in [leader] + followers:
+            with pytest.raises(KeyError):
+                future.result()
+    assert flight.do('a', lambda: 1) == 1
+
+
+def test_async_callers_share_one_task():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return [key]
+
+    async def main():
+        results = await asyncio.gather(*[flight.do('a', load, 'a')
+                                         for _ in range(4)])
+        return results, await flight.do('a', load, 'a')
+
+    results, later = asyncio.run(main())
+    assert calls == ['a', 'a'] and flight.coalesced == 3
+    assert all(result is results[0] for result in results)
+    assert later == ['a'] and later is not results[0]
+
+
+def test_cancelled_async_caller_does_not_cancel_the_others():
+    flight = AsyncSingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('a', load))
+        second = asyncio.ensure_future(flight.do('a', load))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == 'done'
+
+
+def test_async_errors_reach_every_caller():
+    flight = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('bad')
+
+    async def main():
+        return await asyncio.gather(*[flight.do('a', fail)
+                                      for _ in range(3)],
+                                    return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
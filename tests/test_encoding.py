@@ -0,0 +1,86 @@
+"""Tests for decompressing gzip and deflate responses."""
+
+import gzip
+import io
+import zlib
+
+import pytest
+
+import TBApython
+from TBApython.exceptions import UnexpectedDataError
+from TBApython.transport import ContentDecodingError
+from TBApython.transport import Response
+from TBApython.transport import iter_content
+
+BODY = b'[' + b', '.join(b'{"key": "2015mock0_qm%d"}' % number
+                         for number in range(500)) + b']'
+
+
+def _raw_deflate(body):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+ENCODED = [
+    ('gzip', gzip.compress(BODY)),
+    ('deflate', zlib.compress(BODY)),
+    ('deflate', _raw_deflate(BODY)),
+    ('identity', BODY),
+]
+
+
+class Unread(object):
+    """Stand-in for an unread http.client.HTTPResponse."""
+
+    def __init__(self, encoding, body):
+        self.headers = {'Content-Encoding': encoding}
+        self.body = io.BytesIO(body)
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def read(self, size):
+        return self.body.read(size)
+
+
+class UndecodableTransport(object):
+    """Transport whose every response has a corrupt compressed body."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def request(self, url, headers=None, timings=None):
+        # pylint: disable=W0613
+        self.requests += 1
+        return Response.decoded(200, 'OK', {'Content-Encoding': 'gzip'},
+                                b'not gzip at all')
+
+
+@pytest.mark.parametrize('encoding, raw_body', ENCODED)
+def test_whole_bodies_are_decompressed(encoding, raw_body):
+    response = Response.decoded(200, 'OK', {'Content-Encoding': encoding},
+                                raw_body)
+    assert response.body == BODY and response.raw_body is raw_body
+
+
+@pytest.mark.parametrize('encoding, raw_body', ENCODED)
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_streamed_bodies_are_decompressed(encoding, raw_body, chunk_size):
+    chunks = iter_content(Unread(encoding, raw_body), chunk_size)
+    assert b''.join(chunks) == BODY
+
+
+def test_corrupt_bodies_raise_content_decoding_errors():
+    with pytest.raises(ContentDecodingError):
+        Response.decoded(200, 'OK', {'Content-Encoding': 'deflate'},
+                         b'\x00\x01garbage')
+    with pytest.raises(ContentDecodingError):
+        Response.decoded(200, 'OK', {'Content-Encoding': 'compress'}, BODY)
+
+
+def test_undecodable_response_is_not_retried(server):
+    transport = UndecodableTransport()
+    with pytest.raises(UnexpectedDataError):
+        TBApython.get_data(TBApython.get_api_url() + 'event/2015mock0',
+                           transport)
+    assert transport.requests == 1
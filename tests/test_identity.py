@@ -0,0 +1,70 @@
+"""Tests for the identity map shared by the models."""
+
+import TBApython
+from TBApython.event import Event
+from TBApython.identity import resolve
+from TBApython.match import Match
+from TBApython.mockserver import MockServer
+from TBApython.mockserver import synthetic_fixtures
+from TBApython.team import Team
+
+
+def test_constructors_return_the_shared_instance(server):
+    event = Event('2015mock0')
+    assert Event('2015mock0') is event
+    assert Event('2015MOCK0', lazy=True) is event
+    assert Team('frc3') is Team('frc3')
+    match_key = server.fixtures['event/2015mock0/matches'][0]['key']
+    assert Match(match_key) is Match(match_key)
+
+
+def test_constructing_again_keeps_loaded_relationships(server):
+    event = Event('2015mock0')
+    matches = event.matches
+    server.fixtures['event/2015mock0']['name'] = 'Renamed'
+    again = Event('2015mock0')
+    assert again.name == 'Renamed'
+    assert again.matches is matches
+
+
+def test_parsed_models_are_the_constructed_ones(server):
+    event = Event('2015mock0')
+    assert event.teams[0] is Team(event.teams[0].key)
+    assert Match(event.matches[0].key) is event.matches[0]
+
+
+def test_models_are_kept_apart_per_api_url(fixtures):
+    with MockServer(fixtures) as first:
+        event = Event('2015mock0')
+    other = synthetic_fixtures(year=2015, events=1, teams_per_event=12,
+                               matches_per_event=12)
+    other['event/2015mock0']['name'] = 'Other server'
+    with MockServer(other) as second:
+        assert TBApython.get_api_url() == second.url
+        assert Event('2015mock0') is not event
+        assert Event('2015mock0').name == 'Other server'
+        assert resolve(Event, '2015mock0') is not event
+    assert event.name == 'Mock Regional 0'
+    previous = TBApython.set_api_url(first.url)
+    try:
+        assert resolve(Event, '2015mock0') is event
+    finally:
+        TBApython.set_api_url(previous)
+
+
+def test_lazy_models_are_registered_lowercased(server):
+    event = Event('2015MOCK0', lazy=True)
+    team = Team('FRC3', lazy=True)
+    assert (event.key, team.key) == ('2015mock0', 'frc3')
+    assert Event('2015mock0', lazy=True) is event
+    assert Team('frc3', lazy=True) is team
+    assert resolve(Event, '2015mock0') is event
+    assert server.hits['event/2015mock0'] == 0
+
+
+def test_repr_of_a_lazy_team_does_not_load_it(server):
+    team = Team('frc3', lazy=True)
+    assert repr(team) == 'frc3'
+    assert server.hits['team/frc3'] == 0
+    assert team.nickname
+    assert repr(team) == '3'
@@ -0,0 +1,34 @@
+"""Tests for ingesting whole seasons."""
+
+import pytest
+
+import TBApython
+from TBApython.cache import DiskCache
+from TBApython.ingest import ingest_seasons
+
+
+@pytest.mark.parametrize('processes', [0, 1])
+def test_ingest_season(server, processes):
+    result = ingest_seasons(2015, processes=processes)
+    assert not result.failures
+    assert len(result.events) == 3
+    assert len(result.matches) == sum(
+        len(server.fixtures['event/2015mock%d/matches' % number])
+        for number in range(3))
+    assert len(result.awards) == sum(
+        len(server.fixtures['event/2015mock%d/awards' % number])
+        for number in range(3))
+
+
+def test_ingest_uses_the_disk_cache(server, tmp_path):
+    TBApython.set_disk_cache(DiskCache(str(tmp_path / 'cache.db')))
+    ingest_seasons(2015, processes=0)
+    ingest_seasons(2015, processes=0)
+    assert server.hits['event/2015mock0/matches'] == 1
+
+
+def test_ingest_records_failed_events(server):
+    del server.fixtures['event/2015mock1/awards']
+    result = ingest_seasons(2015, processes=0)
+    assert list(result.failures) == ['2015mock1']
+    assert set(result.matches.event_keys) == {'2015mock0', '2015mock2'}
@@ -0,0 +1,94 @@
+"""Tests for the per-event match index."""
+
+import copy
+
+from TBApython.match import Match
+from TBApython.matchindex import MatchIndex
+
+
+def _matches(fixtures):
+    return [Match.from_raw_data(raw) for raw in
+            copy.deepcopy(fixtures['event/2015mock0/matches'])]
+
+
+def _teams(match):
+    alliances = match.alliances
+    return alliances['red']['teams'] + alliances['blue']['teams']
+
+
+def test_lookups(fixtures):
+    matches = _matches(fixtures)
+    index = MatchIndex(matches)
+    team = _teams(matches[0])[0]
+    assert index.for_team(team) == [match for match in matches
+                                    if team in _teams(match)]
+    assert index.for_comp_level('qm') == matches
+    assert index.schedule() == matches
+    assert index.match('qm', 1, 3) is matches[2]
+    assert index.for_team('frc9999') == [] and index.playoffs() == []
+
+
+def test_next_match_skips_played_matches(fixtures):
+    matches = _matches(fixtures)
+    team = _teams(matches[3])[0]
+    for match in matches[3:]:
+        for color in ('red', 'blue'):
+            match.alliances[color]['score'] = -1
+    index = MatchIndex(matches)
+    assert index.next_match() is matches[3]
+    assert index.next_match(team) is matches[3]
+    assert index.next_match('frc9999') is None
+
+
+def test_partners_and_opponents(fixtures):
+    matches = _matches(fixtures)
+    index = MatchIndex(matches)
+    team = _teams(matches[0])[0]
+    partners, opponents = index.partners(team), index.opponents(team)
+    for match in index.for_team(team):
+        red = match.alliances['red']['teams']
+        blue = match.alliances['blue']['teams']
+        ours, theirs = (red, blue) if team in red else (blue, red)
+        for other in ours:
+            assert other == team or partners[other] >= 1
+        for other in theirs:
+            assert opponents[other] >= 1
+    assert sum(partners.values()) == 2 * len(index.for_team(team))
+    assert sum(opponents.values()) == 3 * len(index.for_team(team))
+
+
+def test_update_reindexes_only_changed_matches(fixtures):
+    matches = _matches(fixtures)
+    index = MatchIndex(matches)
+    schedule = index.schedule()
+    assert index.update(list(matches)) == set()
+
+    raw = copy.deepcopy(fixtures['event/2015mock0/matches'][0])
+    raw['time'] = matches[-1].time + 60
+    raw['alliances']['red']['score'] = -1
+    moved = matches[0].match_from_raw_data(raw)
+    added = Match.from_raw_data(dict(raw, key='2015mock0_qm13',
+                                     match_number=13, time=None))
+    assert index.update(matches[1:] + [moved, added]) == {
+        moved.key, added.key}
+    assert index.schedule() is schedule
+    assert schedule == matches[1:] + [moved, added]
+    assert index.next_match() is moved
+    assert index.match('qm', 1, 13) is added
+
+    assert index.update(matches[1:], complete=False) == set()
+    assert index.update(matches[2:]) == {matches[1].key, moved.key,
+                                         added.key}
+    assert index.schedule() == matches[2:]
+    for team in _teams(matches[1]):
+        assert matches[1] not in index.for_team(team)
+
+
+def test_swapped_numbers_keep_both_matches(fixtures):
+    matches = _matches(fixtures)
+    index = MatchIndex(matches)
+    first, second = matches[0], matches[1]
+    first.match_number, second.match_number = 2, 1
+    assert index.update(matches) == {first.key, second.key}
+    assert index.match('qm', 1, 1) is second
+    assert index.match('qm', 1, 2) is first
@@ -0,0 +1,86 @@
+"""Tests for the request observers and MetricsCollector."""
+
+import pytest
+
+import TBApython
+from TBApython import metrics
+from TBApython.exceptions import ResourceUnavailableError
+from TBApython.metrics import Histogram
+from TBApython.metrics import MetricsCollector
+
+MATCHES = 'event/{event_key}/matches'
+
+
+@pytest.fixture
+def collector():
+    collector = metrics.add_observer(MetricsCollector())
+    yield collector
+    metrics.remove_observer(collector)
+
+
+def test_endpoint_templates():
+    base = 'http://www.thebluealliance.com/api/v2/'
+    assert metrics.endpoint_template(base + 'team/frc281/2015/events') == (
+        'team/{team_key}/{year}/events')
+    assert metrics.endpoint_template(base + 'event/2015scmb/matches') == (
+        MATCHES)
+    assert metrics.endpoint_template(base + 'events/2015') == (
+        'events/{year}')
+
+
+def test_observers_are_only_called_while_registered(server):
+    reported = []
+    url = TBApython.get_api_url() + 'event/2015mock0/matches'
+    assert not metrics.is_enabled()
+    metrics.add_observer(reported.append)
+    try:
+        TBApython.get_data(url)
+    finally:
+        metrics.remove_observer(reported.append)
+    TBApython.get_data(url)
+    assert not metrics.is_enabled()
+    [event] = reported
+    assert event.endpoint == MATCHES and event.status == 200
+    assert event.cache == 'miss' and event.bytes > 0
+    assert {'transfer', 'parse', 'total'} <= set(event.timings)
+
+
+def test_snapshot_counts_statuses_cache_and_errors(server, collector):
+    url = TBApython.get_api_url() + 'event/2015mock%d/matches'
+    TBApython.get_data(url % 0)
+    TBApython.get_data(url % 0)
+    server.fail_next(1, 503)
+    TBApython.get_data(url % 1)
+    with pytest.raises(ResourceUnavailableError):
+        TBApython.get_data(url % 9)
+    snapshot = collector.snapshot()[MATCHES]
+    assert snapshot['requests'] == 4 and snapshot['retries'] == 1
+    assert snapshot['statuses'] == {'200': 2, '304': 1, '404': 1}
+    assert snapshot['cache'] == {'miss': 2, 'revalidated': 1, 'None': 1}
+    assert snapshot['errors'] == {'ResourceUnavailableError': 1}
+    assert snapshot['timings']['total']['count'] == 4
+    collector.reset()
+    assert collector.snapshot() == {}
+
+
+def test_render_is_prometheus_text(server, collector):
+    TBApython.get_data(TBApython.get_api_url() + 'event/2015mock0')
+    lines = collector.render(prefix='t').splitlines()
+    label = 'endpoint="event/{event_key}"'
+    assert 't_requests_total{%s,status="200"} 1' % label in lines
+    assert 't_request_seconds_bucket{%s,phase="total",le="+Inf"} 1' % (
+        label) in lines
+    assert 't_request_seconds_count{%s,phase="total"} 1' % label in lines
+    assert all(line.startswith(('# TYPE t_', 't_')) for line in lines)
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.percentile(50) == 0.1
+    assert histogram.percentile(75) == 1.0
+    assert histogram.percentile(100) == 3.0
+    assert Histogram().percentile(50) == 0.0
+    assert histogram.to_dict()['buckets'] == {'0.1': 2, '1.0': 1, '+Inf': 1}
@@ -0,0 +1,78 @@
+"""Tests for the mock API server, talked to over plain urllib."""
+
+import concurrent.futures
+import gzip
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from TBApython.mockserver import MockServer
+from TBApython.mockserver import load_fixtures
+from TBApython.mockserver import save_fixtures
+
+EVENT = 'event/2015mock0'
+
+
+def _get(server, endpoint, headers=None):
+    headers = dict({'X-TBA-App-Id': 'test:tests:1'}, **(headers or {}))
+    request = urllib.request.Request(server.url + endpoint, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, dict(error.headers), error.read()
+
+
+def test_serves_fixtures_gzipped_with_an_etag(server):
+    status, headers, body = _get(server, EVENT,
+                                 {'Accept-Encoding': 'gzip'})
+    assert status == 200 and headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(body)) == server.fixtures[EVENT]
+    status, _, body = _get(server, EVENT,
+                           {'If-None-Match': headers['ETag']})
+    assert status == 304 and body == b''
+    status, _, body = _get(server, EVENT)
+    assert json.loads(body) == server.fixtures[EVENT]
+    assert server.hits[EVENT] == 3
+
+
+def test_changed_fixture_gets_a_new_etag(server):
+    etag = _get(server, EVENT)[1]['ETag']
+    server.set_fixture(EVENT, dict(server.fixtures[EVENT], name='Renamed'))
+    status, headers, body = _get(server, EVENT, {'If-None-Match': etag})
+    assert status == 200 and headers['ETag'] != etag
+    assert json.loads(body)['name'] == 'Renamed'
+
+
+def test_missing_app_id_and_unknown_paths(server):
+    request = urllib.request.Request(server.url + EVENT)
+    with pytest.raises(urllib.error.HTTPError) as raised:
+        urllib.request.urlopen(request, timeout=5)
+    assert raised.value.code == 400
+    assert _get(server, 'event/2015nope')[0] == 404
+
+
+def test_fail_next_and_retry_after(fixtures):
+    with MockServer(fixtures, retry_after=7) as server:
+        server.fail_next(2, 429)
+        first, second, third = [_get(server, EVENT) for _ in range(3)]
+    assert first[0] == second[0] == 429
+    assert first[1]['Retry-After'] == '7'
+    assert third[0] == 200
+    assert server.hits[EVENT] == 3
+
+
+def test_concurrent_hits_are_all_counted(fixtures):
+    with MockServer(fixtures, latency=0.01) as server:
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            statuses = list(pool.map(lambda _: _get(server, EVENT)[0],
+                                     range(64)))
+    assert statuses == [200] * 64
+    assert server.hits[EVENT] == 64
+
+
+def test_fixtures_round_trip_through_a_directory(fixtures, tmp_path):
+    save_fixtures(fixtures, str(tmp_path))
+    assert load_fixtures(str(tmp_path)) == fixtures
@@ -0,0 +1,82 @@
+"""Tests for pickling and projecting Match and Event models."""
+
+import copy
+import pickle
+
+import pytest
+
+from TBApython.event import Event
+from TBApython.exceptions import EventFormattingError
+from TBApython.exceptions import MatchFormattingError
+from TBApython.identity import resolve
+from TBApython.match import Match
+
+
+def _raw_match(fixtures):
+    return copy.deepcopy(fixtures['event/2015mock0/matches'][0])
+
+
+def test_pickled_match_keeps_its_fields(fixtures):
+    raw = _raw_match(fixtures)
+    raw['videos'] = [{'key': 'xswGjxzNEoY', 'type': 'youtube'}]
+    match = Match.from_raw_data(raw)
+    for clone in (pickle.loads(pickle.dumps(match)), copy.deepcopy(match)):
+        assert clone.videos == raw['videos']
+        assert clone.score_breakdown is None
+        assert clone.alliances == raw['alliances']
+
+
+def test_pickled_lazy_event_loads_on_access(server):
+    event = Event('2015mock0', lazy=True)
+    clone = pickle.loads(pickle.dumps(event))
+    assert server.hits['event/2015mock0'] == 0
+    assert clone.webcast == []
+    assert clone.name == 'Mock Regional 0'
+
+
+def test_pickled_event_rebuilds_match_index(server):
+    event = Event('2015mock0')
+    assert len(event.match_index) == 12
+    clone = pickle.loads(pickle.dumps(event))
+    assert clone.alliances == []
+    assert len(clone.match_index) == 12
+
+
+def test_missing_key_is_a_formatting_error(fixtures):
+    raw = _raw_match(fixtures)
+    del raw['score_breakdown']
+    with pytest.raises(MatchFormattingError):
+        Match.from_raw_data(raw)
+    with pytest.raises(MatchFormattingError):
+        Match.from_raw_data(raw, fields=('alliances',))
+    raw_event = dict(fixtures['event/2015mock0'])
+    del raw_event['alliances']
+    with pytest.raises(EventFormattingError):
+        Event().event_from_raw_data(raw_event)
+
+
+def test_projection_copies_only_listed_fields(fixtures):
+    raw = _raw_match(fixtures)
+    match = Match.from_raw_data(raw, fields=('alliances',))
+    assert match.key == raw['key']
+    assert match.alliances == raw['alliances']
+    assert match.time is None and match.videos is None
+    assert match.score_breakdown is None
+
+
+def test_projection_of_events(fixtures):
+    raw = fixtures['event/2015mock0']
+    event = Event.from_raw_data(raw, fields=('name', 'year'))
+    assert (event.key, event.name, event.year) == (raw['key'], raw['name'],
+                                                   raw['year'])
+    assert event.webcast is None and event.venue_address is None
+    with pytest.raises(ValueError):
+        Event.from_raw_data(raw, fields=('nmae',))
+
+
+def test_projection_refuses_shared_instances(fixtures):
+    raw = _raw_match(fixtures)
+    match = resolve(Match, raw['key']).match_from_raw_data(raw)
+    with pytest.raises(ValueError):
+        match.match_from_raw_data(raw, fields=('alliances',))
+    assert match.time == raw['time']
@@ -0,0 +1,100 @@
+"""Tests for the event poller."""
+
+import copy
+import time
+
+from TBApython.mockserver import MockServer
+from TBApython.poller import EventPoller
+
+MATCHES = 'event/2015mock0/matches'
+
+
+def _poller(server, now):
+    poller = EventPoller(fast_interval=10, slow_interval=100,
+                         active_window=600, clock=lambda: now[0])
+    changes = {'new': [], 'changed': [], 'score': []}
+    poller.on_new_match(lambda event, match: changes['new'].append(match))
+    poller.on_match_changed(
+        lambda event, match: changes['changed'].append(match))
+    poller.on_score(lambda event, match: changes['score'].append(match))
+    poller.watch('2015mock0')
+    return poller, changes
+
+
+def _edit(server, edit):
+    matches = copy.deepcopy(server.fixtures[MATCHES])
+    edit(matches[0])
+    server.set_fixture(MATCHES, matches)
+    return matches[0]['key']
+
+
+def test_first_poll_reports_new_matches(server):
+    poller, changes = _poller(server, [0.0])
+    event = poller.watch('2015mock0')
+    found = poller.poll('2015mock0')
+    assert len(found) == len(changes['new']) == 12
+    assert not changes['changed'] and not changes['score']
+    assert [match.key for match in event.matches] == [
+        match['key'] for match in server.fixtures[MATCHES]]
+
+
+def test_changed_match_and_score_callbacks(server):
+    poller, changes = _poller(server, [0.0])
+    poller.poll('2015mock0')
+    key = _edit(server, lambda match: match.update(time_string='9:07 AM'))
+    assert [change.kind for change in poller.poll('2015mock0')] == [
+        'changed']
+    assert [match.key for match in changes['changed']] == [key]
+    assert not changes['score']
+
+    def score(match):
+        match['alliances']['red']['score'] += 5
+
+    _edit(server, score)
+    assert [change.kind for change in poller.poll('2015mock0')] == [
+        'changed', 'score']
+    assert [match.key for match in changes['score']] == [key]
+    assert len(changes['new']) == 12
+
+
+def test_unchanged_list_is_short_circuited(server):
+    poller, changes = _poller(server, [0.0])
+    poller.poll('2015mock0')
+    assert poller.poll('2015mock0') == []
+    assert server.hits[MATCHES] == 2
+    assert len(changes['new']) == 12 and not changes['changed']
+
+
+def test_interval_is_fast_around_scheduled_matches(server):
+    first = server.fixtures[MATCHES][0]['time']
+    now = [first - 3600.0]
+    poller, _ = _poller(server, now)
+    poller.run_pending()
+    assert poller.interval('2015mock0') == 100
+    now[0] = first - 3550.0
+    poller.run_pending()
+    assert server.hits[MATCHES] == 1
+    # Matches are about to start, so refreshes come every fast_interval.
+    now[0] = first - 60.0
+    assert poller.interval('2015mock0') == 10
+    assert poller.run_pending() == []
+    now[0] = first - 55.0
+    poller.run_pending()
+    assert server.hits[MATCHES] == 2
+    now[0] = first - 50.0
+    poller.run_pending()
+    assert server.hits[MATCHES] == 3
+
+
+def test_due_events_are_fetched_concurrently(fixtures):
+    with MockServer(fixtures, latency=0.3) as server:
+        poller = EventPoller(clock=lambda: 0.0)
+        for number in range(3):
+            poller.watch('2015mock%d' % number)
+        started = time.perf_counter()
+        changes = poller.run_pending()
+        elapsed = time.perf_counter() - started
+    assert len(changes) == 36
+    assert elapsed < 0.8
+    assert sum(server.hits['event/2015mock%d/matches' % number]
+               for number in range(3)) == 3
@@ -0,0 +1,46 @@
+"""Tests for SeasonStore."""
+
+import sqlite3
+
+from TBApython.snapshot import SeasonStore
+
+
+def _with_b_team(server):
+    # frc1 plays some of 2015mock0's matches as its B team.
+    for match in server.fixtures['event/2015mock0/matches']:
+        red = match['alliances']['red']['teams']
+        match['alliances']['red']['teams'] = [
+            'frc1B' if team == 'frc1' else team for team in red]
+    return [match['key'] for match in server.fixtures[
+        'event/2015mock0/matches']
+            if 'frc1B' in match['alliances']['red']['teams']]
+
+
+def test_ingest_and_query_b_teams(server, tmp_path):
+    b_matches = _with_b_team(server)
+    store = SeasonStore(str(tmp_path / 'season.db'))
+    result = store.ingest_season(2015)
+    assert not result.failures
+    assert [match.key for match in store.matches(team='frc1B')] == b_matches
+    assert not set(b_matches) & {match.key
+                                 for match in store.matches(team=1)}
+    assert [event.key for event in store.events(team='frc1B')] == [
+        '2015mock0']
+
+
+def test_old_stores_are_reindexed(server, tmp_path):
+    path = str(tmp_path / 'season.db')
+    store = SeasonStore(path)
+    store.ingest_season(2015)
+    expected = [match.key for match in store.matches(team=3)]
+    store.close()
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('DROP TABLE match_teams')
+        conn.execute('CREATE TABLE match_teams (match_key TEXT NOT NULL, '
+                     'team_number INTEGER NOT NULL, year INTEGER NOT NULL, '
+                     'alliance TEXT NOT NULL)')
+    conn.close()
+    store = SeasonStore(path)
+    assert [match.key for match in store.matches(team=3)] == expected
+    assert [match.key for match in store.matches(team='frc3')] == expected
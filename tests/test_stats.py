@@ -0,0 +1,88 @@
+"""Tests for StatsEngine, compared with a plain least-squares solution."""
+
+import copy
+
+import numpy
+import pytest
+
+from TBApython.match import Match
+from TBApython.stats import StatsEngine
+from TBApython.stats import compute_season_stats
+from TBApython.stats import compute_stats
+from TBApython.table import MatchTable
+
+MATCHES = 'event/2015mock0/matches'
+
+
+def _lstsq_stats(raw_matches):
+    # OPR and DPR from the dense alliance membership matrix.
+    alliances = [(match['alliances'][color]['teams'],
+                  match['alliances'][color]['score'],
+                  match['alliances'][other]['score'])
+                 for match in raw_matches if match['comp_level'] == 'qm'
+                 and match['alliances']['red']['score'] >= 0
+                 for color, other in (('red', 'blue'), ('blue', 'red'))]
+    teams = sorted({team for alliance in alliances for team in alliance[0]})
+    matrix = numpy.zeros((len(alliances), len(teams)))
+    for row, (alliance, _, _) in enumerate(alliances):
+        for team in alliance:
+            matrix[row, teams.index(team)] = 1.0
+    scores = numpy.array([[own, opponent]
+                          for _, own, opponent in alliances], dtype=float)
+    solution = numpy.linalg.lstsq(matrix, scores, rcond=None)[0]
+    return {team[3:]: tuple(solution[position])
+            for position, team in enumerate(teams)}
+
+
+def _assert_matches_lstsq(stats, raw_matches):
+    expected = _lstsq_stats(raw_matches)
+    assert sorted(stats['oprs']) == sorted(expected)
+    for team, (opr, dpr) in expected.items():
+        assert stats['oprs'][team] == pytest.approx(opr, abs=1e-6)
+        assert stats['dprs'][team] == pytest.approx(dpr, abs=1e-6)
+        assert stats['ccwms'][team] == pytest.approx(opr - dpr, abs=1e-6)
+
+
+def test_engine_agrees_with_lstsq(fixtures):
+    raw_matches = fixtures[MATCHES]
+    engine = StatsEngine()
+    # Added in two batches, the second overlapping the first.
+    engine.add_matches([Match.from_raw_data(match)
+                        for match in raw_matches[:8]])
+    engine.add_matches(MatchTable.from_raw_data(raw_matches[4:]))
+    assert len(engine) == len(raw_matches)
+    _assert_matches_lstsq(engine.solve(), raw_matches)
+
+
+def test_compute_stats_and_season_stats_agree(fixtures):
+    tables = [MatchTable.from_raw_data(fixtures['event/2015mock%d/matches'
+                                                % event])
+              for event in range(3)]
+    season = compute_season_stats(MatchTable.concatenate(tables))
+    for event in range(3):
+        raw_matches = fixtures['event/2015mock%d/matches' % event]
+        _assert_matches_lstsq(compute_stats(tables[event]), raw_matches)
+        _assert_matches_lstsq(season['2015mock%d' % event], raw_matches)
+
+
+def test_corrected_score_replaces_the_old_one(fixtures):
+    raw_matches = copy.deepcopy(fixtures[MATCHES])
+    engine = StatsEngine().add_matches(MatchTable.from_raw_data(raw_matches))
+    raw_matches[0]['alliances']['red']['score'] += 40
+    engine.add_matches(MatchTable.from_raw_data(raw_matches[:1]))
+    assert len(engine) == len(raw_matches)
+    _assert_matches_lstsq(engine.solve(), raw_matches)
+
+
+def test_unplayed_match_is_removed(fixtures):
+    raw_matches = copy.deepcopy(fixtures[MATCHES])
+    engine = StatsEngine().add_matches(MatchTable.from_raw_data(raw_matches))
+    for alliance in raw_matches[0]['alliances'].values():
+        alliance['score'] = -1
+    engine.add_matches(MatchTable.from_raw_data(raw_matches))
+    assert len(engine) == len(raw_matches) - 1
+    _assert_matches_lstsq(engine.solve(), raw_matches[1:])
+    fresh = StatsEngine().add_matches(
+        MatchTable.from_raw_data(raw_matches[1:]))
+    for team, opr in fresh.solve()['oprs'].items():
+        assert engine.solve()['oprs'][team] == pytest.approx(opr)
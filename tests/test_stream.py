@@ -0,0 +1,83 @@
+"""Tests for streaming list responses."""
+
+import pytest
+
+import TBApython
+from TBApython import metrics
+from TBApython import stream
+from TBApython.exceptions import ResourceUnavailableError
+from TBApython.exceptions import UnexpectedDataError
+from TBApython.throttle import RateLimiter
+
+MATCHES = 'event/2015mock0/matches'
+
+
+@pytest.fixture
+def events():
+    """Yields the RequestEvents reported while the test runs."""
+    reported = []
+    metrics.add_observer(reported.append)
+    yield reported
+    metrics.remove_observer(reported.append)
+
+
+def test_streamed_list_matches_get_data(server):
+    url = TBApython.get_api_url() + MATCHES
+    assert list(stream.iter_data(url)) == server.fixtures[MATCHES]
+
+
+def test_streaming_is_retried_and_observed(server, events):
+    server.fail_next(2, 503)
+    url = TBApython.get_api_url() + MATCHES
+    assert len(list(stream.iter_matches(url))) == len(
+        server.fixtures[MATCHES])
+    assert server.hits[MATCHES] == 3
+    [event] = events
+    assert (event.status, event.retries, event.error) == (200, 2, None)
+    assert event.bytes > 0 and event.cache == 'miss'
+
+
+class CountingLimiter(RateLimiter):
+    """RateLimiter counting the requests that waited for it."""
+
+    def __init__(self):
+        super().__init__(1000.0)
+        self.reserved = 0
+
+    def reserve(self, tokens=1):
+        self.reserved += tokens
+        return super().reserve(tokens)
+
+
+def test_streaming_waits_for_the_rate_limiter(server):
+    limiter = CountingLimiter()
+    TBApython.set_rate_limiter(limiter)
+    server.fail_next(1, 503)
+    url = TBApython.get_api_url() + MATCHES
+    list(stream.iter_data(url))
+    assert limiter.reserved == server.hits[MATCHES] == 2
+
+
+def test_missing_list_is_reported(server, events):
+    del server.fixtures[MATCHES]
+    with pytest.raises(ResourceUnavailableError):
+        list(stream.iter_data(TBApython.get_api_url() + MATCHES))
+    [event] = events
+    assert event.status == 404
+    assert isinstance(event.error, ResourceUnavailableError)
+
+
+def test_abandoned_stream_is_reported_as_cancelled(server, events):
+    elements = stream.iter_data(TBApython.get_api_url() + MATCHES)
+    next(elements)
+    elements.close()
+    [event] = events
+    assert event.status == 200
+    assert isinstance(event.error, GeneratorExit)
+
+
+def test_badly_formatted_award_raises(server):
+    awards = 'event/2015mock0/awards'
+    server.set_fixture(awards, [{'name': 'Winner'}])
+    with pytest.raises(UnexpectedDataError):
+        list(stream.iter_awards(TBApython.get_api_url() + awards))
@@ -0,0 +1,62 @@
+"""Tests for sync_season."""
+
+import datetime
+
+from TBApython.snapshot import SeasonStore
+from TBApython.sync import sync_season
+
+# 2015mock0 ended on 03-03, 2015mock1 runs 03-08 to 03-10 and 2015mock2
+# runs 03-15 to 03-17.
+LIVE = datetime.date(2015, 3, 9)
+
+
+def _score(store, match_key):
+    return [match.alliances['red']['score']
+            for match in store.matches(event_key='2015mock1')
+            if match.key == match_key][0]
+
+
+def test_failed_event_does_not_hold_back_live_events(server, tmp_path):
+    store = SeasonStore(str(tmp_path / 'season.db'))
+    del server.fixtures['event/2015mock2/teams']
+    match = server.fixtures['event/2015mock1/matches'][0]
+    for score in (900, 901, 902):
+        match['alliances']['red']['score'] = score
+        report = sync_season(store, 2015, today=LIVE)
+        assert set(report.failures) == {'2015mock2'}
+        assert '2015mock1' not in report.skipped
+        assert _score(store, match['key']) == score
+    assert set(store.sync_failures(2015)) == {'2015mock2'}
+
+
+def test_failed_event_is_retried_until_it_succeeds(server, tmp_path):
+    store = SeasonStore(str(tmp_path / 'season.db'))
+    teams = server.fixtures.pop('event/2015mock2/teams')
+    sync_season(store, 2015, today=LIVE)
+    server.fixtures['event/2015mock2/teams'] = teams
+    report = sync_season(store, 2015, today=LIVE)
+    assert not report.failures
+    assert 'teams' in report.updated['2015mock2']
+    assert store.sync_failures(2015) == {}
+
+
+def test_interrupted_run_skips_only_finished_events(server, tmp_path):
+    store = SeasonStore(str(tmp_path / 'season.db'))
+    today = datetime.date(2015, 3, 7)
+    started, _ = store.begin_sync(2015)
+    for key in ('2015mock0', '2015mock1'):
+        store.update_event(key, event=server.fixtures['event/' + key],
+                           synced=started + 1)
+    report = sync_season(store, 2015, today=today)
+    assert report.resumed
+    assert report.skipped == {'2015mock0': 'resumed'}
+    assert server.hits['event/2015mock1'] == 1
+
+
+def test_finished_event_is_not_checked_again(server, tmp_path):
+    store = SeasonStore(str(tmp_path / 'season.db'))
+    sync_season(store, 2015, today=datetime.date(2015, 4, 1))
+    hits = sum(server.hits.values())
+    report = sync_season(store, 2015, today=datetime.date(2015, 4, 1))
+    assert set(report.skipped.values()) == {'complete'}
+    assert sum(server.hits.values()) == hits + 1
@@ -0,0 +1,145 @@
+"""Tests for MatchTable, the stats computed from it and match archives."""
+
+import copy
+
+import numpy
+import pytest
+
+from TBApython.archive import ArchiveFormatError
+from TBApython.archive import MatchArchive
+from TBApython.archive import write_archive
+from TBApython.event import Event
+from TBApython.exceptions import MatchFormattingError
+from TBApython.match import Match
+from TBApython.stats import compute_season_stats
+from TBApython.stats import compute_stats
+from TBApython.table import MatchTable
+from TBApython.team import Team
+
+
+def _b_team_matches(fixtures):
+    # 2015mock0 with frc1 replaced by its B team.
+    matches = copy.deepcopy(fixtures['event/2015mock0/matches'])
+    for match in matches:
+        for alliance in match['alliances'].values():
+            alliance['teams'] = ['frc254B' if team == 'frc1' else team
+                                 for team in alliance['teams']]
+    return matches
+
+
+def test_b_teams_get_their_own_column(fixtures):
+    matches = _b_team_matches(fixtures)
+    table = MatchTable.from_raw_data(matches)
+    assert 'frc254B' in table.team_keys
+    assert table.for_team('frc254B').sum() == sum(
+        'frc254B' in match['alliances']['red']['teams'] +
+        match['alliances']['blue']['teams'] for match in matches)
+    rebuilt = table.to_matches()
+    assert [match.alliances for match in rebuilt] == [
+        {color: {'teams': alliance['teams'], 'score': alliance['score']}
+         for color, alliance in match['alliances'].items()}
+        for match in matches]
+
+
+def test_team_numbers_select_like_keys(fixtures):
+    table = MatchTable.from_raw_data(fixtures['event/2015mock0/matches'])
+    assert (table.for_team(3) == table.for_team('frc3')).all()
+    assert not table.for_team(9999).any()
+
+
+def test_unknown_comp_level_is_a_formatting_error(fixtures):
+    matches = copy.deepcopy(fixtures['event/2015mock0/matches'])
+    matches[0]['comp_level'] = 'xx'
+    with pytest.raises(MatchFormattingError):
+        MatchTable.from_raw_data(matches)
+
+
+def test_concatenate_merges_team_keys(fixtures):
+    tables = [MatchTable.from_raw_data(_b_team_matches(fixtures)),
+              MatchTable.from_raw_data(fixtures['event/2015mock1/matches'])]
+    joined = MatchTable.concatenate(tables)
+    assert len(joined) == sum(len(table) for table in tables)
+    assert sorted(joined.keys()) == sorted(tables[0].keys() +
+                                           tables[1].keys())
+    assert (joined.select(joined.for_team('frc254B')).keys() ==
+            tables[0].select(tables[0].for_team('frc254B')).keys())
+
+
+def test_stats_with_b_teams(fixtures):
+    matches = _b_team_matches(fixtures)
+    stats = compute_stats([Match.from_raw_data(match) for match in matches])
+    assert '254B' in stats['oprs'] and '1' not in stats['oprs']
+    season = compute_season_stats(MatchTable.concatenate(
+        [MatchTable.from_raw_data(matches),
+         MatchTable.from_raw_data(fixtures['event/2015mock1/matches'])]))
+    for team, opr in stats['oprs'].items():
+        assert season['2015mock0']['oprs'][team] == pytest.approx(opr)
+
+
+def test_average_scores_are_keyed_by_team(fixtures):
+    table = MatchTable.from_raw_data(_b_team_matches(fixtures))
+    teams, averages = table.team_average_scores()
+    scores = table.team_scores()[1][
+        table.team_scores()[0] == table.team_keys.index('frc254B')]
+    assert averages[teams.index('frc254B')] == pytest.approx(scores.mean())
+
+
+def test_archive_round_trips_b_teams(fixtures, tmp_path):
+    table = MatchTable.from_raw_data(_b_team_matches(fixtures))
+    path = str(tmp_path / 'matches.tba')
+    write_archive(path, table)
+    with MatchArchive(path) as archive:
+        assert archive.matches.team_keys == table.team_keys
+        assert numpy.array_equal(archive.matches.red_teams, table.red_teams)
+        assert archive.matches.keys() == table.keys()
+
+
+def test_archive_round_trips_matches_events_and_teams(fixtures, tmp_path):
+    raw_matches = fixtures['event/2015mock0/matches']
+    events = [Event.from_raw_data(fixtures['event/2015mock%d' % number])
+              for number in range(3)]
+    teams = [Team().team_from_raw_data(team)
+             for team in fixtures['event/2015mock0/teams']]
+    teams[0].nickname = 'Équipe ☃'
+    path = str(tmp_path / 'season.tba')
+    write_archive(path, [Match.from_raw_data(match)
+                         for match in raw_matches], events, teams)
+    with MatchArchive(path) as archive:
+        matches = archive.to_matches()
+        assert [match.key for match in matches] == [
+            match['key'] for match in raw_matches]
+        assert [match.alliances for match in matches] == [
+            match['alliances'] for match in raw_matches]
+        assert [match.time for match in matches] == [
+            match['time'] for match in raw_matches]
+        assert [(event.key, event.name, event.year, event.website)
+                for event in archive.to_events()] == [
+            (event.key, event.name, event.year, None) for event in events]
+        loaded = archive.to_teams()
+        assert [(team.key, team.team_number, team.nickname)
+                for team in loaded] == [
+            (team.key, team.team_number, team.nickname) for team in teams]
+        assert archive.teams['name'][-1] == teams[-1].name
+        assert archive.events['key'].tolist() == [
+            event.key for event in events]
+
+
+def test_archive_columns_are_views_of_the_file(fixtures, tmp_path):
+    table = MatchTable.from_raw_data(fixtures['event/2015mock1/matches'])
+    path = str(tmp_path / 'matches.tba')
+    write_archive(path, table)
+    with MatchArchive(path) as archive:
+        assert not archive.matches.red_score.flags.writeable
+        assert archive.matches.red_score.base is not None
+        assert archive.events == {} and archive.to_teams() == []
+        assert compute_stats(archive.matches) == compute_stats(table)
+
+
+def test_other_files_are_not_archives(tmp_path):
+    path = tmp_path / 'other.tba'
+    path.write_bytes(b'{"not": "an archive"}')
+    with pytest.raises(ArchiveFormatError):
+        MatchArchive(str(path))
+    write_archive(str(path), MatchTable.from_raw_data([]))
+    with MatchArchive(str(path)) as archive:
+        assert len(archive.matches) == 0
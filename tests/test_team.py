@@ -0,0 +1,28 @@
+"""Tests for the team's per-event matches."""
+
+import asyncio
+
+from TBApython import aio
+from TBApython.team import Team
+
+MOCK0 = 'team/frc7/event/2015mock0/matches'
+
+
+def test_refetched_matches_replace_the_event_ones(server):
+    team = Team('frc7')
+    team.get_matches('2015mock0')
+    team.get_matches('2015mock1')
+    assert team.matches_by_event['2015mock0']
+    server.set_fixture(MOCK0, [])
+    team.get_matches('2015mock0')
+    assert team.matches_by_event['2015mock0'] == []
+    assert team.matches == team.matches_by_event['2015mock1']
+
+
+def test_async_refetch_clears_the_event_matches(server):
+    team = Team('frc7')
+    team.get_matches('2015mock0')
+    server.set_fixture(MOCK0, [])
+    asyncio.run(aio.fetch_team_matches(team, '2015mock0'))
+    assert team.matches_by_event == {'2015mock0': []}
+    assert team.matches == []
@@ -0,0 +1,102 @@
+"""Tests for RateLimiter, RetryPolicy and their use by get_data."""
+
+import email.utils
+import random
+
+import pytest
+
+import TBApython
+from TBApython.exceptions import ResourceUnavailableError
+from TBApython.mockserver import MockServer
+from TBApython.throttle import RateLimiter
+from TBApython.throttle import RetryPolicy
+from TBApython.throttle import parse_retry_after
+from TBApython.transport import Response
+
+EVENT = 'event/2015mock0'
+
+
+class _Clock(object):
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status, retry_after=None):
+    headers = {} if retry_after is None else {'Retry-After': retry_after}
+    return Response(status, '', headers, b'')
+
+
+def test_rate_limiter_allows_a_burst_then_paces():
+    clock = _Clock()
+    limiter = RateLimiter(rate=10, burst=3, clock=clock)
+    assert [limiter.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Each later caller queues behind the previous one.
+    assert limiter.reserve() == pytest.approx(0.1)
+    assert limiter.reserve() == pytest.approx(0.2)
+    clock.now += 10
+    assert limiter.reserve() == 0.0
+
+
+def test_rate_limiter_pause_holds_everyone_back():
+    clock = _Clock()
+    limiter = RateLimiter(rate=10, burst=5, clock=clock)
+    limiter.pause(2)
+    assert limiter.reserve() == pytest.approx(2.1)
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+
+
+def test_retry_delays_grow_with_full_jitter():
+    policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=4,
+                         rand=random.Random(0))
+    for attempt, bound in ((1, 1), (2, 2), (3, 4), (4, 4)):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= bound
+        assert max(delays) > bound / 2
+    assert policy.delay(5) is None
+    assert policy.delay(1, _response(404)) is None
+    assert policy.delay(1, _response(200)) is None
+
+
+def test_retry_after_sets_the_delay():
+    policy = RetryPolicy(max_delay=10)
+    assert policy.delay(1, _response(429, '3')) == 3.0
+    assert policy.delay(1, _response(503, '60')) is None
+    assert policy.delay(3, _response(503, '1')) == 1.0
+
+
+def test_parse_retry_after():
+    date = email.utils.formatdate(1000.0 + 30, usegmt=True)
+    assert parse_retry_after(date, now=1000.0) == 30.0
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('-1') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+
+def test_get_data_honors_retry_after(fixtures):
+    with MockServer(fixtures, retry_after=0) as server:
+        TBApython.set_retry_policy(RetryPolicy(max_attempts=3,
+                                               base_delay=60))
+        server.fail_next(2, 429)
+        url = TBApython.get_api_url() + EVENT
+        assert TBApython.get_data(url) == server.fixtures[EVENT]
+        server.fail_next(3, 503)
+        with pytest.raises(ResourceUnavailableError):
+            TBApython.get_data(url)
+    assert server.hits[EVENT] == 6
+
+
+def test_get_data_waits_for_the_rate_limiter(server, monkeypatch):
+    waits = []
+    monkeypatch.setattr(TBApython.time, 'sleep', waits.append)
+    TBApython.set_rate_limiter(RateLimiter(rate=1, burst=1))
+    for number in range(3):
+        TBApython.get_data(TBApython.get_api_url() +
+                           'event/2015mock%d' % number)
+    assert len(waits) == 2 and all(wait > 0.5 for wait in waits)
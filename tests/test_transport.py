@@ -0,0 +1,100 @@
+"""Tests for Transport's connection pool and redirect handling."""
+
+import http.server
+import threading
+
+import pytest
+
+from TBApython.transport import MAX_REDIRECTS
+from TBApython.transport import Transport
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    ports = None
+
+    def do_GET(self):  # pylint: disable=C0103
+        """Answers /body, /redirect/<n>, /loop and /drop."""
+        self.ports.append(self.client_address[1])
+        if self.path.startswith('/redirect/'):
+            left = int(self.path.rsplit('/', 1)[1])
+            target = '/body' if left == 1 else str(left - 1)
+            self._answer(302, b'', {'Location': target})
+        elif self.path == '/loop':
+            self._answer(307, b'', {'Location': '/loop'})
+        else:
+            self._answer(200, b'x' * 4096)
+            # Drop the connection once idle, without telling the client.
+            self.close_connection = self.path == '/drop'
+
+    def _answer(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=W0221
+        pass
+
+
+@pytest.fixture
+def origin():
+    handler = type('Handler', (_Handler,), {'ports': []})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%d/' % server.server_address[1], handler.ports
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_one_connection(origin):
+    url, ports = origin
+    transport = Transport()
+    timings = {}
+    assert transport.request(url + 'body', timings=timings).body == (
+        b'x' * 4096)
+    assert set(timings) == {'dns', 'connect'}
+    for _ in range(4):
+        timings = {}
+        assert transport.request(url + 'body', timings=timings).status == 200
+        assert not timings
+    assert len(ports) == 5 and len(set(ports)) == 1
+    transport.close()
+
+
+def test_redirects_are_followed_on_the_same_connection(origin):
+    url, ports = origin
+    transport = Transport()
+    response = transport.request(url + 'redirect/3')
+    assert response.status == 200 and response.body == b'x' * 4096
+    assert len(ports) == 4 and len(set(ports)) == 1
+
+
+def test_redirect_loops_stop(origin):
+    url, ports = origin
+    response = Transport().request(url + 'loop')
+    assert response.status == 307
+    assert len(ports) == MAX_REDIRECTS + 1
+
+
+def test_connection_closed_while_idle_is_replaced(origin):
+    url, ports = origin
+    transport = Transport()
+    transport.request(url + 'drop')
+    assert transport.request(url + 'body').status == 200
+    assert len(set(ports)) == 2
+
+
+def test_partly_read_streams_are_not_pooled(origin):
+    url, ports = origin
+    transport = Transport()
+    with transport.stream(url + 'body') as response:
+        response.read(10)
+    with transport.stream(url + 'body') as response:
+        assert len(response.read()) == 4096
+    transport.request(url + 'body')
+    assert len(ports) == 3 and len(set(ports)) == 2
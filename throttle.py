@@ -0,0 +1,154 @@
+"""This script paces and retries requests to The Blue Alliance API
+
+A RateLimiter shared by every thread keeps the request rate of the process
+under what the API tolerates, and a RetryPolicy decides how long to back
+off before retrying throttled, failed and timed out requests. get_data uses
+both:
+
+    TBApython.set_rate_limiter(RateLimiter(rate=20, burst=40))
+    TBApython.set_retry_policy(RetryPolicy(max_attempts=6))
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter(object):
+    """Token bucket limiting how many requests start per second.
+
+    Tokens refill at rate per second up to burst. Every request takes one;
+    when none is left the request waits for the next. Waiting requests are
+    served in the order they asked, across threads and event loops.
+
+    Attributes:
+        rate: Float containing the sustained requests per second.
+        burst: Float containing the number of requests that may start at
+            once after a quiet period.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "RateLimiter(rate=%s, burst=%s)" % (self.rate, self.burst)
+
+    def reserve(self, tokens=1):
+        """Takes tokens and returns the seconds to wait before using them.
+
+        The tokens are taken right away, even when they are only available
+        later, so each caller gets its own place in line.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (
+                now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """Blocks until tokens are available and takes them."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Holds every request back for seconds, as after a 429 answer."""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class RetryPolicy(object):
+    """Decides whether and when to retry a request.
+
+    Delays grow exponentially from base_delay and are drawn uniformly
+    between zero and that bound ("full jitter") so that clients throttled
+    together don't retry together. A Retry-After header sets the delay
+    instead, unless it is longer than max_delay, in which case the request
+    isn't retried.
+
+    Attributes:
+        max_attempts: Integer containing the number of attempts, including
+            the first one. 1 disables retrying.
+        base_delay: Float containing the upper bound in seconds of the first
+            delay.
+        max_delay: Float containing the upper bound in seconds of any delay.
+        statuses: Tuple of the HTTP statuses worth retrying.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 statuses=RETRY_STATUSES, rand=None):
+        # pylint: disable=R0913
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = tuple(statuses)
+        self._random = rand or random.Random()
+
+    def __repr__(self):
+        return "RetryPolicy(max_attempts=%s)" % self.max_attempts
+
+    def delay(self, attempt, response=None):
+        """Returns the seconds to wait before retrying, or None to give up.
+
+        Args:
+            attempt: Integer containing the number of attempts made so far,
+                starting at 1.
+            response: transport Response of the last attempt, or None if it
+                failed without one, for example by timing out.
+
+        Returns:
+            A float of seconds, or None if the request shouldn't be retried.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if response is not None:
+            if response.status not in self.statuses:
+                return None
+            retry_after = parse_retry_after(response.headers.get(
+                'Retry-After'))
+            if retry_after is not None:
+                return retry_after if retry_after <= self.max_delay else None
+        bound = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self._random.uniform(0, bound)
+
+
+def parse_retry_after(value, now=None):
+    """Returns the seconds a Retry-After header asks to wait, or None.
+
+    Args:
+        value: String containing the header, either a number of seconds or
+            an HTTP date, or None.
+        now: UNIX time to measure an HTTP date from. Defaults to now.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
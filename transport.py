@@ -0,0 +1,395 @@
+"""This script handles the HTTP transport used to talk to The Blue Alliance
+API
+"""
+
+import contextlib
+import http.client
+import queue
+import socket
+import threading
+import time
+import urllib.parse
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional; without it only gzip and deflate are offered.
+    brotli = None
+
+DEFAULT_POOL_SIZE = 8
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Seconds a socket operation may take before the request fails.
+DEFAULT_TIMEOUT = 30.0
+ACCEPT_ENCODING = 'gzip, deflate, br' if brotli else 'gzip, deflate'
+
+
+class ContentDecodingError(ValueError):
+    """Raised when a compressed response body can't be decompressed.
+
+    The server answered, so this isn't a connection error and retrying
+    won't help; get_data reports it as an UnexpectedDataError.
+    """
+
+
+class Response(object):
+    """Model for a completed HTTP response.
+
+    Attributes:
+        status: Integer containing the HTTP status code. Example: 200
+        reason: String containing the HTTP reason phrase. Example: OK
+        headers: Case-insensitive mapping of the response headers.
+        body: Bytes containing the response body, decompressed.
+        raw_body: Bytes containing the body as sent, before undoing its
+            Content-Encoding. The same object as body if it wasn't encoded.
+    """
+
+    # pylint: disable=R0903
+
+    def __init__(self, status, reason, headers, body, raw_body=None):
+        # pylint: disable=R0913
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.raw_body = body if raw_body is None else raw_body
+
+    @classmethod
+    def decoded(cls, status, reason, headers, raw_body):
+        """Returns a Response for a body still in its Content-Encoding.
+
+        Raises:
+            Raises a ContentDecodingError if the body can't be decompressed.
+        """
+        encoding = headers.get('Content-Encoding')
+        if not raw_body or not encoding or encoding.lower() == 'identity':
+            return cls(status, reason, headers, raw_body)
+        decompressor = decompressor_for(encoding)
+        try:
+            body = decompressor.decompress(raw_body) + decompressor.flush()
+        except (zlib.error, ValueError) as error:
+            raise ContentDecodingError(error)
+        return cls(status, reason, headers, body, raw_body)
+
+    def __repr__(self):
+        return "%s %s" % (self.status, self.reason)
+
+    # pylint: enable=R0903
+
+
+class Transport(object):
+    """Pool of keep-alive HTTP connections to the API host.
+
+    Opening a connection costs a TCP (and for https a TLS) handshake, so idle
+    connections are kept per host and reused by later requests. Requests that
+    arrive while every pooled connection is busy open a temporary connection
+    which is only kept if there is room left in the pool.
+
+    Attributes:
+        pool_size: Integer containing the number of idle connections kept per
+            host. Example: 8
+        timeout: Float containing the socket timeout in seconds, or None for
+            the global default. Example: 30.0
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "Transport(pool_size=%s)" % self.pool_size
+
+    def request(self, url, headers=None, timings=None):
+        """Performs a GET request over a pooled connection.
+
+        A pooled connection may have been closed by the server while idle, so
+        a failure on a reused connection is retried once on a fresh one.
+        Redirects are followed like urlopen does, up to MAX_REDIRECTS.
+        Compressed responses are asked for and decompressed transparently.
+
+        Args:
+            url: String containing the absolute URL to retrieve.
+            headers: Dictionary of request headers.
+            timings: Dictionary to add the seconds spent resolving the host
+                ('dns') and opening the connection ('connect') to, if a new
+                connection is needed, or None.
+
+        Returns:
+            A Response containing the status, headers and body.
+
+        Raises:
+            Raises an OSError or http.client.HTTPException if the host can't
+            be reached.
+        """
+        host_key, conn, response = self._open(url, headers, timings)
+        try:
+            body = response.read()
+        except BaseException:
+            conn.close()
+            raise
+        self._release(host_key, conn, response.will_close)
+        return Response.decoded(response.status, response.reason,
+                                response.msg, body)
+
+    @contextlib.contextmanager
+    def stream(self, url, headers=None, timings=None):
+        """Performs a GET request and hands over the unread response.
+
+        Used as a context manager. The connection goes back to the pool on
+        exit if the body was read to the end, and is closed otherwise.
+        Compressed responses are asked for, so read the body through
+        iter_content to have it decompressed as it arrives.
+
+        Args:
+            url: String containing the absolute URL to retrieve.
+            headers: Dictionary of request headers.
+            timings: Dictionary to add connection timings to, like
+                request's, or None.
+
+        Yields:
+            The http.client.HTTPResponse, with status, msg and read().
+
+        Raises:
+            Raises an OSError or http.client.HTTPException if the host can't
+            be reached.
+        """
+        host_key, conn, response = self._open(url, headers, timings)
+        try:
+            yield response
+        except BaseException:
+            conn.close()
+            raise
+        if response.isclosed():
+            self._release(host_key, conn, response.will_close)
+        else:
+            conn.close()
+
+    def close(self):
+        """Closes every idle connection held by the pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+    def _open(self, url, headers, timings=None):
+        # Returns the pool key, connection and response with its body unread,
+        # after following any redirects.
+        headers = dict(headers or {})
+        if not any(name.lower() == 'accept-encoding' for name in headers):
+            headers['Accept-Encoding'] = ACCEPT_ENCODING
+        for redirect in range(MAX_REDIRECTS + 1):
+            host_key, path = _split_url(url)
+            conn, response = self._send_pooled(host_key, path, headers,
+                                               timings)
+            location = response.getheader('Location')
+            if (response.status not in REDIRECT_STATUSES or not location or
+                    redirect == MAX_REDIRECTS):
+                return host_key, conn, response
+            try:
+                response.read()
+            except BaseException:
+                conn.close()
+                raise
+            self._release(host_key, conn, response.will_close)
+            url = urllib.parse.urljoin(url, location)
+
+    def _send_pooled(self, host_key, path, headers, timings=None):
+        conn, reused = self._acquire(host_key, timings)
+        try:
+            return conn, _send(conn, path, headers)
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if not reused:
+                raise
+        conn = self._new_connection(host_key, timings)
+        try:
+            return conn, _send(conn, path, headers)
+        except BaseException:
+            conn.close()
+            raise
+
+    def _acquire(self, host_key, timings=None):
+        with self._lock:
+            pool = self._pools.setdefault(host_key, queue.LifoQueue())
+        try:
+            return pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(host_key, timings), False
+
+    def _release(self, host_key, conn, will_close):
+        if will_close:
+            conn.close()
+            return
+        with self._lock:
+            pool = self._pools.get(host_key)
+        if pool is None or pool.qsize() >= self.pool_size:
+            conn.close()
+        else:
+            pool.put_nowait(conn)
+
+    def _new_connection(self, host_key, timings=None):
+        scheme, host, port = host_key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port,
+                                               timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port,
+                                              timeout=self.timeout)
+        if timings is not None:
+            _connect_timed(conn, timings)
+        return conn
+
+
+def decompressor_for(encoding):
+    """Returns an incremental decompressor for a Content-Encoding.
+
+    Args:
+        encoding: String containing the Content-Encoding header. Example:
+            gzip
+
+    Returns:
+        An object with decompress(bytes) and flush() methods like
+        zlib.decompressobj().
+
+    Raises:
+        Raises a ContentDecodingError if the encoding isn't supported.
+    """
+    encoding = encoding.strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if encoding == 'deflate':
+        return _DeflateDecompressor()
+    if encoding == 'br' and brotli is not None:
+        return _BrotliDecompressor()
+    raise ContentDecodingError("Unsupported Content-Encoding: %s" % encoding)
+
+
+def iter_content(response, chunk_size):
+    """Yields the body of an unread response decompressed, chunk by chunk.
+
+    Args:
+        response: http.client.HTTPResponse from Transport.stream.
+        chunk_size: Integer containing the number of bytes to read at once.
+
+    Yields:
+        Bytes of the decompressed body. Chunks may be empty.
+
+    Raises:
+        Raises a ContentDecodingError if the body can't be decompressed.
+    """
+    encoding = response.getheader('Content-Encoding')
+    chunks = iter(lambda: response.read(chunk_size), b'')
+    if not encoding or encoding.lower() == 'identity':
+        yield from chunks
+        return
+    decompressor = decompressor_for(encoding)
+    try:
+        for chunk in chunks:
+            yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+    except (zlib.error, ValueError) as error:
+        raise ContentDecodingError(error)
+
+
+class _DeflateDecompressor(object):
+    # Decompresses zlib-wrapped deflate, as specified, or gzip, and falls
+    # back to the raw deflate some servers send instead when the header
+    # isn't either.
+    # pylint: disable=R0903
+
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 32)
+        # Input seen before the header was accepted, replayed on fallback.
+        self._pending = b''
+
+    def decompress(self, data):
+        if self._pending is None:
+            return self._decompressor.decompress(data)
+        self._pending += data
+        try:
+            output = self._decompressor.decompress(data)
+        except zlib.error:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            output = self._decompressor.decompress(self._pending)
+        if len(self._pending) >= 2:
+            self._pending = None
+        return output
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class _BrotliDecompressor(object):
+    # Gives brotli.Decompressor the zlib.decompressobj() interface.
+    # pylint: disable=R0903
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data):
+        """Returns the decompressed bytes available so far."""
+        try:
+            return self._decompressor.process(data)
+        except brotli.error as error:
+            raise ValueError(error)
+
+    @staticmethod
+    def flush():
+        """Returns nothing; brotli doesn't buffer output."""
+        return b''
+
+
+def _split_url(url):
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        raise ValueError("Unsupported URL scheme: %s" % url)
+    port = parts.port or (443 if scheme == 'https' else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return (scheme, parts.hostname, port), path
+
+
+def _connect_timed(conn, timings):
+    # http.client opens its socket through conn._create_connection; resolving
+    # the host there first separates the DNS lookup from the TCP (and TLS)
+    # handshake. Connecting right away keeps both out of the transfer time.
+    create_connection = conn._create_connection  # pylint: disable=W0212
+    dns = [0.0]
+
+    def resolve_and_connect(address, *args, **kwargs):
+        started = time.perf_counter()
+        host, port = address[:2]
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        dns[0] = time.perf_counter() - started
+        error = OSError("No address found for %s" % host)
+        for address_info in addresses:
+            try:
+                return create_connection((address_info[4][0], port), *args,
+                                         **kwargs)
+            except OSError as exc:
+                error = exc
+        raise error
+
+    conn._create_connection = resolve_and_connect  # pylint: disable=W0212
+    started = time.perf_counter()
+    try:
+        conn.connect()
+    finally:
+        elapsed = time.perf_counter() - started
+        timings['dns'] = timings.get('dns', 0.0) + dns[0]
+        timings['connect'] = timings.get('connect', 0.0) + elapsed - dns[0]
+
+
+def _send(conn, path, headers):
+    conn.request('GET', path, headers=headers or {})
+    return conn.getresponse()